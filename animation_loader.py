@@ -0,0 +1,295 @@
+"""
+Animation Loader
+Decodes and scales images and animated GIFs for the image panel on a
+background thread. Only a small window of frames around the one being shown
+is kept in memory, and scaled frames are cached on disk (keyed by a hash of
+the image), so neither startup time nor memory use grows with GIF length.
+"""
+
+import hashlib
+import io
+import json
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+
+# Frames shown for 0ms (or without a duration) are shown this long instead
+DEFAULT_FRAME_MS = 100
+
+
+class AnimationLoader:
+    """
+    Background frame source for one image or animation.
+
+    The first time an image is seen every frame is decoded once, in order,
+    and written to the disk cache as a scaled PNG. After that frames are
+    read back from the cache as playback needs them. Either way at most
+    `window` frames are held in memory at a time.
+    """
+
+    # Scaled-frame sets kept in the disk cache (least recently used go first)
+    MAX_CACHED_IMAGES = 8
+
+    def __init__(self, source, size: Tuple[int, int], scale: Callable, cache_folder=None,
+                 cache_variant: str = '', window: int = 24):
+        """
+        Set up a loader (call start() to begin decoding).
+
+        Args:
+            source: Image file path, or the file's contents as bytes
+            size: Size frames are scaled to
+            scale: Function(PIL image, size) returning the scaled RGB image
+            cache_folder: Folder for cached frames (None turns the disk cache off)
+            cache_variant: Anything else that changes how frames look (e.g. the panel colour)
+            window: Most frames kept in memory at once
+        """
+        self.source = source
+        self.size = tuple(size)
+        self.scale = scale
+        self.window = max(2, window)
+        self.cache_folder = Path(cache_folder) if cache_folder else None
+        self.cache_variant = cache_variant
+
+        # Set by the worker: number of frames, or the error that stopped it
+        self.frame_count = None
+        self.error = None
+
+        self._cond = threading.Condition()
+        # frame index -> (PIL image, duration in ms), least recently used first
+        self._ready = OrderedDict()
+        # Frame the display wants next - the worker loads the window from here on
+        self._position = 0
+        self._closed = False
+        self._cache_dir = None
+        self._durations = None
+
+    def start(self):
+        """Start the worker thread."""
+        threading.Thread(target=self._run, name="animation-loader", daemon=True).start()
+
+    def close(self):
+        """Stop the worker and drop every frame held in memory."""
+        with self._cond:
+            self._closed = True
+            self._ready.clear()
+            self._cond.notify_all()
+
+    def frame(self, index: int):
+        """
+        Get a frame without waiting.
+
+        Returns:
+            (PIL image, duration in ms), or None if the frame isn't ready yet
+            (the worker is asked to load it and the frames after it)
+        """
+        with self._cond:
+            self._position = index
+            ready = self._ready.get(index)
+            if ready is not None:
+                self._ready.move_to_end(index)
+            self._cond.notify_all()
+            return ready
+
+    def _run(self):
+        """Worker thread: open the image, then keep the window ahead of playback filled."""
+        try:
+            from PIL import Image
+
+            data = self._read_source()
+            key = self._cache_key(data)
+            if not self._open_cache(key):
+                with Image.open(io.BytesIO(data)) as img:
+                    self._decode_all(img, key)
+            self._serve_from_cache()
+        except Exception as e:
+            with self._cond:
+                self.error = e
+                self._cond.notify_all()
+
+    def _read_source(self) -> bytes:
+        if isinstance(self.source, (bytes, bytearray)):
+            return bytes(self.source)
+        with open(self.source, 'rb') as f:
+            return f.read()
+
+    def _cache_key(self, data: bytes) -> str:
+        digest = hashlib.sha1(data)
+        digest.update(f"{self.size[0]}x{self.size[1]}|{self.cache_variant}".encode('utf-8'))
+        return digest.hexdigest()
+
+    def _open_cache(self, key: str) -> bool:
+        """Use frames cached by an earlier run, if there are any."""
+        if self.cache_folder is None:
+            return False
+        cache_dir = self.cache_folder / key
+        try:
+            with open(cache_dir / "frames.json", 'r', encoding='utf-8') as f:
+                durations = json.load(f)['durations']
+            # Mark it as recently used so pruning keeps it
+            os.utime(cache_dir)
+        except (OSError, ValueError, KeyError):
+            return False
+        with self._cond:
+            self._cache_dir = cache_dir
+            self._durations = durations
+            self.frame_count = len(durations)
+            self._cond.notify_all()
+        return True
+
+    def _decode_all(self, img, key: str):
+        """
+        Decode every frame once, in order.
+
+        Frames go to the disk cache as they're scaled, and into memory only
+        while they're within the window ahead of playback. Once playback
+        moves on (or loops) before decoding is done, the frames it needs are
+        read back from the ones already written. Without a disk cache,
+        decoding just follows playback (and starts over when it loops).
+        """
+        count = getattr(img, 'n_frames', 1)
+        with self._cond:
+            self.frame_count = count
+
+        tmp_dir = self._start_cache_dir(key)
+        durations = []
+        try:
+            for index in range(count):
+                if tmp_dir is None:
+                    # No disk cache - don't run further ahead than the window
+                    if not self._wait_for_room(index):
+                        return
+                elif self._closed:
+                    shutil.rmtree(tmp_dir, ignore_errors=True)
+                    return
+                else:
+                    # Playback may have moved past what was kept in memory
+                    self._fill_window(tmp_dir, durations)
+                img.seek(index)
+                frame, duration = self._scale_frame(img)
+                durations.append(duration)
+                if tmp_dir is not None:
+                    frame.save(tmp_dir / f"{index:05d}.png")
+                self._offer(index, (frame, duration))
+        except Exception:
+            if tmp_dir is not None:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+        if tmp_dir is None:
+            # Keep decoding as playback loops
+            while not self._closed:
+                index = self._next_missing()
+                if index is None:
+                    return
+                img.seek(index)
+                self._offer(index, self._scale_frame(img))
+            return
+
+        with open(tmp_dir / "frames.json", 'w', encoding='utf-8') as f:
+            json.dump({'durations': durations}, f)
+        cache_dir = self.cache_folder / key
+        try:
+            os.replace(tmp_dir, cache_dir)
+        except OSError:
+            # Another loader finished the same image first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        with self._cond:
+            self._cache_dir = cache_dir
+            self._durations = durations
+        self._prune_cache()
+
+    def _serve_from_cache(self):
+        """Load frames from the disk cache as playback moves through them."""
+        while True:
+            index = self._next_missing()
+            if index is None or self._cache_dir is None:
+                return
+            self._offer(index, self._load_cached(self._cache_dir, index, self._durations))
+
+    def _fill_window(self, folder: Path, durations):
+        """Load frames playback needs that were already written to `folder` (doesn't wait)."""
+        with self._cond:
+            wanted = [i for i in self._window() if i not in self._ready and i < len(durations)]
+        for index in wanted:
+            self._offer(index, self._load_cached(folder, index, durations))
+
+    def _load_cached(self, folder: Path, index: int, durations):
+        """Read one scaled frame back from a cache folder."""
+        from PIL import Image
+
+        with Image.open(folder / f"{index:05d}.png") as cached:
+            return cached.convert('RGB'), durations[index]
+
+    def _scale_frame(self, img):
+        """Scale the current frame of an open image."""
+        duration = img.info.get('duration') or DEFAULT_FRAME_MS
+        return self.scale(img.copy(), self.size), duration
+
+    def _window(self):
+        """Indexes that should be in memory, nearest first (caller holds the lock)."""
+        count = self.frame_count or 1
+        return [(self._position + offset) % count for offset in range(min(self.window, count))]
+
+    def _offer(self, index: int, frame):
+        """Keep a frame if it's within the window, dropping the least recently used ones."""
+        with self._cond:
+            if self._closed or index not in self._window():
+                return
+            self._ready[index] = frame
+            self._ready.move_to_end(index)
+            while len(self._ready) > self.window:
+                self._ready.popitem(last=False)
+            self._cond.notify_all()
+
+    def _next_missing(self) -> Optional[int]:
+        """Wait until a frame in the window is missing, and return it (None once closed)."""
+        with self._cond:
+            while not self._closed:
+                wanted = [i for i in self._window() if i not in self._ready]
+                if wanted:
+                    return wanted[0]
+                self._cond.wait()
+            return None
+
+    def _wait_for_room(self, index: int) -> bool:
+        """Wait until frame `index` is within the window (False once closed)."""
+        with self._cond:
+            while not self._closed and index not in self._window():
+                self._cond.wait()
+            return not self._closed
+
+    def _start_cache_dir(self, key: str) -> Optional[Path]:
+        """Make a temp folder for the frames being cached (None if the cache can't be used)."""
+        if self.cache_folder is None:
+            return None
+        tmp_dir = self.cache_folder / f"{key}.tmp{os.getpid()}-{threading.get_ident()}"
+        try:
+            tmp_dir.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            return None
+        return tmp_dir
+
+    def _prune_cache(self):
+        """Delete all but the most recently used cached frame sets (and abandoned temp folders)."""
+        try:
+            entries = [(entry, entry.stat().st_mtime) for entry in self.cache_folder.iterdir()
+                       if entry.is_dir()]
+        except OSError:
+            return
+        now = time.time()
+        cached = []
+        for entry, mtime in entries:
+            if '.tmp' not in entry.name:
+                cached.append((entry, mtime))
+            elif now - mtime > 60 * 60:
+                # Left behind by a run that was closed or crashed while caching
+                shutil.rmtree(entry, ignore_errors=True)
+        cached.sort(key=lambda item: item[1], reverse=True)
+        for entry, _ in cached[self.MAX_CACHED_IMAGES:]:
+            shutil.rmtree(entry, ignore_errors=True)
+
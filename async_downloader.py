@@ -0,0 +1,243 @@
+"""
+Async Downloader
+asyncio counterpart of YouTubeDownloader for programs that run everything
+on an event loop. yt-dlp itself blocks, so each job still runs on a thread,
+but only on a bounded executor owned by the downloader: jobs beyond its size
+wait on the loop (not on threads), progress arrives through an asyncio
+queue, and cancelling a job or its task stops the download underneath.
+
+    async with AsyncYouTubeDownloader(download_folder="downloads") as downloader:
+        job = downloader.start(url, format_type="mp3")
+        async for event in job.events():
+            print(event['type'], event.get('status'))
+        result = await job.result()
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Optional
+
+from bandwidth import NORMAL_PRIORITY, check_weight
+from job_control import CancellationToken
+from postprocess_pipeline import split_formats
+from youtube_downloader import DownloadResult, YouTubeDownloader
+
+
+class AsyncDownloadJob:
+    """
+    One download started by AsyncYouTubeDownloader.start().
+
+    Status, info and finished events are always delivered; progress events
+    are dropped while `max_queued_events` are waiting to be read, so a slow
+    reader never holds up the download (the newest progress is always in
+    `progress`).
+    """
+
+    def __init__(self, owner: 'AsyncYouTubeDownloader', url: str, options: dict,
+                 max_queued_events: int):
+        self.url = url
+        self.options = options
+        self.status = "queued"
+        self.title = None
+        self.progress = None
+        self.token = CancellationToken()
+        # Progress events left out because the reader was behind
+        self.dropped_events = 0
+
+        self._owner = owner
+        self._loop = owner._loop
+        self._max_queued_events = max_queued_events
+        self._queue = asyncio.Queue()
+        self._started = False
+        self._finished_read = False
+        self._result = self._loop.create_future()
+        self._task = self._loop.create_task(self._run())
+        self._task.add_done_callback(self._task_done)
+
+    def done(self) -> bool:
+        """True once the job has a result."""
+        return self._result.done()
+
+    def cancel(self):
+        """Stop the job (a job still waiting for a worker never starts)."""
+        self.token.cancel()
+        if not self._started:
+            self._task.cancel()
+
+    async def result(self) -> DownloadResult:
+        """Wait for the job (including audio conversion) and return its result."""
+        return await asyncio.shield(self._result)
+
+    def __await__(self):
+        return self.result().__await__()
+
+    async def events(self) -> AsyncIterator[dict]:
+        """
+        Yield the job's events until (and including) the "finished" one.
+
+        Events are the dicts described under YouTubeDownloader.start_job();
+        only one reader should iterate them.
+        """
+        while not self._finished_read:
+            event = await self._queue.get()
+            if event['type'] == 'finished':
+                self._finished_read = True
+            yield event
+
+    def _post(self, event: dict):
+        """Called from worker threads: hand an event to the loop."""
+        self._loop.call_soon_threadsafe(self._deliver, event)
+
+    def _deliver(self, event: dict):
+        """Queue an event (runs on the loop)."""
+        if event['type'] == 'status':
+            self.status = event['status']
+        elif event['type'] == 'info':
+            self.title = event.get('title')
+        elif event['type'] == 'progress':
+            self.progress = event
+            if self._queue.qsize() >= self._max_queued_events:
+                self.dropped_events += 1
+                return
+        elif event['type'] == 'finished':
+            self.status = event['status']
+        self._queue.put_nowait(event)
+
+    async def _run(self) -> DownloadResult:
+        # Wait on the loop for a worker, so queued jobs don't tie up threads
+        async with self._owner._slots:
+            self._started = True
+            if self.token.cancelled:
+                return self._end_unstarted()
+            try:
+                result = await self._loop.run_in_executor(self._owner._executor,
+                                                          self._start_job)
+                if result.postprocessing is not None:
+                    result = await asyncio.wrap_future(result.postprocessing)
+            except asyncio.CancelledError:
+                self.token.cancel()
+                raise
+            except Exception as e:
+                result = DownloadResult(url=self.url, status="failed", error=str(e))
+                self._deliver(dict(result.to_dict(), type='finished'))
+            return result
+
+    def _task_done(self, task: asyncio.Task):
+        """Hand the task's outcome to result() (a job cancelled before it started is "cancelled")."""
+        if self._result.done():
+            return
+        if not task.cancelled():
+            if task.exception() is not None:
+                self._result.set_exception(task.exception())
+            else:
+                self._result.set_result(task.result())
+        elif self._started:
+            self.token.cancel()
+            self._result.cancel()
+        else:
+            self._result.set_result(self._end_unstarted())
+
+    def _start_job(self) -> DownloadResult:
+        """Executor thread: run the blocking download stage."""
+        return self._owner.downloader.start_job(self.url, token=self.token, events=self._post,
+                                                **self.options)
+
+    def _end_unstarted(self) -> DownloadResult:
+        result = DownloadResult(url=self.url, status="cancelled")
+        self._deliver(dict(result.to_dict(), type='finished'))
+        return result
+
+
+class AsyncYouTubeDownloader:
+    """Runs YouTubeDownloader jobs for asyncio code on a bounded executor."""
+
+    def __init__(self, downloader: Optional[YouTubeDownloader] = None, max_workers: int = 4,
+                 max_queued_events: int = 100, **downloader_options):
+        """
+        Set up the downloader.
+
+        Args:
+            downloader: Engine to run jobs on (default: a new YouTubeDownloader
+                made from downloader_options)
+            max_workers: Downloads running at once; further jobs wait on the event loop
+            max_queued_events: Unread progress events kept per job before newer ones are dropped
+            downloader_options: YouTubeDownloader arguments (download_folder, use_cache, ...)
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.downloader = downloader or YouTubeDownloader(**downloader_options)
+        self.max_workers = max_workers
+        self.max_queued_events = max_queued_events
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="async-download")
+        # Made on first use, so they belong to the loop that runs the jobs
+        self._loop = None
+        self._slots = None
+        self._jobs = set()
+        self._closed = False
+
+    def start(self, url: str, format_type: str = "mp4", quality: str = "best",
+              fragment_concurrency: Optional[int] = None,
+              priority: float = NORMAL_PRIORITY) -> AsyncDownloadJob:
+        """
+        Start a download without waiting for it (call from the event loop).
+
+        Args:
+            url: YouTube video URL (a playlist URL is downloaded as one job)
+            format_type: Output format (mp4, mp3, ogg, webm, etc.), or several separated by commas
+            quality: Quality setting (best, worst, or specific like 720p, 1080p)
+            fragment_concurrency: DASH/HLS fragments fetched at once (None uses the default)
+            priority: Weight of this job's share of the bandwidth limit
+
+        Raises:
+            ValueError: For an unusable format list or priority
+            RuntimeError: After close(), or from a different event loop
+        """
+        split_formats(format_type)
+        check_weight(priority)
+        if self._closed:
+            raise RuntimeError("The downloader is closed")
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+            self._slots = asyncio.Semaphore(self.max_workers)
+        elif self._loop is not loop:
+            raise RuntimeError("AsyncYouTubeDownloader is bound to a different event loop")
+
+        job = AsyncDownloadJob(self, url, {'format_type': format_type, 'quality': quality,
+                                           'fragment_concurrency': fragment_concurrency,
+                                           'priority': priority}, self.max_queued_events)
+        self._jobs.add(job)
+        job._task.add_done_callback(lambda _: self._jobs.discard(job))
+        return job
+
+    async def download(self, url: str, format_type: str = "mp4", quality: str = "best",
+                       fragment_concurrency: Optional[int] = None,
+                       priority: float = NORMAL_PRIORITY) -> DownloadResult:
+        """
+        Download a video and return its result (see start() for the arguments).
+
+        Cancelling the awaiting task cancels the download.
+        """
+        job = self.start(url, format_type, quality, fragment_concurrency, priority)
+        try:
+            return await job.result()
+        except asyncio.CancelledError:
+            job.cancel()
+            raise
+
+    async def close(self):
+        """Cancel unfinished jobs, wait for them to stop and shut the executor down."""
+        self._closed = True
+        jobs = list(self._jobs)
+        for job in jobs:
+            job.cancel()
+        await asyncio.gather(*(job._task for job in jobs), return_exceptions=True)
+        # Don't block the loop while the worker threads exit
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+
+    async def __aenter__(self) -> 'AsyncYouTubeDownloader':
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
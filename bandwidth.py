@@ -0,0 +1,183 @@
+"""
+Bandwidth Scheduler
+Process-wide download rate limit shared by every running job. Jobs get a
+share of the limit in proportion to their priority weight, and the share of
+jobs that aren't currently downloading goes to the ones that are.
+"""
+
+import math
+import threading
+import time
+from typing import Optional
+
+
+# Priority weights for jobs
+LOW_PRIORITY = 0.5
+NORMAL_PRIORITY = 1.0
+HIGH_PRIORITY = 4.0
+
+
+def check_weight(weight: float) -> float:
+    """
+    Return a priority weight as a float, or raise ValueError if it isn't usable.
+
+    A weight of 0 would give a job no rate at all and a negative one would
+    let it skip throttling, so only finite weights above 0 are accepted.
+    """
+    weight = float(weight)
+    if not math.isfinite(weight) or weight <= 0:
+        raise ValueError(f"Priority must be a finite number above 0, not {weight}")
+    return weight
+
+
+class _JobShare:
+    """Book-keeping for one job using the scheduler."""
+
+    __slots__ = ('weight', 'ready_at', 'last_seen')
+
+    def __init__(self, weight: float):
+        self.weight = weight
+        # Time at which the bytes the job has already taken are paid off
+        self.ready_at = 0.0
+        self.last_seen = 0.0
+
+
+class BandwidthScheduler:
+    """
+    Weighted fair token bucket for all downloads in the process.
+
+    Each job is throttled from its yt-dlp progress hook: the bytes it just
+    received are charged against its share of the global rate, and the hook
+    sleeps until that debt is paid off. Sleeping in the hook stops the
+    download thread from reading, so the link itself slows down.
+    """
+
+    # Seconds of its share an idle job may use in one go when it starts again
+    BURST_SECONDS = 0.5
+    # Jobs that took bandwidth this recently count towards the fair split
+    ACTIVE_WINDOW = 1.0
+    # Longest single sleep, so rate changes and cancellation are noticed quickly
+    MAX_WAIT = 0.25
+
+    def __init__(self, rate: Optional[float] = None):
+        """
+        Create a scheduler.
+
+        Args:
+            rate: Global limit in bytes per second (None for unlimited)
+        """
+        self._cond = threading.Condition()
+        self._rate = rate or None
+        self._jobs = {}
+
+    @property
+    def rate(self) -> Optional[float]:
+        """Current global limit in bytes per second (None if unlimited)."""
+        return self._rate
+
+    def set_rate(self, rate: Optional[float]):
+        """Change the global limit while downloads are running (None or 0 removes it)."""
+        rate = rate or None
+        with self._cond:
+            if self._rate and rate:
+                # Rescale what waiting jobs still owe so the new rate applies straight away
+                now = time.monotonic()
+                for share in self._jobs.values():
+                    if share.ready_at > now:
+                        share.ready_at = now + (share.ready_at - now) * self._rate / rate
+            self._rate = rate
+            self._cond.notify_all()
+
+    def set_weight(self, key, weight: float):
+        """Change a job's priority weight (ValueError unless it's finite and above 0)."""
+        weight = check_weight(weight)
+        with self._cond:
+            self._share(key).weight = weight
+
+    def release(self, key):
+        """Forget a finished job."""
+        with self._cond:
+            self._jobs.pop(key, None)
+
+    def consume(self, key, nbytes: int, token=None):
+        """
+        Charge a job for bytes it received, waiting until its share allows more.
+
+        Args:
+            key: Any hashable that identifies the job
+            nbytes: Bytes received since the last call
+            token: Optional CancellationToken; waiting stops once it's cancelled
+        """
+        with self._cond:
+            share = self._share(key)
+            now = time.monotonic()
+            share.last_seen = now
+            if not self._rate:
+                return
+
+            job_rate = self._rate * share.weight / self._active_weight(now)
+            share.ready_at = max(share.ready_at, now - self.BURST_SECONDS) + nbytes / job_rate
+
+            while self._rate and share.ready_at > now:
+                if token is not None and token.cancelled:
+                    return
+                self._cond.wait(min(share.ready_at - now, self.MAX_WAIT))
+                now = time.monotonic()
+                share.last_seen = now
+
+    def attach(self, ydl_opts: dict, key, weight: float = NORMAL_PRIORITY, token=None) -> dict:
+        """
+        Add a progress hook that throttles a job through this scheduler.
+
+        Args:
+            ydl_opts: yt-dlp options to add the hook to
+            key: Hashable identifying the job (pass the same key to set_weight/release)
+            weight: The job's priority weight (finite and above 0)
+            token: Optional CancellationToken for the job
+
+        Returns:
+            The same options dict
+
+        Raises:
+            ValueError: For an unusable weight
+        """
+        weight = check_weight(weight)
+        with self._cond:
+            self._share(key).weight = weight
+
+        lock = threading.Lock()
+        seen_bytes = {}
+
+        def hook(d):
+            if d.get('status') != 'downloading':
+                return
+            downloaded = d.get('downloaded_bytes') or 0
+            with lock:
+                # The first report of a resumed file starts at the resume offset
+                previous = seen_bytes.setdefault(d.get('filename'), downloaded)
+                seen_bytes[d.get('filename')] = max(previous, downloaded)
+            if downloaded > previous:
+                self.consume(key, downloaded - previous, token)
+
+        ydl_opts['progress_hooks'] = list(ydl_opts.get('progress_hooks', [])) + [hook]
+        return ydl_opts
+
+    def _share(self, key) -> _JobShare:
+        """Get (or create) a job's share (caller holds the lock)."""
+        share = self._jobs.get(key)
+        if share is None:
+            share = self._jobs[key] = _JobShare(NORMAL_PRIORITY)
+        return share
+
+    def _active_weight(self, now: float) -> float:
+        """Total weight of jobs that are downloading right now (caller holds the lock)."""
+        return sum(share.weight for share in self._jobs.values()
+                   if now - share.last_seen < self.ACTIVE_WINDOW) or 1.0
+
+
+_shared = BandwidthScheduler()
+
+
+def shared_scheduler() -> BandwidthScheduler:
+    """The scheduler every downloader in this process uses by default."""
+    return _shared
@@ -0,0 +1,111 @@
+"""
+Download Archive
+Remembers which videos have already been downloaded (per extractor, video id
+and requested format), so batch runs can skip them before any extraction.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+
+
+class DownloadArchive:
+    """
+    Append-only archive file backed by an in-memory set.
+
+    Each line is "<extractor> <video id> <format key>". The whole file is
+    read once when the archive is opened; after that lookups are a set
+    membership test. Lines appended by another process (e.g. the GUI and
+    the command line sharing a download folder) are picked up by reading
+    only the new tail of the file.
+    """
+
+    def __init__(self, archive_path):
+        """
+        Open (or create) the archive.
+
+        Args:
+            archive_path: Path of the archive text file
+        """
+        self.archive_path = Path(archive_path)
+        self.archive_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._entries = set()
+        # How much of the file has been read into _entries so far
+        self._offset = 0
+        with self._lock:
+            self._refresh()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def contains(self, extractor: str, video_id: str, format_key: str) -> bool:
+        """Check if a video has already been downloaded in this format."""
+        entry = _line(extractor, video_id, format_key)
+        with self._lock:
+            if entry in self._entries:
+                return True
+            self._refresh()
+            return entry in self._entries
+
+    def add(self, extractor: str, video_id: str, format_key: str):
+        """Record a finished download."""
+        entry = _line(extractor, video_id, format_key)
+        with self._lock:
+            self._refresh()
+            if entry in self._entries:
+                return
+            # One write() of a whole line with O_APPEND, so lines from different
+            # threads or processes never interleave
+            fd = os.open(self.archive_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, (entry + '\n').encode('utf-8'))
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._entries.add(entry)
+
+    def _refresh(self):
+        """Read lines added to the file since the last read (caller holds the lock)."""
+        try:
+            size = os.path.getsize(self.archive_path)
+        except OSError:
+            return
+        if size < self._offset:
+            # The file was replaced or truncated - start over
+            self._entries.clear()
+            self._offset = 0
+        if size == self._offset:
+            return
+
+        with open(self.archive_path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # Leave a half-written last line for the next refresh
+        end = data.rfind(b'\n') + 1
+        for raw in data[:end].splitlines():
+            line = raw.decode('utf-8', 'replace').strip()
+            if line:
+                self._entries.add(line)
+        self._offset += end
+
+
+def requested_format(format_type: str, quality: str) -> str:
+    """Key for the requested output, e.g. "mp4-720p" (an mp3 and an mp4 are different entries)."""
+    return f"{format_type}-{quality}".replace(' ', '_')
+
+
+def archive_key(info: Optional[dict]):
+    """(extractor, video id) of a single video's info dict, or None for anything else."""
+    if not info or info.get('_type', 'video') != 'video':
+        return None
+    if not info.get('extractor_key') or not info.get('id'):
+        return None
+    return info['extractor_key'], str(info['id'])
+
+
+def _line(extractor: str, video_id: str, format_key: str) -> str:
+    """Archive line for an entry (spaces would break the format, so they're replaced)."""
+    return ' '.join(part.replace(' ', '_') for part in (extractor.lower(), video_id, format_key))
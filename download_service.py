@@ -0,0 +1,461 @@
+"""
+Download Service
+Headless mode for servers: one long-running process that takes download
+jobs over a local HTTP API and runs them on a worker pool. Every job shares
+the same warm downloader (metadata cache, FFmpeg lookup, tuned fragment
+concurrency, bandwidth limit), and its progress can be followed as a stream
+of server-sent events.
+
+    POST   /jobs              {"url": ...} or {"urls": [...]}, plus optional
+                              "format", "quality", "priority", "fragment_concurrency"
+    GET    /jobs              every job the service knows about
+    GET    /jobs/<id>         one job
+    DELETE /jobs/<id>         cancel a job (POST /jobs/<id>/cancel does the same)
+    GET    /jobs/<id>/events  progress as server-sent events, until the job ends
+    GET    /stats             queue depth and throughput of the pipeline stages
+"""
+
+import argparse
+import itertools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from bandwidth import NORMAL_PRIORITY, check_weight
+from job_control import CancellationToken
+from job_journal import CANCELLED
+from postprocess_pipeline import split_formats
+
+
+# Only reachable from this machine unless asked otherwise
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Finished jobs remembered for GET /jobs (oldest forgotten first)
+MAX_FINISHED_JOBS = 1000
+# Events kept per job for clients that connect late (the newest are kept)
+MAX_JOB_EVENTS = 200
+# Seconds between keep-alive comments on an idle event stream
+KEEPALIVE_SECONDS = 15
+# Largest request body accepted
+MAX_REQUEST_BYTES = 1024 * 1024
+
+# Job states reported by the API
+QUEUED = "queued"
+# "interrupted" jobs were stopped by a shutdown and are resumed on the next start
+FINISHED_STATES = ("completed", "skipped", "failed", "cancelled", "interrupted")
+
+
+class ServiceJob:
+    """One submitted download, its latest state and its recent events."""
+
+    def __init__(self, job_id: str, url: str, options: dict):
+        self.job_id = job_id
+        self.url = url
+        self.options = options
+        self.status = QUEUED
+        self.title = None
+        self.progress = None
+        self.result = None
+        self.submitted_at = time.time()
+        self.token = CancellationToken()
+        self.future: Optional[Future] = None
+
+        self._cond = threading.Condition()
+        # (sequence number, event), oldest first
+        self._events = deque(maxlen=MAX_JOB_EVENTS)
+        self._seq = itertools.count(1)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    def add_event(self, event: dict):
+        """Record an event from the downloader (called from worker threads)."""
+        with self._cond:
+            if self.finished:
+                # A job cancelled while queued may still report in; its end is already known
+                return
+            if event['type'] == 'status':
+                self.status = event['status']
+            elif event['type'] == 'info':
+                self.title = event.get('title')
+            elif event['type'] == 'progress':
+                self.progress = {key: value for key, value in event.items() if key != 'type'}
+            elif event['type'] == 'finished':
+                self.status = event['status']
+                self.title = event.get('title') or self.title
+                self.result = {key: value for key, value in event.items() if key != 'type'}
+            self._events.append((next(self._seq), dict(event, job_id=self.job_id)))
+            self._cond.notify_all()
+
+    def events_after(self, seq: int, timeout: float) -> Tuple[List[Tuple[int, dict]], bool]:
+        """
+        Wait for events newer than `seq`.
+
+        Returns:
+            (new events, whether the job has finished) - the list is empty if
+            nothing happened within the timeout
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self.finished or (bool(self._events) and
+                                                          self._events[-1][0] > seq), timeout)
+            return [item for item in self._events if item[0] > seq], self.finished
+
+    def to_dict(self) -> dict:
+        """State of the job as returned by the API."""
+        with self._cond:
+            return {'id': self.job_id,
+                    'url': self.url,
+                    'status': self.status,
+                    'title': self.title,
+                    'format': self.options['format_type'],
+                    'quality': self.options['quality'],
+                    'submitted_at': self.submitted_at,
+                    'progress': self.progress,
+                    'result': self.result}
+
+
+class DownloadService:
+    """Runs submitted jobs on a shared YouTubeDownloader and keeps track of them."""
+
+    def __init__(self, downloader, workers: int = 4):
+        """
+        Set up the service (jobs can be submitted straight away).
+
+        Args:
+            downloader: YouTubeDownloader every job runs on
+            workers: Maximum number of downloads running at once
+        """
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.downloader = downloader
+        self.workers = workers
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="service")
+        self._lock = threading.Lock()
+        # job id -> ServiceJob, oldest first
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._closed = False
+
+    def resume_unfinished(self) -> List[ServiceJob]:
+        """Queue the jobs the journal says were interrupted when the service last stopped."""
+        journal = self.downloader.journal
+        if journal is None:
+            return []
+        return [self.submit(entry.url, entry.options.get('format_type', 'mp4'),
+                            entry.options.get('quality', 'best'),
+                            entry.options.get('priority', NORMAL_PRIORITY),
+                            entry.options.get('fragment_concurrency'),
+                            journal_id=entry.job_id)
+                for entry in journal.claim_unfinished()]
+
+    def submit(self, url: str, format_type: str = "mp4", quality: str = "best",
+               priority: float = NORMAL_PRIORITY, fragment_concurrency: Optional[int] = None,
+               journal_id: Optional[str] = None) -> ServiceJob:
+        """
+        Queue a download.
+
+        Raises:
+            ValueError: For an unusable format list or priority
+            RuntimeError: If the service is shutting down
+        """
+        split_formats(format_type)
+        priority = check_weight(priority)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The service is shutting down")
+            journal = self.downloader.journal
+            if journal is not None and journal_id is None:
+                # Journaled straight away, so jobs still waiting for a worker survive a restart
+                journal_id = journal.add(url, {'format_type': format_type, 'quality': quality,
+                                               'fragment_concurrency': fragment_concurrency,
+                                               'priority': priority})
+            options = {'format_type': format_type, 'quality': quality, 'priority': priority,
+                       'fragment_concurrency': fragment_concurrency, 'journal_id': journal_id}
+            job = ServiceJob(str(next(self._ids)), url, options)
+            self._jobs[job.job_id] = job
+            self._forget_finished()
+            job.future = self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[ServiceJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self) -> List[ServiceJob]:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id: str) -> Optional[ServiceJob]:
+        """Cancel a queued or running job (None if there is no such job)."""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.token.cancel()
+        if job.future is not None and job.future.cancel():
+            # It never started, so nothing else will report its end
+            self._end_unstarted(job)
+        return job
+
+    def stats(self) -> dict:
+        """Pipeline stats plus how many jobs the service holds in each state."""
+        states = {}
+        for job in self.jobs():
+            states[job.status] = states.get(job.status, 0) + 1
+        return dict(self.downloader.pipeline_stats(), jobs=states, workers=self.workers)
+
+    def close(self):
+        """
+        Stop taking jobs and stop everything queued or running.
+
+        The jobs are interrupted rather than cancelled: they stay unfinished
+        in the journal, with their partial files, so the next start resumes them.
+        """
+        with self._lock:
+            self._closed = True
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            if not job.finished:
+                job.token.cancel(interrupt=True)
+                if job.future is not None and job.future.cancel():
+                    self._end_unstarted(job)
+        self._pool.shutdown(wait=True)
+
+    def _run(self, job: ServiceJob):
+        """Worker thread: run the job's download (conversion finishes on its own pool)."""
+        if job.token.cancelled:
+            self._end_unstarted(job)
+            return
+        try:
+            self.downloader.start_job(job.url, job.options['format_type'],
+                                      job.options['quality'], token=job.token,
+                                      events=job.add_event,
+                                      fragment_concurrency=job.options['fragment_concurrency'],
+                                      priority=job.options['priority'],
+                                      journal_id=job.options['journal_id'])
+        except Exception as e:
+            job.add_event({'type': 'finished', 'url': job.url, 'status': 'failed',
+                           'error': str(e)})
+
+    def _end_unstarted(self, job: ServiceJob):
+        """Report the end of a job that never started (and record a real cancel in the journal)."""
+        status = "interrupted" if job.token.interrupted else "cancelled"
+        journal_id = job.options['journal_id']
+        if status == "cancelled" and journal_id is not None:
+            self.downloader.journal.finish(journal_id, CANCELLED)
+        now = time.time()
+        job.add_event({'type': 'finished', 'url': job.url, 'status': status,
+                       'title': None, 'output_path': None, 'output_paths': [], 'bytes': 0,
+                       'started_at': now, 'finished_at': now, 'duration': 0.0,
+                       'error': None, 'index': 0})
+
+    def _forget_finished(self):
+        """Drop the oldest finished jobs past MAX_FINISHED_JOBS (caller holds the lock)."""
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job_id]
+
+
+class ServiceHTTPServer(ThreadingHTTPServer):
+    """HTTP server that hands requests to a DownloadService."""
+
+    daemon_threads = True
+
+    def __init__(self, address, service: DownloadService, quiet: bool = False):
+        super().__init__(address, ServiceRequestHandler)
+        self.service = service
+        self.quiet = quiet
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """JSON API over a DownloadService (see the module docstring for the routes)."""
+
+    server_version = "InGenDownloadService/1.0"
+
+    def do_GET(self):
+        parts = self._path_parts()
+        service = self.server.service
+        if parts == ['jobs']:
+            self._send_json(200, {'jobs': [job.to_dict() for job in service.jobs()]})
+        elif parts == ['stats']:
+            self._send_json(200, service.stats())
+        elif len(parts) == 2 and parts[0] == 'jobs':
+            self._with_job(parts[1], lambda job: self._send_json(200, job.to_dict()))
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'events':
+            self._with_job(parts[1], self._stream_events)
+        else:
+            self._send_error(404, "Not found")
+
+    def do_POST(self):
+        parts = self._path_parts()
+        if parts == ['jobs']:
+            self._submit()
+        elif len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'cancel':
+            self._cancel(parts[1])
+        else:
+            self._send_error(404, "Not found")
+
+    def do_DELETE(self):
+        parts = self._path_parts()
+        if len(parts) == 2 and parts[0] == 'jobs':
+            self._cancel(parts[1])
+        else:
+            self._send_error(404, "Not found")
+
+    def _submit(self):
+        try:
+            body = self._read_json()
+            urls = body['urls'] if 'urls' in body else [body.get('url')]
+            # A lone string would otherwise be queued one character at a time
+            if (not isinstance(urls, list) or not urls
+                    or not all(isinstance(url, str) and url.strip() for url in urls)):
+                raise ValueError("Give a \"url\" string or a list of \"urls\"")
+            format_type = str(body.get('format', 'mp4')).lower()
+            quality = str(body.get('quality', 'best')).lower()
+            priority = check_weight(body.get('priority', NORMAL_PRIORITY))
+            fragments = body.get('fragment_concurrency')
+            fragments = int(fragments) if fragments is not None else None
+            if fragments is not None and fragments < 1:
+                raise ValueError("\"fragment_concurrency\" must be at least 1")
+            split_formats(format_type)
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_error(400, str(e))
+            return
+
+        try:
+            jobs = [self.server.service.submit(url.strip(), format_type, quality, priority, fragments)
+                    for url in urls]
+        except RuntimeError as e:
+            self._send_error(503, str(e))
+            return
+        self._send_json(202, {'jobs': [job.to_dict() for job in jobs]})
+
+    def _cancel(self, job_id: str):
+        job = self.server.service.cancel(job_id)
+        if job is None:
+            self._send_error(404, f"No job {job_id}")
+        else:
+            self._send_json(202, job.to_dict())
+
+    def _stream_events(self, job: ServiceJob):
+        """Send the job's events as server-sent events until it has finished."""
+        try:
+            last_seq = int(self.headers.get('Last-Event-ID', 0))
+        except ValueError:
+            last_seq = 0
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+        try:
+            while True:
+                events, finished = job.events_after(last_seq, KEEPALIVE_SECONDS)
+                if not events and not finished:
+                    self.wfile.write(b": keep-alive\n\n")
+                for seq, event in events:
+                    self.wfile.write(f"id: {seq}\nevent: {event['type']}\n"
+                                     f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                    last_seq = seq
+                self.wfile.flush()
+                if finished:
+                    # The finished event is recorded with the state, so it was just sent
+                    return
+        except (BrokenPipeError, ConnectionResetError):
+            # The client went away; the job itself carries on
+            pass
+
+    def _with_job(self, job_id: str, handler):
+        job = self.server.service.get(job_id)
+        if job is None:
+            self._send_error(404, f"No job {job_id}")
+        else:
+            handler(job)
+
+    def _path_parts(self) -> List[str]:
+        return [part for part in urlsplit(self.path).path.split('/') if part]
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_REQUEST_BYTES:
+            raise ValueError("Request body is too large")
+        body = json.loads(self.rfile.read(length) or b'{}')
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        return body
+
+    def _send_json(self, code: int, data: dict):
+        payload = json.dumps(data).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, code: int, message: str):
+        self._send_json(code, {'error': message})
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+
+def serve(download_folder: str = "downloads", host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+          workers: int = 4, resume: bool = True, quiet: bool = False):
+    """
+    Run the service until interrupted (Ctrl+C or SIGINT).
+
+    Jobs still queued or running when it stops are interrupted: they stay
+    unfinished in the journal, with their partial files, and the next start
+    resumes them.
+
+    Args:
+        download_folder: Folder downloads are saved to
+        host: Address to listen on (the default only accepts local connections)
+        port: Port to listen on
+        workers: Maximum number of downloads running at once
+        resume: Queue jobs left unfinished by the last run on startup
+        quiet: Don't log every request
+    """
+    from youtube_downloader import YouTubeDownloader
+
+    downloader = YouTubeDownloader(download_folder=download_folder)
+    service = DownloadService(downloader, workers=workers)
+    server = ServiceHTTPServer((host, port), service, quiet=quiet)
+    if resume:
+        resumed = service.resume_unfinished()
+        if resumed:
+            print(f"↩️ Resuming {len(resumed)} unfinished download(s) from last time")
+    print(f"🛰️ Download service listening on http://{host}:{server.server_address[1]} "
+          f"({workers} workers, saving to {downloader.download_folder})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the downloader as a local HTTP job service.")
+    parser.add_argument('--folder', default="downloads", help="download folder (default: downloads)")
+    parser.add_argument('--host', default=DEFAULT_HOST, help=f"address to listen on (default: {DEFAULT_HOST})")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f"port (default: {DEFAULT_PORT})")
+    parser.add_argument('--workers', type=int, default=4, help="downloads running at once (default: 4)")
+    parser.add_argument('--no-resume', action='store_true',
+                        help="don't resume jobs left unfinished by the last run")
+    parser.add_argument('--quiet', action='store_true', help="don't log every request")
+    args = parser.parse_args()
+    serve(args.folder, args.host, args.port, args.workers, not args.no_resume, args.quiet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+FFmpeg Locator
+Finds FFmpeg/FFprobe once (on any OS), probes their versions and encoders,
+and caches the result on disk until the binary changes.
+"""
+
+import json
+import os
+import shutil
+import subprocess
+import threading
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+
+@dataclass
+class FFmpegInfo:
+    """What we know about the FFmpeg install on this machine."""
+
+    ffmpeg_path: Optional[str] = None
+    ffprobe_path: Optional[str] = None
+    ffmpeg_version: Optional[str] = None
+    ffprobe_version: Optional[str] = None
+    encoders: List[str] = field(default_factory=list)
+    # Used to tell whether a cached probe still matches the binary on disk
+    ffmpeg_mtime: Optional[float] = None
+
+    @property
+    def available(self) -> bool:
+        """True if an ffmpeg binary was found."""
+        return self.ffmpeg_path is not None
+
+    @property
+    def location(self) -> Optional[str]:
+        """Folder holding ffmpeg, in the form yt-dlp's 'ffmpeg_location' option expects."""
+        return str(Path(self.ffmpeg_path).parent) if self.ffmpeg_path else None
+
+    def has_encoder(self, name: str) -> bool:
+        """Check if ffmpeg was built with an encoder (e.g. "libmp3lame", "aac")."""
+        return name in self.encoders
+
+
+_lock = threading.Lock()
+_memo: Optional[FFmpegInfo] = None
+
+
+def locate_ffmpeg(cache_file=None, refresh: bool = False) -> FFmpegInfo:
+    """
+    Find FFmpeg and describe it.
+
+    Looking the binary up on PATH is cheap, so it happens on every call. The
+    expensive part - running ffmpeg/ffprobe to read versions and encoders -
+    only happens when the binary's path or modification time changed since
+    the last probe (kept in memory and, if given, in cache_file).
+
+    Args:
+        cache_file: JSON file to keep the probe result in between runs
+        refresh: Probe again even if the cached result still looks valid
+
+    Returns:
+        FFmpegInfo (with available == False if FFmpeg isn't installed)
+    """
+    global _memo
+
+    ffmpeg_path = shutil.which('ffmpeg')
+    ffmpeg_mtime = _mtime(ffmpeg_path)
+
+    with _lock:
+        if not refresh and _matches(_memo, ffmpeg_path, ffmpeg_mtime):
+            return _memo
+
+        info = None if refresh else _read_cache(cache_file)
+        if not _matches(info, ffmpeg_path, ffmpeg_mtime):
+            info = _probe(ffmpeg_path, ffmpeg_mtime)
+            _write_cache(cache_file, info)
+
+        _memo = info
+        return info
+
+
+def _matches(info: Optional[FFmpegInfo], ffmpeg_path, ffmpeg_mtime) -> bool:
+    """Check if a probe result describes the binary currently on PATH."""
+    return (info is not None
+            and info.ffmpeg_path == ffmpeg_path
+            and info.ffmpeg_mtime == ffmpeg_mtime)
+
+
+def _probe(ffmpeg_path: Optional[str], ffmpeg_mtime: Optional[float]) -> FFmpegInfo:
+    """Run ffmpeg/ffprobe to find out their versions and the available encoders."""
+    if ffmpeg_path is None:
+        return FFmpegInfo()
+
+    # ffprobe normally sits right next to ffmpeg
+    ffprobe_path = shutil.which('ffprobe', path=str(Path(ffmpeg_path).parent)) or shutil.which('ffprobe')
+
+    return FFmpegInfo(
+        ffmpeg_path=ffmpeg_path,
+        ffprobe_path=ffprobe_path,
+        ffmpeg_version=_read_version(ffmpeg_path),
+        ffprobe_version=_read_version(ffprobe_path) if ffprobe_path else None,
+        encoders=_read_encoders(ffmpeg_path),
+        ffmpeg_mtime=ffmpeg_mtime,
+    )
+
+
+def _run(args: List[str]) -> str:
+    """Run a command and return its stdout ("" if it fails)."""
+    try:
+        result = subprocess.run(args, capture_output=True, text=True, timeout=10,
+                                stdin=subprocess.DEVNULL)
+        return result.stdout if result.returncode == 0 else ""
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _read_version(binary: str) -> Optional[str]:
+    """Get the version from the first line, e.g. "ffmpeg version 6.1.1 Copyright ..."."""
+    first_line = _run([binary, '-hide_banner', '-version']).split('\n', 1)[0].split()
+    if len(first_line) >= 3 and first_line[1] == 'version':
+        return first_line[2]
+    return None
+
+
+def _read_encoders(binary: str) -> List[str]:
+    """List encoder names from `ffmpeg -encoders` (the lines after the "------" marker)."""
+    encoders = []
+    seen_marker = False
+    for line in _run([binary, '-hide_banner', '-encoders']).splitlines():
+        if not seen_marker:
+            seen_marker = line.strip().startswith('---')
+            continue
+        parts = line.split()
+        if len(parts) >= 2:
+            encoders.append(parts[1])
+    return encoders
+
+
+def _mtime(path: Optional[str]) -> Optional[float]:
+    """Modification time of a file, or None if there is no file."""
+    if path is None:
+        return None
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _read_cache(cache_file) -> Optional[FFmpegInfo]:
+    """Load a saved probe result, ignoring missing or broken files."""
+    if cache_file is None:
+        return None
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return FFmpegInfo(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _write_cache(cache_file, info: FFmpegInfo):
+    """Save a probe result (written to a temp file first so it's never half-written)."""
+    if cache_file is None:
+        return
+    cache_file = Path(cache_file)
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = cache_file.with_name(cache_file.name + '.tmp')
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(asdict(info), f)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
@@ -0,0 +1,311 @@
+"""
+Format Planner
+Picks what to download from the formats list of an info dict instead of a
+hand-written yt-dlp selector string. Every candidate - a single file, or a
+video stream and an audio stream that have to be merged - is scored on how
+close it gets to the wanted resolution, how many bytes it costs, and how
+much FFmpeg work it needs afterwards, and the winner says why it won.
+
+The extractor's own rankings come first, the way they do in yt-dlp's
+format sort: formats the extractor marks as less preferred (`preference`)
+and audio tracks that aren't the original language (`language_preference`,
+e.g. dubs) only win when nothing better is offered. DRM protected formats
+can't be downloaded and are left out.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from postprocess_pipeline import AUDIO_FORMATS, normalize_codec
+
+
+# Cost points (lower is better). Missing the target resolution completely
+# costs RESOLUTION_WEIGHT; smaller shortfalls cost proportionally less.
+RESOLUTION_WEIGHT = 100.0
+# Audio below this bitrate (kbit/s) counts as a shortfall, weighted by AUDIO_WEIGHT
+AUDIO_BITRATE_TARGET = 128
+AUDIO_WEIGHT = 30.0
+# Two downloads plus an FFmpeg merge
+MERGE_COST = 3.0
+# Merged streams that aren't native to the target container (e.g. VP9 into MP4,
+# which a lot of players can't handle)
+REMUX_COST = 5.0
+# A single file that comes out in a different container than the one asked for
+CONTAINER_COST = 20.0
+# Audio that has to be re-encoded instead of copied (see convert_audio)
+TRANSCODE_COST = 15.0
+# The largest candidate costs this much for its size, the others in proportion
+SIZE_WEIGHT = 10.0
+
+# Audio extensions each video container holds natively (None: anything goes)
+VIDEO_CONTAINERS = {
+    'mp4': ('m4a', 'mp4'),
+    'webm': ('webm',),
+    'mkv': None,
+}
+
+
+@dataclass
+class FormatChoice:
+    """One way to get the requested output, with its score."""
+    # A single format dict, or [video format, audio format] to be merged
+    formats: List[dict]
+    cost: float = 0.0
+    height: Optional[int] = None
+    estimated_bytes: Optional[int] = None
+    needs_merge: bool = False
+    needs_transcode: bool = False
+    # Human readable notes on what the cost is made of
+    reasons: List[str] = field(default_factory=list)
+
+    @property
+    def format_spec(self) -> str:
+        """yt-dlp format string for this choice (e.g. "137+140")."""
+        return '+'.join(str(f['format_id']) for f in self.formats)
+
+    def explain(self) -> str:
+        """One-line summary, e.g. "137+140: 1080p, ~85.2MB, merge (cost 13.0)"."""
+        return f"{self.format_spec}: {', '.join(self.reasons)} (cost {self.cost:.1f})"
+
+
+def plan_format(info: Optional[dict], format_type: str, quality: str = 'best',
+                can_merge: bool = True) -> Optional[FormatChoice]:
+    """
+    Pick the cheapest way to get a video in the requested format and quality.
+
+    Args:
+        info: Info dict of a single video (playlists have no formats and give None)
+        format_type: Output format (mp4, webm, mkv or one of AUDIO_FORMATS)
+        quality: best, worst, or a height like 720p
+        can_merge: Whether FFmpeg is there to merge separate video and audio streams
+
+    Returns:
+        The best FormatChoice, or None if there is nothing to choose from
+    """
+    if not info or not info.get('formats'):
+        return None
+    ranking = rank_formats(info['formats'], format_type, quality,
+                           duration=info.get('duration'), can_merge=can_merge)
+    return ranking[0] if ranking else None
+
+
+def selector_options(format_type: str, quality: str = 'best', can_merge: bool = True) -> dict:
+    """
+    yt-dlp selector options for a format, used when no plan can be made and
+    as the fallback after the planned spec.
+
+    Args:
+        format_type: Output format (mp4, webm, mkv or one of AUDIO_FORMATS)
+        quality: best, worst, or a height like 720p
+        can_merge: Whether FFmpeg is there to merge separate video and audio streams
+
+    Returns:
+        Dict with 'format', plus 'merge_output_format' for merged video
+    """
+    format_type = format_type.lower()
+    if format_type in AUDIO_FORMATS:
+        # Streams that the target can hold as-is come first, so they're copied
+        return {'format': AUDIO_FORMATS[format_type]['selector']}
+    if format_type not in VIDEO_CONTAINERS:
+        return {'format': 'best'}
+
+    # mkv holds anything, so any stream will do
+    video_ext = f'[ext={format_type}]' if VIDEO_CONTAINERS[format_type] else ''
+    audio_ext = f'[ext={VIDEO_CONTAINERS[format_type][0]}]' if VIDEO_CONTAINERS[format_type] else ''
+    if quality == 'worst':
+        merged = [f'worstvideo{video_ext}+worstaudio{audio_ext}']
+        single = [f'worst{video_ext}', 'worst']
+    else:
+        height = _quality_height(quality)
+        limit = f'[height<={height}]' if height else ''
+        merged = [f'bestvideo{limit}{video_ext}+bestaudio{audio_ext}']
+        single = [f'best{limit}{video_ext}', f'best{limit}', 'best']
+    if not can_merge:
+        # Without FFmpeg only files that already hold video and audio work
+        return {'format': '/'.join(dict.fromkeys(single))}
+    return {'format': '/'.join(dict.fromkeys(merged + single)), 'merge_output_format': format_type}
+
+
+def rank_formats(formats: List[dict], format_type: str, quality: str = 'best',
+                 duration: Optional[float] = None, can_merge: bool = True) -> List[FormatChoice]:
+    """
+    Score every candidate for the requested output, cheapest first.
+
+    Args:
+        formats: The 'formats' list of an info dict
+        format_type: Output format (mp4, webm, mkv or one of AUDIO_FORMATS)
+        quality: best, worst, or a height like 720p
+        duration: Video length in seconds (to estimate sizes from bitrates)
+        can_merge: Whether separate video and audio streams may be merged
+
+    Returns:
+        Every candidate with its cost and reasons, lowest cost first
+    """
+    format_type = format_type.lower()
+    usable = [f for f in formats if f.get('format_id') and not f.get('has_drm')
+              and (_has_video(f) or _has_audio(f))]
+    video_only = [f for f in usable if _has_video(f) and not _has_audio(f)]
+    audio_only = [f for f in usable if _has_audio(f) and not _has_video(f)]
+    complete = [f for f in usable if _has_video(f) and _has_audio(f)]
+
+    if format_type in AUDIO_FORMATS:
+        choices = [FormatChoice([f]) for f in audio_only + complete]
+    else:
+        choices = [FormatChoice([f]) for f in complete]
+        if can_merge:
+            choices += [FormatChoice([video, audio], needs_merge=True)
+                        for video in video_only for audio in audio_only]
+        choices = _within_quality(choices, quality)
+
+    for choice in choices:
+        choice.estimated_bytes = _estimate_bytes(choice.formats, duration)
+    largest = max((c.estimated_bytes for c in choices if c.estimated_bytes), default=0)
+    target_height = _target_height(choices, quality)
+
+    best_language = max((_language_preference(c) for c in choices), default=-1)
+    for choice in choices:
+        if format_type in AUDIO_FORMATS:
+            _score_audio_target(choice, format_type)
+        else:
+            _score_video_target(choice, format_type, target_height)
+        if _language_preference(choice) < best_language:
+            choice.reasons.append(f"{choice.formats[-1].get('language') or 'other'} audio track")
+        _score_size(choice, largest)
+
+    # The extractor's preference and the audio language rank before any cost,
+    # then the extractor's quality rank breaks ties. After that the format
+    # listed later wins: this info comes straight from the extractor (yt-dlp
+    # hasn't sorted it), and extractors list formats from worst to best
+    order = {id(f): index for index, f in enumerate(formats)}
+    choices.sort(key=lambda c: (-_preference(c), -_language_preference(c), round(c.cost, 6),
+                                -_quality(c), -max(order[id(f)] for f in c.formats)))
+    return choices
+
+
+def _score_video_target(choice: FormatChoice, format_type: str, target_height: Optional[int]):
+    """Add resolution, audio and container costs for a video output."""
+    video = choice.formats[0]
+    audio = choice.formats[-1]
+    choice.height = video.get('height')
+
+    if target_height:
+        height = choice.height or 0
+        shortfall = max(0, target_height - height) / target_height
+        choice.cost += RESOLUTION_WEIGHT * shortfall
+        choice.reasons.append(f"{height}p of {target_height}p" if height else "height unknown")
+
+    choice.cost += _audio_shortfall(audio, choice)
+
+    native_audio = VIDEO_CONTAINERS.get(format_type)
+    if choice.needs_merge:
+        choice.cost += MERGE_COST
+        choice.reasons.append("merge")
+        if native_audio is not None and (video.get('ext') != format_type
+                                         or audio.get('ext') not in native_audio):
+            choice.cost += REMUX_COST
+            choice.reasons.append(f"{video.get('ext')}+{audio.get('ext')} into {format_type}")
+    elif native_audio is not None and video.get('ext') != format_type:
+        choice.cost += CONTAINER_COST
+        choice.reasons.append(f"comes as {video.get('ext')}")
+
+
+def _score_audio_target(choice: FormatChoice, format_type: str):
+    """Add bitrate and transcoding costs for an audio output."""
+    source = choice.formats[0]
+    choice.cost += _audio_shortfall(source, choice)
+    if _has_video(source):
+        choice.reasons.append("includes video")
+
+    codec = normalize_codec(source.get('acodec'))
+    if codec in AUDIO_FORMATS[format_type]['copy_codecs']:
+        choice.reasons.append(f"{codec} copied")
+    else:
+        choice.needs_transcode = True
+        choice.cost += TRANSCODE_COST
+        choice.reasons.append(f"{codec or 'unknown codec'} re-encoded")
+
+
+def _score_size(choice: FormatChoice, largest: int):
+    """Add the size cost (unknown sizes count as half the largest)."""
+    if choice.estimated_bytes and largest:
+        choice.cost += SIZE_WEIGHT * choice.estimated_bytes / largest
+        choice.reasons.append(f"~{choice.estimated_bytes / (1024 * 1024):.1f}MB")
+    else:
+        choice.cost += SIZE_WEIGHT / 2
+        choice.reasons.append("size unknown")
+
+
+def _audio_shortfall(audio_format: dict, choice: FormatChoice) -> float:
+    """Cost of an audio stream's bitrate being below AUDIO_BITRATE_TARGET."""
+    bitrate = audio_format.get('abr') or (audio_format.get('tbr') if not _has_video(audio_format) else None)
+    if not bitrate:
+        return 0.0
+    if bitrate < AUDIO_BITRATE_TARGET:
+        choice.reasons.append(f"{bitrate:.0f}k audio")
+    return AUDIO_WEIGHT * max(0, AUDIO_BITRATE_TARGET - bitrate) / AUDIO_BITRATE_TARGET
+
+
+def _within_quality(choices: List[FormatChoice], quality: str) -> List[FormatChoice]:
+    """Drop candidates taller than the requested height (unless nothing else is left)."""
+    limit = _quality_height(quality)
+    if limit is None:
+        return choices
+    fitting = [c for c in choices if (c.formats[0].get('height') or 0) <= limit]
+    return fitting or choices
+
+
+def _target_height(choices: List[FormatChoice], quality: str) -> Optional[int]:
+    """Height the resolution cost is measured against."""
+    heights = [c.formats[0].get('height') for c in choices if c.formats[0].get('height')]
+    if not heights:
+        return None
+    if quality == 'worst':
+        return min(heights)
+    limit = _quality_height(quality)
+    if limit is None:
+        return max(heights)
+    return min(limit, max(heights))
+
+
+def _quality_height(quality: str) -> Optional[int]:
+    """Height limit of a quality setting like "720p" (None for best/worst)."""
+    digits = quality.lower().rstrip('p')
+    return int(digits) if digits.isdigit() else None
+
+
+def _estimate_bytes(formats: List[dict], duration: Optional[float]) -> Optional[int]:
+    """Total expected size, from reported sizes or bitrate x duration."""
+    total = 0
+    for f in formats:
+        size = f.get('filesize') or f.get('filesize_approx')
+        if not size and f.get('tbr') and duration:
+            # tbr is in kbit/s
+            size = f['tbr'] * duration * 1000 / 8
+        if not size:
+            return None
+        total += size
+    return int(total)
+
+
+def _preference(choice: FormatChoice) -> float:
+    """Extractor preference of a choice (its least preferred format counts; unset is 0)."""
+    return min(f.get('preference') or 0 for f in choice.formats)
+
+
+def _language_preference(choice: FormatChoice) -> float:
+    """How much the extractor prefers the choice's audio language (unset is -1, as in yt-dlp)."""
+    preference = choice.formats[-1].get('language_preference')
+    return preference if preference is not None else -1
+
+
+def _quality(choice: FormatChoice) -> float:
+    """Extractor quality rank of a choice (summed over its formats; unset is 0)."""
+    return sum(f.get('quality') or 0 for f in choice.formats)
+
+
+def _has_video(f: dict) -> bool:
+    return f.get('vcodec') != 'none'
+
+
+def _has_audio(f: dict) -> bool:
+    return f.get('acodec') != 'none'
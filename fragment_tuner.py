@@ -0,0 +1,120 @@
+"""
+Fragment Tuner
+Picks how many DASH/HLS fragments yt-dlp fetches at once. The throughput of
+each fragmented download is measured, and the next download's fragment
+concurrency is raised while that keeps paying off and lowered again once
+extra connections stop helping (or start getting throttled).
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+class FragmentTuner:
+    """Shared, thread-safe hill climber for yt-dlp's concurrent_fragment_downloads."""
+
+    # A level must beat the one below it by this much to be worth the extra connections
+    MIN_GAIN = 0.10
+    # Downloads shorter than this (in seconds) are too noisy to learn from
+    MIN_SAMPLE_SECONDS = 2.0
+    # Measurements older than this (in seconds) are forgotten so levels get tried again
+    SAMPLE_MAX_AGE = 10 * 60
+    # Weight of a new measurement in the running average for its level
+    SMOOTHING = 0.5
+
+    def __init__(self, initial: int = 4, minimum: int = 1, maximum: int = 16):
+        """
+        Create a tuner.
+
+        Args:
+            initial: Fragment concurrency used until something has been measured
+            minimum: Lowest concurrency the tuner will go to
+            maximum: Highest concurrency the tuner will go to
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self._lock = threading.Lock()
+        self._concurrency = max(minimum, min(maximum, initial))
+        # concurrency -> (average bytes per second, time of last measurement)
+        self._throughput = {}
+
+    @property
+    def concurrency(self) -> int:
+        """Fragment concurrency the next download should use."""
+        with self._lock:
+            return self._concurrency
+
+    def record(self, concurrency: int, downloaded_bytes: int, seconds: float):
+        """
+        Learn from a finished fragmented download and pick the next concurrency.
+
+        Args:
+            concurrency: Fragment concurrency the download ran with
+            downloaded_bytes: Bytes it downloaded
+            seconds: How long it took
+        """
+        if seconds < self.MIN_SAMPLE_SECONDS or downloaded_bytes <= 0:
+            return
+        rate = downloaded_bytes / seconds
+        now = time.monotonic()
+
+        with self._lock:
+            self._throughput = {level: sample for level, sample in self._throughput.items()
+                                if now - sample[1] < self.SAMPLE_MAX_AGE}
+            previous = self._throughput.get(concurrency)
+            if previous is not None:
+                rate = previous[0] + self.SMOOTHING * (rate - previous[0])
+            self._throughput[concurrency] = (rate, now)
+            self._concurrency = self._next_level(concurrency, rate)
+
+    def attach(self, ydl_opts: dict, concurrency: Optional[int] = None) -> dict:
+        """
+        Set a yt-dlp options dict's fragment concurrency.
+
+        Args:
+            ydl_opts: Options to change
+            concurrency: Fixed number of fragments at once, or None to let the tuner decide
+                (and measure the download so it can learn from it)
+
+        Returns:
+            The same options dict
+        """
+        if concurrency:
+            ydl_opts['concurrent_fragment_downloads'] = concurrency
+            return ydl_opts
+
+        level = self.concurrency
+        ydl_opts['concurrent_fragment_downloads'] = level
+        ydl_opts['progress_hooks'] = (list(ydl_opts.get('progress_hooks', []))
+                                      + [self._measuring_hook(level)])
+        return ydl_opts
+
+    def _next_level(self, level: int, rate: float) -> int:
+        """Hill-climb between power-of-two levels (caller holds the lock)."""
+        lower, higher = level // 2, level * 2
+        lower_sample = self._throughput.get(lower)
+        if lower >= self.minimum and lower_sample and lower_sample[0] * (1 + self.MIN_GAIN) >= rate:
+            # Half the connections did about as well - the extra ones aren't helping
+            return lower
+        higher_sample = self._throughput.get(higher)
+        if higher <= self.maximum and (higher_sample is None
+                                       or higher_sample[0] > rate * (1 + self.MIN_GAIN)):
+            # Untried (or known to be better) - see if more connections help
+            return higher
+        return level
+
+    def _measuring_hook(self, level: int):
+        """Build a progress hook that times each fragmented file of one job."""
+        started = {}
+
+        def hook(d):
+            filename = d.get('filename')
+            if d.get('status') == 'downloading' and d.get('fragment_count') and filename not in started:
+                started[filename] = (time.monotonic(), d.get('downloaded_bytes') or 0)
+            elif d.get('status') == 'finished' and filename in started:
+                start_time, start_bytes = started.pop(filename)
+                total = d.get('total_bytes') or d.get('downloaded_bytes') or 0
+                self.record(level, total - start_bytes, time.monotonic() - start_time)
+
+        return hook
@@ -0,0 +1,287 @@
+"""
+Job Control
+Cooperative cancellation for download jobs. A CancellationToken is checked
+from yt-dlp's progress and postprocessor hooks, and also stops any FFmpeg
+child process the job has started and shuts its open HTTP connections, so
+a transfer stalled in a socket read stops too.
+"""
+
+import glob
+import os
+import socket
+import threading
+import weakref
+from contextlib import contextmanager
+from typing import Optional
+
+
+class DownloadCancelled(Exception):
+    """Raised inside a job once its token has been cancelled."""
+
+
+# The token belonging to the job running on the current thread, so child
+# processes started deep inside yt-dlp can be tied back to it
+_current = threading.local()
+
+
+class CancellationToken:
+    """Lets one thread ask a running download job to stop as soon as possible."""
+
+    # Seconds a child process gets to exit after terminate() before it is killed
+    KILL_GRACE_PERIOD = 0.5
+
+    def __init__(self, parent: Optional['CancellationToken'] = None):
+        """
+        Create a token.
+
+        Args:
+            parent: Optional batch-wide token; cancelling it cancels this one too
+        """
+        self._event = threading.Event()
+        self._interrupted = False
+        self._lock = threading.Lock()
+        self._processes = weakref.WeakSet()
+        self._sockets = weakref.WeakSet()
+        self._children = weakref.WeakSet()
+        # Files the job has written so far (for cleaning up after a cancel)
+        self.partial_files = set()
+        self.finished_files = set()
+        if parent is not None:
+            parent._add_child(self)
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancel() has been called."""
+        return self._event.is_set()
+
+    @property
+    def interrupted(self) -> bool:
+        """True if the job was stopped by cancel(interrupt=True) and should be resumed later."""
+        return self._interrupted
+
+    def cancel(self, interrupt: bool = False):
+        """
+        Ask the job to stop, terminate any child process it is running and
+        shut its HTTP connections (a blocked read returns straight away).
+
+        Args:
+            interrupt: The program is shutting down rather than the job being
+                called off, so it stays unfinished in the journal (and keeps
+                its partial files) to be resumed on the next start
+        """
+        if interrupt and not self._event.is_set():
+            self._interrupted = True
+        self._event.set()
+        with self._lock:
+            children = list(self._children)
+            processes = [p for p in self._processes if p.poll() is None]
+            sockets = list(self._sockets)
+        for child in children:
+            child.cancel(interrupt)
+        for sock in sockets:
+            _shutdown(sock)
+        for process in processes:
+            _terminate(process)
+        if processes:
+            # Anything that ignores terminate() gets killed shortly after
+            timer = threading.Timer(self.KILL_GRACE_PERIOD, _kill_survivors, args=(processes,))
+            timer.daemon = True
+            timer.start()
+
+    def raise_if_cancelled(self):
+        """Raise DownloadCancelled if the job should stop."""
+        if self._event.is_set():
+            raise DownloadCancelled("Download cancelled")
+
+    def _add_child(self, child: 'CancellationToken'):
+        """Link a per-job token to this one (cancelled straight away if we already are)."""
+        with self._lock:
+            self._children.add(child)
+        if self._event.is_set():
+            child.cancel(self._interrupted)
+
+    def register_process(self, process):
+        """Track a child process so cancel() can stop it (stops it now if already cancelled)."""
+        with self._lock:
+            self._processes.add(process)
+        if self._event.is_set():
+            _terminate(process)
+
+    def register_response(self, response):
+        """Track the connection behind a yt-dlp response so cancel() can shut it."""
+        sock = _response_socket(response)
+        if sock is None:
+            return
+        with self._lock:
+            self._sockets.add(sock)
+        if self._event.is_set():
+            _shutdown(sock)
+
+    def progress_hook(self, d):
+        """yt-dlp progress hook: remember the files being written and stop if cancelled."""
+        if d.get('tmpfilename'):
+            self.partial_files.add(d['tmpfilename'])
+        if d.get('status') == 'finished' and d.get('filename'):
+            # Only count files this job actually downloaded, not ones that already existed
+            if d['filename'] + '.part' in self.partial_files:
+                self.finished_files.add(d['filename'])
+        self.raise_if_cancelled()
+
+    def postprocessor_hook(self, d):
+        """yt-dlp postprocessor hook: stop between post-processing steps if cancelled."""
+        self.raise_if_cancelled()
+
+    def attach(self, ydl_opts: dict) -> dict:
+        """Add this token's hooks to a yt-dlp options dict (checked before any other hook)."""
+        install_connection_tracking()
+        ydl_opts['progress_hooks'] = [self.progress_hook] + list(ydl_opts.get('progress_hooks', []))
+        ydl_opts['postprocessor_hooks'] = ([self.postprocessor_hook]
+                                           + list(ydl_opts.get('postprocessor_hooks', [])))
+        return ydl_opts
+
+    @contextmanager
+    def activate(self):
+        """Tie child processes started on this thread (e.g. FFmpeg) to this token."""
+        install_process_tracking()
+        previous = getattr(_current, 'token', None)
+        _current.token = self
+        try:
+            yield self
+        finally:
+            _current.token = previous
+
+    def cleanup_partial_files(self):
+        """Delete the .part/fragment files and unmerged pieces a cancelled job left behind."""
+        for path in self.partial_files | self.finished_files:
+            for leftover in [path, path + '.ytdl'] + glob.glob(glob.escape(path) + '-Frag*'):
+                try:
+                    os.remove(leftover)
+                except OSError:
+                    pass
+
+
+def current_token() -> Optional[CancellationToken]:
+    """Token of the job running on this thread, if any."""
+    return getattr(_current, 'token', None)
+
+
+def install_process_tracking():
+    """
+    Make the child processes yt-dlp starts for FFmpeg visible to cancellation tokens.
+
+    yt-dlp runs FFmpeg through its own Popen class, with no way to reach the
+    process from outside. This swaps in a subclass (in the modules that run
+    FFmpeg) that registers each new process with the current thread's token.
+    It behaves exactly like the original when no token is active, and is only
+    installed once.
+    """
+    try:
+        import yt_dlp.downloader.external as external_downloader
+        import yt_dlp.postprocessor.ffmpeg as ffmpeg_postprocessor
+    except ImportError:
+        return
+
+    for module in (ffmpeg_postprocessor, external_downloader):
+        base = getattr(module, 'Popen', None)
+        if base is None or getattr(base, '_tracked_by_token', False):
+            continue
+
+        class TrackedPopen(base):
+            _tracked_by_token = True
+
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                token = current_token()
+                if token is not None:
+                    token.register_process(self)
+
+        module.Popen = TrackedPopen
+
+
+def install_connection_tracking():
+    """
+    Let cancellation tokens shut the HTTP connections of their job.
+
+    yt-dlp only calls the progress hook between reads, so a read that
+    stalls would otherwise hold the job (and its bandwidth share) until the
+    socket timeout. This wraps YoutubeDL.urlopen, which every page, manifest,
+    fragment and file request goes through, to register each response with
+    the token whose progress hook the YoutubeDL was given. Instances without
+    a token are unaffected, and it is only installed once.
+    """
+    try:
+        from yt_dlp import YoutubeDL
+    except ImportError:
+        return
+    urlopen = getattr(YoutubeDL, 'urlopen', None)
+    if urlopen is None or getattr(urlopen, '_tracked_by_token', False):
+        return
+
+    def tracked_urlopen(self, req):
+        token = _params_token(self.params)
+        if token is not None:
+            # A retry after cancel() shut the connection stops here
+            token.raise_if_cancelled()
+        response = urlopen(self, req)
+        if token is not None:
+            token.register_response(response)
+        return response
+
+    tracked_urlopen._tracked_by_token = True
+    YoutubeDL.urlopen = tracked_urlopen
+
+
+def _params_token(params: dict) -> Optional[CancellationToken]:
+    """The token whose hooks were attached to a YoutubeDL's options, if any."""
+    for hook in params.get('progress_hooks') or ():
+        token = getattr(hook, '__self__', None)
+        if isinstance(token, CancellationToken):
+            return token
+    return None
+
+
+# Attributes that lead from a response adapter (urllib or requests handler)
+# down to the socket it reads from
+_SOCKET_PATH_ATTRS = ('fp', '_fp', 'raw', '_sock', 'sock', '_connection', 'connection')
+
+
+def _response_socket(response) -> Optional[socket.socket]:
+    """Find the socket under a yt-dlp response, or None if it can't be reached."""
+    layer = [response]
+    for _ in range(6):
+        next_layer = []
+        for obj in layer:
+            if isinstance(obj, socket.socket):
+                return obj
+            next_layer.extend(value for value in (getattr(obj, name, None)
+                                                  for name in _SOCKET_PATH_ATTRS)
+                              if value is not None)
+        layer = next_layer
+    return None
+
+
+def _shutdown(sock: socket.socket):
+    """Make reads on a socket return at once (other threads may still be using it)."""
+    try:
+        # The plain socket call, so an SSL socket's state is left for its reader
+        socket.socket.shutdown(sock, socket.SHUT_RDWR)
+    except OSError:
+        pass
+
+
+def _terminate(process):
+    """Ask a child process to exit, ignoring ones that are already gone."""
+    try:
+        process.terminate()
+    except OSError:
+        pass
+
+
+def _kill_survivors(processes):
+    """Force-kill child processes that didn't exit after terminate()."""
+    for process in processes:
+        if process.poll() is None:
+            try:
+                process.kill()
+            except OSError:
+                pass
@@ -0,0 +1,309 @@
+"""
+Job Journal
+Durable record of every download job (URL, options, state, output and
+partial file), so unfinished work can be picked up again after a crash
+or restart.
+
+Several processes (GUI, command line, service) can share one journal. Each
+open journal holds an OS lock on its own owner file for as long as it is
+open, and every job records its owner, so a job is only resumed once the
+process that queued it is gone - the lock disappears with the process, even
+if it crashed.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+
+
+# Job states stored in the journal
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# States that mean the job never got to the end (and should be resumed)
+UNFINISHED_STATES = (QUEUED, RUNNING)
+
+
+@dataclass
+class JournalEntry:
+    """One job as recorded in the journal."""
+
+    job_id: str
+    url: str
+    options: dict = field(default_factory=dict)
+    state: str = QUEUED
+    output_path: Optional[str] = None
+    partial_file: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+    # Id of the journal (process) that queued or resumed the job
+    owner: Optional[str] = None
+
+    @property
+    def partial_bytes(self) -> int:
+        """Size of the partial file on disk (where a resumed download picks up from)."""
+        if not self.partial_file:
+            return 0
+        try:
+            return os.path.getsize(self.partial_file)
+        except OSError:
+            return 0
+
+
+class JobJournal:
+    """SQLite-backed journal of download jobs, safe to use from several threads."""
+
+    def __init__(self, db_path, keep_finished_days: float = 30):
+        """
+        Open (or create) the journal.
+
+        Args:
+            db_path: Path of the SQLite file
+            keep_finished_days: Finished jobs older than this are pruned on open
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        # Every state change must survive a crash, and there are only a few per job
+        self._conn.execute('PRAGMA synchronous=FULL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' job_id TEXT PRIMARY KEY,'
+            ' url TEXT NOT NULL,'
+            ' options TEXT NOT NULL,'
+            ' state TEXT NOT NULL,'
+            ' output_path TEXT,'
+            ' partial_file TEXT,'
+            ' error TEXT,'
+            ' created_at REAL NOT NULL,'
+            ' updated_at REAL NOT NULL,'
+            ' owner TEXT)'
+        )
+        columns = [row[1] for row in self._conn.execute('PRAGMA table_info(jobs)')]
+        if 'owner' not in columns:
+            # Journals written before jobs had owners
+            try:
+                self._conn.execute('ALTER TABLE jobs ADD COLUMN owner TEXT')
+            except sqlite3.OperationalError:
+                # Another process added it first
+                pass
+        self._conn.execute('CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at)')
+        self._conn.commit()
+
+        # Held until close() (or until the process ends), so other processes
+        # can tell this journal's jobs are still being worked on
+        self.owner_id = uuid.uuid4().hex
+        self.owners_folder = self.db_path.with_name(self.db_path.stem + ".owners")
+        self._owner_file = _hold_owner_lock(self.owners_folder / f"{self.owner_id}.lock")
+        self.prune(keep_finished_days * 24 * 3600)
+
+    def add(self, url: str, options: Optional[dict] = None) -> str:
+        """
+        Record a new queued job.
+
+        Args:
+            url: Video URL
+            options: Whatever is needed to run the job again (format, quality, ...)
+
+        Returns:
+            The new job's id
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO jobs (job_id, url, options, state, created_at, updated_at, owner)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (job_id, url, json.dumps(options or {}), QUEUED, now, now, self.owner_id)
+            )
+            self._conn.commit()
+        return job_id
+
+    def mark_running(self, job_id: str):
+        """Record that a job has started."""
+        self._update(job_id, state=RUNNING)
+
+    def set_partial_file(self, job_id: str, partial_file: str):
+        """Record the .part file a job is writing to."""
+        self._update(job_id, partial_file=partial_file)
+
+    def finish(self, job_id: str, state: str, output_path=None, error: Optional[str] = None):
+        """
+        Record how a job ended.
+
+        Args:
+            job_id: Job id from add()
+            state: COMPLETED, FAILED or CANCELLED
+            output_path: Final file, if the job produced one
+            error: Error message for failed jobs
+        """
+        self._update(job_id, state=state,
+                     output_path=str(output_path) if output_path else None, error=error)
+
+    def get(self, job_id: str) -> Optional[JournalEntry]:
+        """Look up a single job."""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM jobs WHERE job_id = ?', (job_id,)).fetchone()
+        return _entry(row) if row else None
+
+    def unfinished(self) -> List[JournalEntry]:
+        """
+        Jobs left queued or running by a process that has stopped, oldest first.
+
+        Jobs whose owner is still open (in this or another process) are
+        left out - they are being worked on right now.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT * FROM jobs WHERE state IN (?, ?) ORDER BY created_at',
+                UNFINISHED_STATES
+            ).fetchall()
+        entries = [_entry(row) for row in rows]
+        alive = {}
+        for entry in entries:
+            if entry.owner not in alive:
+                alive[entry.owner] = self._owner_alive(entry.owner)
+        return [entry for entry in entries if not alive[entry.owner]]
+
+    def claim_unfinished(self) -> List[JournalEntry]:
+        """
+        Take over the jobs unfinished() returns, to resume them in this process.
+
+        Claiming is atomic, so when several processes start at once each job
+        is resumed by only one of them.
+        """
+        claimed = []
+        for entry in self.unfinished():
+            with self._lock:
+                cursor = self._conn.execute(
+                    'UPDATE jobs SET owner = ?, updated_at = ?'
+                    ' WHERE job_id = ? AND owner IS ? AND state IN (?, ?)',
+                    (self.owner_id, time.time(), entry.job_id, entry.owner) + UNFINISHED_STATES
+                )
+                self._conn.commit()
+            if cursor.rowcount == 1:
+                entry.owner = self.owner_id
+                claimed.append(entry)
+        return claimed
+
+    def prune(self, max_age: float):
+        """Delete finished jobs older than max_age seconds."""
+        with self._lock:
+            self._conn.execute(
+                'DELETE FROM jobs WHERE state NOT IN (?, ?) AND updated_at < ?',
+                UNFINISHED_STATES + (time.time() - max_age,)
+            )
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection and give up ownership of this journal's jobs."""
+        with self._lock:
+            self._conn.close()
+            if self._owner_file is not None:
+                self._owner_file.close()
+                self._owner_file = None
+                try:
+                    (self.owners_folder / f"{self.owner_id}.lock").unlink()
+                except OSError:
+                    pass
+
+    def _owner_alive(self, owner: Optional[str]) -> bool:
+        """Whether a job owner's journal is still open somewhere (its lock is held)."""
+        if owner is None:
+            # Recorded before jobs had owners
+            return False
+        if owner == self.owner_id:
+            # Our own jobs are being worked on, even if the owner lock couldn't be taken
+            return True
+        lock_path = self.owners_folder / f"{owner}.lock"
+        try:
+            f = open(lock_path, 'a+b')
+        except OSError:
+            return False
+        try:
+            if not _try_lock(f):
+                return True
+            _unlock(f)
+        finally:
+            f.close()
+        # Nobody holds it any more, so the file is just left over from a crash
+        try:
+            lock_path.unlink()
+        except OSError:
+            pass
+        return False
+
+    def _update(self, job_id: str, **columns):
+        """Set some columns of a job and commit straight away."""
+        columns['updated_at'] = time.time()
+        assignments = ', '.join(f'{name} = ?' for name in columns)
+        with self._lock:
+            self._conn.execute(f'UPDATE jobs SET {assignments} WHERE job_id = ?',
+                               list(columns.values()) + [job_id])
+            self._conn.commit()
+
+
+def _entry(row) -> JournalEntry:
+    """Turn a database row into a JournalEntry."""
+    (job_id, url, options, state, output_path, partial_file, error, created_at, updated_at,
+     owner) = row
+    return JournalEntry(job_id=job_id, url=url, options=json.loads(options), state=state,
+                        output_path=output_path, partial_file=partial_file, error=error,
+                        created_at=created_at, updated_at=updated_at, owner=owner)
+
+
+def _hold_owner_lock(path: Path):
+    """Create and lock a journal's owner file (None if locking isn't possible here)."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        f = open(path, 'a+b')
+    except OSError:
+        return None
+    if not _try_lock(f):
+        f.close()
+        return None
+    f.write(f"{os.getpid()}\n".encode('ascii'))
+    f.flush()
+    return f
+
+
+def _try_lock(f) -> bool:
+    """Take an exclusive lock on an open file without waiting (False if someone holds it)."""
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        else:
+            import fcntl
+            # flock (not lockf) so two journals in the same process also exclude each other
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock(f):
+    try:
+        if os.name == 'nt':
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    except OSError:
+        pass
@@ -0,0 +1,297 @@
+"""
+Metadata Cache
+On-disk cache for yt-dlp extract_info results, so retried or re-queued
+URLs can skip the extractor entirely while the cached data is still valid.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+# Keys inside a format that point at the actual (short-lived) media streams
+STREAM_KEYS = ('url', 'manifest_url', 'fragment_base_url', 'fragments')
+
+# Extractor name under which info is also stored by URL, for URLs whose
+# (extractor, video id) key can't be worked out before extracting them
+URL_KEY = ':url'
+
+
+class _Unserializable(Exception):
+    """Raised when an info dict holds values that can't be stored as JSON."""
+
+
+class MetadataCache:
+    """SQLite-backed cache of extracted video info, keyed by extractor and video id."""
+
+    def __init__(self, db_path, metadata_ttl: float = 7 * 24 * 3600,
+                 stream_ttl: float = 4 * 3600, max_bytes: int = 64 * 1024 * 1024,
+                 max_entries: int = 5000):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            db_path: Path of the SQLite file
+            metadata_ttl: Seconds that title, duration and the format list stay valid
+            stream_ttl: Upper bound in seconds for how long stream URLs are reused
+            max_bytes: Total stored size before least recently used entries are evicted
+            max_entries: Maximum number of cached videos
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.metadata_ttl = metadata_ttl
+        self.stream_ttl = stream_ttl
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' extractor TEXT NOT NULL,'
+            ' video_id TEXT NOT NULL,'
+            ' data BLOB NOT NULL,'
+            ' size INTEGER NOT NULL,'
+            ' stored_at REAL NOT NULL,'
+            ' streams_expire_at REAL NOT NULL,'
+            ' metadata_expire_at REAL NOT NULL,'
+            ' last_access REAL NOT NULL,'
+            ' PRIMARY KEY (extractor, video_id))'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS entries_lru ON entries (last_access)')
+        self._conn.commit()
+
+    def get(self, extractor: str, video_id: str, need_streams: bool = True) -> Optional[dict]:
+        """
+        Look up cached info for a video.
+
+        Args:
+            extractor: yt-dlp extractor key (e.g. "Youtube")
+            video_id: Video id as reported by the extractor
+            need_streams: If True, only return info whose stream URLs are still valid.
+                If False, return stable metadata with the stream URLs stripped.
+
+        Returns:
+            The cached info dict, or None if missing or expired
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT data, streams_expire_at, metadata_expire_at FROM entries'
+                ' WHERE extractor = ? AND video_id = ?',
+                (extractor, video_id)
+            ).fetchone()
+            if row is None:
+                return None
+
+            data, streams_expire_at, metadata_expire_at = row
+            if now >= metadata_expire_at:
+                self._conn.execute('DELETE FROM entries WHERE extractor = ? AND video_id = ?',
+                                   (extractor, video_id))
+                self._conn.commit()
+                return None
+            if need_streams and now >= streams_expire_at:
+                return None
+
+            self._conn.execute(
+                'UPDATE entries SET last_access = ? WHERE extractor = ? AND video_id = ?',
+                (now, extractor, video_id)
+            )
+            self._conn.commit()
+
+        info = json.loads(zlib.decompress(data))
+        if not need_streams:
+            info = _strip_streams(info)
+        return info
+
+    def put(self, info: dict, url: Optional[str] = None) -> bool:
+        """
+        Store an extracted info dict.
+
+        Only single, non-live videos are cached. Playlists, live streams and
+        results holding values that can't be turned into JSON are skipped.
+
+        Args:
+            info: Unprocessed info dict from extract_info()
+            url: URL the info was extracted from; if canonical_key() can't
+                tell its video id, the info is also stored under the URL so
+                extract_info_cached() finds it
+
+        Returns:
+            True if the info was stored
+        """
+        if info.get('_type', 'video') != 'video':
+            return False
+        if info.get('is_live') or info.get('live_status') in ('is_live', 'is_upcoming'):
+            return False
+        extractor = info.get('extractor_key')
+        video_id = info.get('id')
+        if not extractor or not video_id:
+            return False
+
+        try:
+            data = zlib.compress(json.dumps(_to_json_safe(info)).encode('utf-8'))
+        except _Unserializable:
+            return False
+
+        now = time.time()
+        streams_expire_at = now + self.stream_ttl
+        url_expiry = _earliest_url_expiry(info)
+        if url_expiry is not None:
+            # Stop reusing the URLs a few minutes before the site expires them
+            streams_expire_at = min(streams_expire_at, url_expiry - 300)
+
+        keys = [(extractor, str(video_id))]
+        if url is not None and canonical_key(url) is None:
+            keys.append((URL_KEY, url))
+        with self._lock:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                [(key_extractor, key_id, data, len(data), now,
+                  streams_expire_at, now + self.metadata_ttl, now)
+                 for key_extractor, key_id in keys]
+            )
+            self._evict()
+            self._conn.commit()
+        return True
+
+    def invalidate(self, extractor: str, video_id: str):
+        """Drop a single entry (e.g. after its stream URLs stopped working)."""
+        with self._lock:
+            self._conn.execute('DELETE FROM entries WHERE extractor = ? AND video_id = ?',
+                               (extractor, video_id))
+            self._conn.commit()
+
+    def clear(self):
+        """Remove every cached entry."""
+        with self._lock:
+            self._conn.execute('DELETE FROM entries')
+            self._conn.commit()
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self):
+        """Delete expired entries, then least recently used ones until within bounds."""
+        self._conn.execute('DELETE FROM entries WHERE metadata_expire_at <= ?', (time.time(),))
+
+        total_bytes, count = self._conn.execute(
+            'SELECT COALESCE(SUM(size), 0), COUNT(*) FROM entries'
+        ).fetchone()
+        if total_bytes <= self.max_bytes and count <= self.max_entries:
+            return
+
+        doomed = []
+        for rowid, size in self._conn.execute('SELECT rowid, size FROM entries ORDER BY last_access'):
+            if total_bytes <= self.max_bytes and count <= self.max_entries:
+                break
+            doomed.append((rowid,))
+            total_bytes -= size
+            count -= 1
+        self._conn.executemany('DELETE FROM entries WHERE rowid = ?', doomed)
+
+
+@lru_cache(maxsize=1024)
+def suitable_extractor(url: str):
+    """Find the extractor class (other than Generic) that handles a URL, without network access."""
+    from yt_dlp.extractor import gen_extractor_classes
+
+    for ie in gen_extractor_classes():
+        if ie.ie_key() != 'Generic' and ie.suitable(url):
+            return ie
+    return None
+
+
+@lru_cache(maxsize=1024)
+def canonical_key(url: str) -> Optional[Tuple[str, str]]:
+    """
+    Work out the (extractor key, video id) for a URL without any network access.
+
+    Returns:
+        The key tuple, or None if no specific extractor recognises the URL
+    """
+    ie = suitable_extractor(url)
+    if ie is None:
+        return None
+    video_id = ie.get_temp_id(url)
+    return (ie.ie_key(), video_id) if video_id else None
+
+
+def extract_info_cached(ydl, url: str, cache: Optional[MetadataCache] = None) -> dict:
+    """
+    Extract (but don't process) info for a URL, reusing the cache when possible.
+
+    Args:
+        ydl: An open yt_dlp.YoutubeDL instance
+        url: Video URL
+        cache: Cache to read from and write to (None disables caching)
+
+    Returns:
+        Info dict ready to hand to ydl.process_ie_result()
+    """
+    if cache is not None:
+        info = cache.get(*(canonical_key(url) or (URL_KEY, url)))
+        if info is not None:
+            info['original_url'] = url
+            return info
+
+    info = ydl.extract_info(url, download=False, process=False)
+    if cache is not None:
+        cache.put(info, url)
+    return info
+
+
+def invalidate_info(cache: Optional[MetadataCache], info: Optional[dict]):
+    """Forget the cached copy of an info dict (used after a failed download)."""
+    if cache is None or not info:
+        return
+    if info.get('extractor_key') and info.get('id'):
+        cache.invalidate(info['extractor_key'], str(info['id']))
+    if info.get('original_url'):
+        cache.invalidate(URL_KEY, info['original_url'])
+
+
+def _to_json_safe(obj):
+    """Copy obj into plain JSON types, dropping yt-dlp's private '__' keys."""
+    if isinstance(obj, dict):
+        return {str(k): _to_json_safe(v) for k, v in obj.items()
+                if not str(k).startswith('__')}
+    if isinstance(obj, (list, tuple)):
+        return [_to_json_safe(v) for v in obj]
+    if obj is None or isinstance(obj, (str, int, float, bool)):
+        return obj
+    # Things like lazy fragment generators can't be replayed from disk
+    raise _Unserializable(type(obj).__name__)
+
+
+def _strip_streams(info: dict) -> dict:
+    """Return info with every stream URL removed, leaving only stable metadata."""
+    info = dict(info)
+    for key in STREAM_KEYS:
+        info.pop(key, None)
+    info['formats'] = [{k: v for k, v in f.items() if k not in STREAM_KEYS}
+                       for f in info.get('formats') or []]
+    return info
+
+
+def _earliest_url_expiry(info: dict) -> Optional[float]:
+    """Find the soonest 'expire=' timestamp in the stream URLs, if any."""
+    expiries = []
+    for fmt in (info.get('formats') or []) + [info]:
+        for key in ('url', 'manifest_url'):
+            url = fmt.get(key)
+            if not url:
+                continue
+            expire = parse_qs(urlparse(url).query).get('expire')
+            if expire and expire[0].isdigit():
+                expiries.append(float(expire[0]))
+    return min(expiries) if expiries else None
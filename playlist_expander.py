@@ -0,0 +1,109 @@
+"""
+Playlist Expander
+Turns playlist and channel URLs into a lazy stream of video URLs, so the
+first video can start downloading while the rest of the list is still
+being read, and memory use doesn't grow with the size of the playlist.
+"""
+
+import itertools
+from typing import Iterator, Optional
+
+from job_control import CancellationToken
+from metadata_cache import MetadataCache, suitable_extractor
+
+
+# Info dict types that hold a list of entries rather than a single video
+PLAYLIST_TYPES = ('playlist', 'multi_video')
+
+# Entries fetched at a time from paged playlists
+PAGE_SIZE = 50
+
+
+def may_be_playlist(url: str) -> bool:
+    """
+    Guess (without network access) whether a URL could expand to several videos.
+
+    Only URLs whose extractor is known to return single videos are ruled
+    out; anything else has to be looked at by iter_playlist_urls().
+    """
+    ie = suitable_extractor(url)
+    return ie is None or getattr(ie, '_RETURN_TYPE', None) != 'video'
+
+
+def iter_playlist_urls(url: str, cache: Optional[MetadataCache] = None,
+                       token: Optional[CancellationToken] = None,
+                       max_depth: int = 2) -> Iterator[str]:
+    """
+    Yield the URL of every video in a playlist or channel, as the list is read.
+
+    Entries are read with flat extraction (no per-video page fetches) and one
+    page at a time, so nothing is held in memory beyond the current page. A
+    URL that turns out to be a single video is yielded as-is, and its info
+    is put in the metadata cache so the download doesn't extract it again.
+
+    Args:
+        url: Playlist, channel or video URL
+        cache: Metadata cache for single-video results (None disables it)
+        token: Stop reading the list once this is cancelled
+        max_depth: How far to follow nested playlists (e.g. a channel's tabs)
+
+    Yields:
+        Video URLs, in playlist order
+    """
+    import yt_dlp
+
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': 'in_playlist',
+        'lazy_playlist': True,
+    }
+    with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+        info = ydl.extract_info(url, download=False, process=False)
+        if info.get('_type', 'video') not in PLAYLIST_TYPES and cache is not None:
+            # Stored under the URL too when its id can't be told from it, so the
+            # download finds it even for sites handled by the generic extractor
+            cache.put(info, url)
+        yield from _expand(ydl, info, url, token, max_depth)
+
+
+def _expand(ydl, info: dict, url: str, token: Optional[CancellationToken],
+            depth: int) -> Iterator[str]:
+    """Yield video URLs from an unprocessed info dict, following nested playlists."""
+    if info.get('_type', 'video') not in PLAYLIST_TYPES:
+        yield url
+        return
+
+    for entry in _iter_entries(info.get('entries')):
+        if token is not None and token.cancelled:
+            return
+        if not entry:
+            continue
+
+        entry_type = entry.get('_type', 'video')
+        entry_url = entry.get('url') or entry.get('webpage_url')
+        if entry_type in PLAYLIST_TYPES and depth > 0:
+            yield from _expand(ydl, entry, entry_url or url, token, depth - 1)
+        elif (entry_type == 'url' and entry_url and depth > 0
+              and entry.get('ie_key') == info.get('extractor_key')):
+            # A link handled by the playlist's own extractor is another list
+            # (e.g. the Videos and Shorts tabs of a channel), not a video
+            nested = ydl.extract_info(entry_url, download=False, process=False)
+            yield from _expand(ydl, nested, entry_url, token, depth - 1)
+        elif entry_url:
+            yield entry_url
+
+
+def _iter_entries(entries) -> Iterator[dict]:
+    """Iterate playlist entries, fetching paged lists one page at a time."""
+    if entries is None:
+        return
+    if hasattr(entries, 'getslice'):
+        # yt-dlp's PagedList downloads pages on demand
+        for start in itertools.count(0, PAGE_SIZE):
+            page = entries.getslice(start, start + PAGE_SIZE)
+            if not page:
+                return
+            yield from page
+    else:
+        yield from entries
@@ -0,0 +1,279 @@
+"""
+Post-processing Pipeline
+Audio conversion runs on its own pool (sized to the CPU cores) instead of
+inline in the download thread, so the next download can start while FFmpeg
+is still converting the previous one. Both stages keep their own queue
+depth and throughput numbers.
+"""
+
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+
+from job_control import CancellationToken, DownloadCancelled
+
+
+# Audio formats that are produced by converting the downloaded file
+# (codec is the FFmpeg encoder, ytdlp_codec the name yt-dlp's FFmpegExtractAudio uses,
+# copy_codecs the source codecs the container can hold as-is, and selector the yt-dlp
+# format to download - streams that can be copied come first)
+AUDIO_FORMATS = {
+    'mp3': {'codec': 'libmp3lame', 'ytdlp_codec': 'mp3', 'copy_codecs': ('mp3',),
+            'selector': 'bestaudio[acodec=mp3]/bestaudio/best'},
+    'ogg': {'codec': 'libvorbis', 'ytdlp_codec': 'vorbis', 'copy_codecs': ('vorbis', 'opus'),
+            'selector': 'bestaudio[acodec=opus]/bestaudio[acodec=vorbis]/bestaudio/best'},
+    'm4a': {'codec': 'aac', 'ytdlp_codec': 'm4a', 'copy_codecs': ('aac',),
+            'selector': 'bestaudio[ext=m4a]/bestaudio[acodec^=mp4a]/bestaudio/best'},
+}
+
+
+class StageStats:
+    """Thread-safe queue depth and throughput counters for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes = 0
+        # Wall-clock seconds during which at least one item was being worked on
+        self._busy_seconds = 0.0
+        self._busy_since = None
+
+    def job_queued(self):
+        """An item is waiting for this stage."""
+        with self._lock:
+            self.queued += 1
+
+    def job_dropped(self):
+        """A waiting item was removed without being worked on."""
+        with self._lock:
+            self.queued = max(0, self.queued - 1)
+
+    def job_started(self, was_queued: bool = True):
+        """An item has left the queue and is being worked on."""
+        with self._lock:
+            if was_queued:
+                self.queued = max(0, self.queued - 1)
+            if self.active == 0:
+                self._busy_since = time.monotonic()
+            self.active += 1
+
+    def job_done(self, nbytes: int = 0, ok: bool = True):
+        """An item has finished (nbytes is how much data it moved)."""
+        with self._lock:
+            self.active = max(0, self.active - 1)
+            if self.active == 0 and self._busy_since is not None:
+                self._busy_seconds += time.monotonic() - self._busy_since
+                self._busy_since = None
+            if ok:
+                self.completed += 1
+                self.bytes += nbytes
+            else:
+                self.failed += 1
+
+    def snapshot(self) -> dict:
+        """Current numbers, including throughput while the stage was busy."""
+        with self._lock:
+            busy = self._busy_seconds
+            if self._busy_since is not None:
+                busy += time.monotonic() - self._busy_since
+            return {
+                'stage': self.name,
+                'queued': self.queued,
+                'active': self.active,
+                'completed': self.completed,
+                'failed': self.failed,
+                'bytes': self.bytes,
+                'busy_seconds': busy,
+                'bytes_per_second': self.bytes / busy if busy > 0 else 0.0,
+                'items_per_minute': self.completed * 60 / busy if busy > 0 else 0.0,
+            }
+
+
+class PostProcessingPool:
+    """Runs post-processing tasks on a pool of CPU-sized worker threads."""
+
+    def __init__(self, workers: Optional[int] = None):
+        """
+        Create the pool (threads are started on first use).
+
+        Args:
+            workers: Number of tasks running at once (default: number of CPU cores)
+        """
+        self.workers = workers or os.cpu_count() or 2
+        self.stats = StageStats("postprocess")
+        self._executor = ThreadPoolExecutor(max_workers=self.workers,
+                                            thread_name_prefix="postprocess")
+
+    def submit(self, fn, *args, input_bytes: int = 0, **kwargs) -> Future:
+        """
+        Queue a task.
+
+        Args:
+            fn: Function to run on a post-processing thread
+            input_bytes: Size of the data the task works on (for the throughput numbers)
+
+        Returns:
+            Future with fn's return value
+        """
+        self.stats.job_queued()
+
+        def run():
+            self.stats.job_started()
+            ok = False
+            try:
+                value = fn(*args, **kwargs)
+                ok = True
+                return value
+            finally:
+                self.stats.job_done(input_bytes, ok)
+
+        return self._executor.submit(run)
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting tasks (and wait for running ones if wait is True)."""
+        self._executor.shutdown(wait=wait)
+
+
+def downloaded_file(info: Optional[dict]) -> Optional[Path]:
+    """Get the path of the finished file from a processed info dict."""
+    downloads = (info or {}).get('requested_downloads') or []
+    if downloads and downloads[-1].get('filepath'):
+        return Path(downloads[-1]['filepath'])
+    return None
+
+
+def audio_codec(info: Optional[dict]) -> Optional[str]:
+    """
+    Get the audio codec of the downloaded file from a processed info dict.
+
+    yt-dlp reports codecs in a few spellings ("mp4a.40.2", "opus", "none"),
+    so they are normalized to the names used in AUDIO_FORMATS' copy_codecs.
+    Returns None if it isn't known (or the file has no audio).
+    """
+    info = info or {}
+    downloads = info.get('requested_downloads') or []
+    return normalize_codec((downloads[-1].get('acodec') if downloads else None) or info.get('acodec'))
+
+
+def normalize_codec(codec: Optional[str]) -> Optional[str]:
+    """Short name of a yt-dlp codec string (e.g. "mp4a.40.2" -> "aac"), None for "none"."""
+    if not codec or codec == 'none':
+        return None
+    codec = codec.lower().split('.')[0]
+    if codec in ('mp4a', 'aac'):
+        return 'aac'
+    return codec
+
+
+def split_formats(format_type) -> List[str]:
+    """
+    Turn a job's format setting into a list of output formats.
+
+    Several outputs can be asked for at once, e.g. "mp4,mp3" or
+    ["mp3", "ogg", "m4a"]. The first one decides what gets downloaded; every
+    audio format in the list is then made from that one local copy.
+    """
+    if isinstance(format_type, str):
+        format_type = format_type.split(',')
+    formats = []
+    for fmt in format_type:
+        fmt = fmt.strip().lower()
+        if fmt and fmt not in formats:
+            formats.append(fmt)
+    if not formats:
+        raise ValueError("No output format given")
+    if any(fmt not in AUDIO_FORMATS for fmt in formats[1:]):
+        raise ValueError("Only the first output format can be a video format")
+    return formats
+
+
+def convert_audio(source, target_formats: List[str], ffmpeg_path: Optional[str],
+                  quality: str = '192', token: Optional[CancellationToken] = None,
+                  keep_source: bool = False, source_codec: Optional[str] = None) -> List[Path]:
+    """
+    Convert a downloaded file to one or more audio formats with FFmpeg.
+
+    All outputs come out of a single FFmpeg run, so the source is only read
+    and decoded once however many formats are asked for. They are written
+    next to the source with the target extensions, and the source is
+    deleted afterwards unless keep_source is True.
+
+    When the source's audio codec already fits a target container (e.g. AAC
+    into m4a, Opus into ogg) the stream is copied instead of re-encoded,
+    which only takes as long as writing the file.
+
+    Args:
+        source: Downloaded file
+        target_formats: Keys of AUDIO_FORMATS (mp3, ogg, m4a)
+        ffmpeg_path: ffmpeg binary to run
+        quality: Audio bitrate in kbit/s
+        token: Cancelling this stops FFmpeg
+        keep_source: Keep the downloaded file (e.g. when it's also one of the outputs)
+        source_codec: Audio codec of the source as returned by audio_codec() (None if unknown)
+
+    Returns:
+        Paths of the converted files, in target_formats order
+    """
+    if not ffmpeg_path:
+        names = "/".join(fmt.upper() for fmt in target_formats)
+        raise RuntimeError(f"FFmpeg is required for {names} conversion. "
+                           "Install it with: winget install ffmpeg")
+
+    source = Path(source)
+    outputs = [source.with_suffix('.' + fmt) for fmt in target_formats]
+    # FFmpeg picks the container from the extension, so keep it last
+    temp_outputs = [output.with_name(output.stem + '.temp' + output.suffix) for output in outputs]
+
+    args = [ffmpeg_path, '-hide_banner', '-loglevel', 'error', '-y', '-i', str(source)]
+    for fmt, temp_output in zip(target_formats, temp_outputs):
+        args += ['-map', '0:a:0', '-vn']
+        if source_codec in AUDIO_FORMATS[fmt]['copy_codecs']:
+            args += ['-c:a', 'copy']
+        else:
+            args += ['-c:a', AUDIO_FORMATS[fmt]['codec'], '-b:a', f'{quality}k']
+        args.append(str(temp_output))
+    try:
+        _run_ffmpeg(args, token)
+    except Exception:
+        for temp_output in temp_outputs:
+            _remove(temp_output)
+        raise
+
+    for temp_output, output in zip(temp_outputs, outputs):
+        os.replace(temp_output, output)
+    if not keep_source and source not in outputs:
+        _remove(source)
+    return outputs
+
+
+def _run_ffmpeg(args, token: Optional[CancellationToken]):
+    """Run FFmpeg, tied to the job's token, and raise if it fails or gets cancelled."""
+    if token is not None:
+        token.raise_if_cancelled()
+    process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE)
+    if token is not None:
+        token.register_process(process)
+    _, stderr = process.communicate()
+
+    if token is not None and token.cancelled:
+        raise DownloadCancelled("Download cancelled")
+    if process.returncode != 0:
+        lines = stderr.decode('utf-8', 'replace').strip().splitlines()
+        raise RuntimeError(f"Conversion failed: {lines[-1] if lines else process.returncode}")
+
+
+def _remove(path):
+    """Delete a file if it exists."""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
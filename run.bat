@@ -35,10 +35,23 @@ if errorlevel 1 (
     )
 )
 
-REM Run the downloader
+REM Run the downloader (with no arguments, ask for a URL)
 echo [*] Starting YouTube Downloader...
 echo.
-python youtube_downloader.py
+if not "%~1"=="" goto run_with_args
+set /p URL="URL: "
+if "%URL%"=="" (
+    echo [X] No URL provided!
+    pause
+    exit /b 2
+)
+python youtube_downloader.py "%URL%"
+goto done
+
+:run_with_args
+python youtube_downloader.py %*
+
+:done
 
 REM Keep window open
 echo.
@@ -0,0 +1,157 @@
+"""
+Settings
+Typed app settings stored in config.ini. The file is read once when the app
+starts; after that settings are plain attribute reads. Every change rewrites
+the whole file through a temp file that is renamed over the old one, so a
+crash can't leave a half-written or truncated config behind. The custom
+image is kept in its own cache file instead of as base64 inside config.ini.
+"""
+
+import base64
+import os
+import threading
+from dataclasses import dataclass, fields
+from pathlib import Path
+from typing import Optional
+
+
+@dataclass
+class Settings:
+    """Everything kept in config.ini (types are used to parse the file)."""
+
+    download_path: Optional[str] = None
+    custom_image_is_gif: bool = False
+
+
+class SettingsStore:
+    """
+    In-memory settings backed by config.ini.
+
+    config.ini keeps its simple "key=value" lines so older versions can
+    still read it. Keys this version doesn't know about are kept as they
+    are when the file is rewritten.
+    """
+
+    def __init__(self, config_path, image_path=None):
+        """
+        Load the settings.
+
+        Args:
+            config_path: Path of config.ini
+            image_path: Cache file for the custom image (default: custom_image.bin next to config.ini)
+        """
+        self.config_path = Path(config_path)
+        self.image_path = Path(image_path) if image_path else self.config_path.with_name("custom_image.bin")
+        self.settings = Settings()
+
+        self._lock = threading.Lock()
+        # Lines of keys Settings doesn't have, written back unchanged
+        self._unknown = {}
+        self._image = None
+        self._image_loaded = False
+        self._load()
+
+    def update(self, **changes):
+        """
+        Change one or more settings and save them.
+
+        Raises:
+            AttributeError: For a name that isn't a setting
+            OSError: If config.ini couldn't be written (the old file is left intact)
+        """
+        with self._lock:
+            for name, value in changes.items():
+                if not hasattr(self.settings, name):
+                    raise AttributeError(f"Unknown setting: {name}")
+                setattr(self.settings, name, value)
+            self._save()
+
+    def load_custom_image(self) -> Optional[bytes]:
+        """The custom image's file contents, or None if there isn't one (read from disk once)."""
+        with self._lock:
+            if not self._image_loaded:
+                try:
+                    self._image = self.image_path.read_bytes() or None
+                except OSError:
+                    self._image = None
+                self._image_loaded = True
+            return self._image
+
+    def save_custom_image(self, data: bytes, is_gif: bool):
+        """Store a new custom image (and whether it's an animated GIF)."""
+        with self._lock:
+            _write_atomic(self.image_path, data)
+            self._image = data
+            self._image_loaded = True
+            self.settings.custom_image_is_gif = is_gif
+            self._save()
+
+    def _load(self):
+        """Read config.ini into self.settings."""
+        try:
+            with open(self.config_path, 'r', encoding='utf-8') as f:
+                lines = f.read().splitlines()
+        except (OSError, UnicodeDecodeError):
+            return
+
+        types = {f.name: f.type for f in fields(Settings)}
+        legacy_image = None
+        for line in lines:
+            key, sep, value = line.partition('=')
+            key, value = key.strip(), value.strip()
+            if not sep or not key:
+                continue
+            if key == 'custom_image_data':
+                # Older versions kept the image inside config.ini as base64
+                legacy_image = value
+            elif key in types:
+                setattr(self.settings, key, _parse(value, types[key]))
+            else:
+                self._unknown[key] = value
+
+        if legacy_image:
+            # Move it to its own file so config.ini stays small
+            try:
+                data = base64.b64decode(legacy_image)
+                _write_atomic(self.image_path, data)
+                self._image = data
+                self._image_loaded = True
+                self._save()
+            except (OSError, ValueError):
+                pass
+
+    def _save(self):
+        """Write config.ini from self.settings (caller holds the lock)."""
+        lines = []
+        for f in fields(Settings):
+            value = getattr(self.settings, f.name)
+            if value is None:
+                continue
+            if isinstance(value, bool):
+                value = str(value).lower()
+            lines.append(f"{f.name}={value}\n")
+        lines += [f"{key}={value}\n" for key, value in self._unknown.items()]
+        _write_atomic(self.config_path, ''.join(lines).encode('utf-8'))
+
+
+def _parse(value: str, type_):
+    """Convert a config.ini value to a Settings field's type."""
+    if type_ in (bool, 'bool'):
+        return value.lower() in ('true', '1', 'yes')
+    if type_ in (int, 'int'):
+        try:
+            return int(value)
+        except ValueError:
+            return None
+    return value or None
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Write a file through a temp file and rename, so it's never half-written."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = path.with_name(path.name + '.tmp')
+    with open(tmp_file, 'wb') as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
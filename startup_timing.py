@@ -0,0 +1,55 @@
+"""
+Startup Timing
+Records how long each part of starting the app takes (imports, building the
+window, warming up libraries in the background), so slow starts can be
+tracked down. Steps from any thread can be recorded.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+
+class StartupTimer:
+    """Collects timed steps and milestones, measured from when it was created."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        # (name, offset from start, duration or None for milestones, thread name)
+        self._entries: List[Tuple[str, float, Optional[float], str]] = []
+
+    @contextmanager
+    def step(self, name: str):
+        """Time the code inside a with block as one step."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add(name, start, time.perf_counter() - start)
+
+    def mark(self, name: str):
+        """Record that a point in the startup was reached (e.g. "window shown")."""
+        self._add(name, time.perf_counter(), None)
+
+    def elapsed(self) -> float:
+        """Seconds since the timer was created."""
+        return time.perf_counter() - self.started
+
+    def report(self) -> List[str]:
+        """Breakdown of every step and milestone, in the order they started."""
+        with self._lock:
+            entries = sorted(self._entries, key=lambda entry: entry[1])
+        lines = ["STARTUP TIMING (seconds since launch)"]
+        for name, offset, duration, thread in entries:
+            if duration is None:
+                lines.append(f"  {offset:7.3f}          * {name}")
+            else:
+                lines.append(f"  {offset:7.3f}  {duration:7.3f}  {name} [{thread}]")
+        return lines
+
+    def _add(self, name: str, start: float, duration: Optional[float]):
+        with self._lock:
+            self._entries.append((name, start - self.started, duration,
+                                  threading.current_thread().name))
@@ -0,0 +1,63 @@
+"""Planner choices on format lists recorded from real extractions (tests/fixtures)."""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from format_planner import plan_format, rank_formats
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def load(name):
+    with open(FIXTURES / f"{name}.json", 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.mark.parametrize("format_type, quality, can_merge, expected", [
+    ('mp4', 'best', True, '137+140'),
+    ('mp4', '720p', True, '136+140'),
+    ('webm', 'best', True, '248+251'),
+    ('m4a', 'best', True, '140'),
+    ('ogg', 'best', True, '251'),
+    ('mp4', 'best', False, '18'),
+])
+def test_single_language(format_type, quality, can_merge, expected):
+    plan = plan_format(load('single_language'), format_type, quality, can_merge)
+    assert plan.format_spec == expected
+
+
+@pytest.mark.parametrize("format_type, quality, expected", [
+    ('mp4', 'best', '137+140-0'),
+    ('mp4', '720p', '136+140-0'),
+    ('webm', 'best', '248+251-0'),
+    ('m4a', 'best', '140-0'),
+    ('ogg', 'best', '251-0'),
+    ('mp3', 'best', '140-0'),
+])
+def test_original_audio_beats_smaller_dub(format_type, quality, expected):
+    plan = plan_format(load('multi_audio'), format_type, quality)
+    assert plan.format_spec == expected
+
+
+def test_dub_is_explained_when_ranked():
+    ranking = rank_formats(load('multi_audio')['formats'], 'm4a')
+    dub = next(choice for choice in ranking if choice.format_spec == '140-1')
+    assert "de audio track" in dub.reasons
+    assert ranking.index(dub) > 0
+
+
+def test_drm_and_less_preferred_formats_are_avoided():
+    info = load('drm')
+    plan = plan_format(info, 'mp4', 'best')
+    # The 1080p streams are DRM protected and the DRC audio is marked as less preferred
+    assert plan.format_spec == '136+140'
+    specs = {choice.format_spec for choice in rank_formats(info['formats'], 'mp4')}
+    assert not any(spec.startswith(('137', '399')) for spec in specs)
+
+
+def test_no_formats_left():
+    info = load('drm')
+    info['formats'] = [f for f in info['formats'] if f.get('has_drm')]
+    assert plan_format(info, 'mp4') is None
@@ -0,0 +1,139 @@
+"""
+Thumbnail Cache
+Video thumbnails on disk, keyed by extractor and video id, so a video that
+was seen before (in the queue, or downloaded again) shows its preview
+without fetching it again. The folder is kept under a size limit by
+deleting the least recently used thumbnails.
+"""
+
+import os
+import re
+import threading
+import urllib.request
+from pathlib import Path
+from typing import Optional, Tuple
+
+
+# Thumbnails at least this wide are preferred (the panel is 240x240)
+PREFERRED_WIDTH = 240
+
+# Largest thumbnail download accepted
+MAX_THUMBNAIL_BYTES = 5 * 1024 * 1024
+
+
+class ThumbnailCache:
+    """Size-bounded folder of thumbnail files, least recently used deleted first."""
+
+    def __init__(self, cache_folder, max_bytes: int = 50 * 1024 * 1024):
+        """
+        Open the cache (the folder is created on first write).
+
+        Args:
+            cache_folder: Folder holding the thumbnail files
+            max_bytes: Total size the folder is trimmed back to
+        """
+        self.cache_folder = Path(cache_folder)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # Total size of the folder, worked out on first write
+        self._total_bytes = None
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        """Cached thumbnail of a video, or None."""
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+            # Mark it as recently used
+            os.utime(path)
+        except OSError:
+            return None
+        return data or None
+
+    def put(self, key: Tuple[str, str], data: bytes):
+        """Store a thumbnail (written to a temp file first so it's never half-written)."""
+        path = self._path(key)
+        with self._lock:
+            try:
+                self.cache_folder.mkdir(parents=True, exist_ok=True)
+                if self._total_bytes is None:
+                    self._total_bytes = sum(entry.stat().st_size for entry in self._entries())
+                try:
+                    self._total_bytes -= path.stat().st_size
+                except OSError:
+                    pass
+                tmp_file = path.with_name(path.name + '.tmp')
+                tmp_file.write_bytes(data)
+                os.replace(tmp_file, path)
+                self._total_bytes += len(data)
+                if self._total_bytes > self.max_bytes:
+                    self._trim()
+            except OSError:
+                pass
+
+    def fetch(self, key: Optional[Tuple[str, str]], url: str, timeout: float = 10) -> bytes:
+        """
+        Get a thumbnail from the cache, or download it and cache it.
+
+        Args:
+            key: (extractor, video id), or None to download without caching
+            url: Thumbnail URL from the video's info dict
+            timeout: Seconds to wait for the server
+
+        Raises:
+            OSError: If the download fails or the file is too large
+        """
+        if key is not None:
+            data = self.get(key)
+            if data is not None:
+                return data
+
+        request = urllib.request.Request(url, headers={'User-Agent': 'Mozilla/5.0'})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = response.read(MAX_THUMBNAIL_BYTES + 1)
+        if len(data) > MAX_THUMBNAIL_BYTES:
+            raise OSError("Thumbnail is too large")
+
+        if key is not None:
+            self.put(key, data)
+        return data
+
+    def _trim(self):
+        """Delete least recently used thumbnails until the folder fits (caller holds the lock)."""
+        entries = sorted(((entry.stat().st_mtime, entry.stat().st_size, entry)
+                          for entry in self._entries()), key=lambda item: item[0])
+        for _, size, entry in entries:
+            if self._total_bytes <= self.max_bytes:
+                break
+            try:
+                entry.unlink()
+                self._total_bytes -= size
+            except OSError:
+                pass
+
+    def _entries(self):
+        return [entry for entry in self.cache_folder.iterdir()
+                if entry.is_file() and not entry.name.endswith('.tmp')]
+
+    def _path(self, key: Tuple[str, str]) -> Path:
+        """File name for a key (anything unsafe in file names is replaced)."""
+        name = re.sub(r'[^A-Za-z0-9_.-]', '_', f"{key[0].lower()}_{key[1]}")
+        return self.cache_folder / f"{name}.img"
+
+
+def thumbnail_url(info: Optional[dict]) -> Optional[str]:
+    """
+    Pick the thumbnail to show for a video.
+
+    The smallest one that still fills the panel is used, so previews are
+    quick to fetch; if none are that large the best one is taken.
+    """
+    if not info:
+        return None
+    thumbnails = [t for t in info.get('thumbnails') or [] if t.get('url')]
+    large_enough = [t for t in thumbnails if (t.get('width') or 0) >= PREFERRED_WIDTH]
+    if large_enough:
+        return min(large_enough, key=lambda t: t['width'])['url']
+    if thumbnails:
+        # yt-dlp lists thumbnails from worst to best
+        return thumbnails[-1]['url']
+    return info.get('thumbnail')
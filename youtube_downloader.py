@@ -4,121 +4,616 @@ Supports multiple formats: MP4, MP3, OGG, WEBM, etc.
 """
 
 import yt_dlp
+import argparse
+import json
 import os
+import signal
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from bandwidth import NORMAL_PRIORITY, check_weight, shared_scheduler
+from download_archive import DownloadArchive, archive_key, requested_format
+from ffmpeg_locator import locate_ffmpeg
+from format_planner import plan_format, selector_options
+from fragment_tuner import FragmentTuner
+from job_control import CancellationToken
+from job_journal import CANCELLED, COMPLETED, FAILED, JobJournal
+from metadata_cache import MetadataCache, canonical_key, extract_info_cached, invalidate_info
+from playlist_expander import iter_playlist_urls, may_be_playlist
+from postprocess_pipeline import (AUDIO_FORMATS, PostProcessingPool, StageStats, audio_codec,
+                                  convert_audio, downloaded_file, split_formats)
+
+
+# Folder (inside the download folder) holding caches and other state files
+STATE_DIR_NAME = ".ingen"
+
+# Least time between two "progress" events of one job (its last one is always sent)
+PROGRESS_EVENT_INTERVAL = 0.25
+
+
+@dataclass
+class DownloadResult:
+    """Outcome of a single download job."""
+    
+    url: str
+    # completed, skipped, failed, cancelled, or interrupted (stopped by a shutdown
+    # and left unfinished in the journal to be resumed); processing while converting
+    status: str = "pending"
+    title: Optional[str] = None
+    output_path: Optional[Path] = None
+    # Every file the job produced (more than one when several formats were requested)
+    output_paths: List[Path] = field(default_factory=list)
+    bytes: int = 0
+    started_at: float = 0.0
+    finished_at: float = 0.0
+    error: Optional[str] = None
+    index: int = 0
+    # Set while the file waits for (or is in) post-processing; resolves to this result
+    postprocessing: Optional[Future] = field(default=None, repr=False, compare=False)
+    
+    @property
+    def ok(self) -> bool:
+        """True if the job finished successfully (or the video was already downloaded)."""
+        return self.status in ("completed", "skipped")
+    
+    @property
+    def elapsed(self) -> float:
+        """Wall-clock seconds the job took."""
+        return max(0.0, self.finished_at - self.started_at)
+    
+    def to_dict(self) -> dict:
+        """JSON-friendly copy of the result (paths as strings, no future)."""
+        return {'url': self.url,
+                'status': self.status,
+                'title': self.title,
+                'output_path': str(self.output_path) if self.output_path else None,
+                'output_paths': [str(path) for path in self.output_paths],
+                'bytes': self.bytes,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'duration': round(self.elapsed, 3),
+                'error': self.error,
+                'index': self.index}
 
 
 class YouTubeDownloader:
     """Main class for downloading YouTube videos in various formats."""
     
-    def __init__(self, download_folder: str = "downloads"):
+    def __init__(self, download_folder: str = "downloads", use_cache: bool = True,
+                 keep_partial_files: bool = True, use_journal: bool = True,
+                 use_archive: bool = True, fragment_concurrency: Optional[int] = None):
         """
         Initialize the downloader.
         
         Args:
             download_folder: Path to save downloaded files (default: "downloads")
+            use_cache: Reuse extracted video info from the on-disk metadata cache
+            keep_partial_files: Keep .part files of cancelled jobs so they can resume later
+            use_journal: Record jobs on disk so unfinished ones can be resumed after a restart
+            use_archive: Skip videos already downloaded in the same format and quality
+            fragment_concurrency: DASH/HLS fragments fetched at once (None tunes it automatically)
         """
+        self.keep_partial_files = keep_partial_files
+        self.fragment_concurrency = fragment_concurrency
+        # Shared by every job, so what one download learns about the link helps the next
+        self.fragment_tuner = FragmentTuner()
+        # Process-wide bandwidth limit (shared with every other downloader in the process)
+        self.bandwidth = shared_scheduler()
+        # Audio conversion runs on its own CPU-sized pool, overlapping the next downloads
+        self.postprocessing = PostProcessingPool()
+        self.download_stats = StageStats("download")
         self.download_folder = Path(download_folder)
         self.download_folder.mkdir(exist_ok=True)
+        self.state_folder = self.download_folder / STATE_DIR_NAME
+        self.metadata_cache: Optional[MetadataCache] = (
+            MetadataCache(self.state_folder / "metadata.sqlite3") if use_cache else None
+        )
+        self.journal: Optional[JobJournal] = (
+            JobJournal(self.state_folder / "jobs.sqlite3") if use_journal else None
+        )
+        self.archive: Optional[DownloadArchive] = (
+            DownloadArchive(self.state_folder / "archive.txt") if use_archive else None
+        )
     
-    def download_video(self, url: str, format_type: str = "mp4", quality: str = "best") -> bool:
+    def download_video(self, url: str, format_type: str = "mp4", quality: str = "best",
+                       token: Optional[CancellationToken] = None,
+                       fragment_concurrency: Optional[int] = None,
+                       priority: float = NORMAL_PRIORITY) -> bool:
         """
         Download a video from YouTube.
         
         Args:
             url: YouTube video URL
-            format_type: Output format (mp4, mp3, ogg, webm, etc.)
+            format_type: Output format (mp4, mp3, ogg, webm, etc.), or several separated by
+                commas (e.g. "mp4,mp3") - the video is downloaded once for all of them
             quality: Quality setting (best, worst, or specific like 720p, 1080p)
+            token: Cancelling this token (from another thread) stops the download
+            fragment_concurrency: DASH/HLS fragments fetched at once (None uses the default)
+            priority: Weight of this job's share of the bandwidth limit (finite, above 0)
         
         Returns:
             True if download successful, False otherwise
         """
+        split_formats(format_type)  # Raise ValueError for bad format lists straight away
+        check_weight(priority)
+        result = self._download(url, format_type, quality, token=token,
+                                fragment_concurrency=fragment_concurrency, priority=priority)
+        if result.postprocessing is not None:
+            result = result.postprocessing.result()
+        return result.ok
+    
+    def start_job(self, url: str, format_type: str = "mp4", quality: str = "best",
+                  token: Optional[CancellationToken] = None,
+                  events: Optional[Callable[[dict], None]] = None,
+                  fragment_concurrency: Optional[int] = None,
+                  priority: float = NORMAL_PRIORITY,
+                  journal_id: Optional[str] = None) -> DownloadResult:
+        """
+        Run one job's download stage quietly, for callers that run their own pool.
+        
+        Audio conversion isn't waited for: if the result's status is
+        "processing", its postprocessing future resolves to the final result
+        once the post-processing pool is done with it.
+        
+        Args:
+            url: YouTube video URL (a playlist URL is downloaded as one job)
+            format_type: Output format (mp4, mp3, ogg, webm, etc.), or several separated by commas
+            quality: Quality setting (best, worst, or specific like 720p, 1080p)
+            token: Cancelling this token (from another thread) stops the job
+            events: Called with a dict for every status change and progress update
+                (from the download and post-processing threads, so it must be thread-safe)
+            fragment_concurrency: DASH/HLS fragments fetched at once (None uses the default)
+            priority: Weight of this job's share of the bandwidth limit (finite, above 0)
+            journal_id: Journal entry being resumed (a new one is created if None)
+        
+        Returns:
+            DownloadResult of the download stage (never raises once the arguments are valid)
+        """
+        split_formats(format_type)  # Raise ValueError for bad format lists straight away
+        check_weight(priority)
+        self.download_stats.job_queued()
+        return self._download_stage({'url': url, 'format_type': format_type, 'quality': quality,
+                                     'fragment_concurrency': fragment_concurrency,
+                                     'priority': priority, 'journal_id': journal_id,
+                                     'events': events}, token)
+    
+    def download_many(self, urls: Iterable[str], format_type: str = "mp4", quality: str = "best",
+                      max_workers: int = 4, ordered: bool = False,
+                      token: Optional[CancellationToken] = None,
+                      fragment_concurrency: Optional[int] = None,
+                      priority: float = NORMAL_PRIORITY) -> Iterator[DownloadResult]:
+        """
+        Download several videos concurrently on a bounded thread pool.
+        
+        URLs are pulled from the iterable lazily, so at most a couple of jobs
+        per worker are queued at any time.
+        
+        Args:
+            urls: YouTube video URLs
+            format_type: Output format (mp4, mp3, ogg, webm, etc.), or several separated by commas
+            quality: Quality setting (best, worst, or specific like 720p, 1080p)
+            max_workers: Maximum number of downloads running at once
+            ordered: Yield results in input order instead of as they complete
+            token: Cancelling this token stops every running and waiting job
+            fragment_concurrency: DASH/HLS fragments fetched at once per job (None uses the default)
+            priority: Weight of each job's share of the bandwidth limit (finite, above 0)
+        
+        Yields:
+            One DownloadResult per URL
+        """
+        split_formats(format_type)  # Raise ValueError for bad format lists straight away
+        check_weight(priority)
+        jobs = ({'url': url, 'format_type': format_type, 'quality': quality,
+                 'fragment_concurrency': fragment_concurrency, 'priority': priority}
+                for url in urls)
+        return self._run_jobs(jobs, max_workers, ordered, token)
+    
+    def download_playlist(self, url: str, format_type: str = "mp4", quality: str = "best",
+                          max_workers: int = 4, ordered: bool = False,
+                          token: Optional[CancellationToken] = None,
+                          fragment_concurrency: Optional[int] = None,
+                          priority: float = NORMAL_PRIORITY) -> Iterator[DownloadResult]:
+        """
+        Download every video of a playlist or channel concurrently.
+        
+        The playlist is read lazily with flat extraction and fed straight into
+        the download pool, so the first video starts after the first page of
+        the list and memory use doesn't depend on the playlist's length.
+        
+        Args:
+            url: Playlist, channel or video URL
+            format_type: Output format (mp4, mp3, ogg, webm, etc.), or several separated by commas
+            quality: Quality setting (best, worst, or specific like 720p, 1080p)
+            max_workers: Maximum number of downloads running at once
+            ordered: Yield results in playlist order instead of as they complete
+            token: Cancelling this token stops reading the playlist and every job
+            fragment_concurrency: DASH/HLS fragments fetched at once per job (None uses the default)
+            priority: Weight of each job's share of the bandwidth limit
+        
+        Yields:
+            One DownloadResult per video
+        """
+        urls = iter_playlist_urls(url, cache=self.metadata_cache, token=token)
+        return self.download_many(urls, format_type, quality, max_workers, ordered, token,
+                                  fragment_concurrency, priority)
+    
+    def resume_unfinished(self, max_workers: int = 4,
+                          token: Optional[CancellationToken] = None) -> Iterator[DownloadResult]:
+        """
+        Re-run jobs that were still queued or running when the program last stopped.
+        
+        Partly downloaded files continue from their .part file instead of
+        starting over. Jobs another process sharing the download folder is
+        still working on are left alone.
+        
+        Args:
+            max_workers: Maximum number of downloads running at once
+            token: Cancelling this token stops every resumed job
+        
+        Yields:
+            One DownloadResult per resumed job
+        """
+        entries = self.journal.claim_unfinished() if self.journal is not None else []
+        jobs = ({'url': entry.url,
+                 'format_type': entry.options.get('format_type', 'mp4'),
+                 'quality': entry.options.get('quality', 'best'),
+                 'fragment_concurrency': entry.options.get('fragment_concurrency'),
+                 'priority': entry.options.get('priority', NORMAL_PRIORITY),
+                 'journal_id': entry.job_id} for entry in entries)
+        return self._run_jobs(jobs, max_workers, False, token)
+    
+    def _run_jobs(self, jobs: Iterable[dict], max_workers: int, ordered: bool,
+                  token: Optional[CancellationToken]) -> Iterator[DownloadResult]:
+        """
+        Run jobs (dicts of _download() arguments) on a bounded thread pool.
+        
+        Jobs are pulled from the iterable lazily, so at most a couple of jobs
+        per worker are queued at any time.
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        return self._iter_pool(iter(jobs), max_workers, ordered, token)
+    
+    def _iter_pool(self, job_iter: Iterator[dict], max_workers: int, ordered: bool,
+                   token: Optional[CancellationToken]) -> Iterator[DownloadResult]:
+        """Generator behind _run_jobs (kept separate so argument errors raise straight away)."""
+        index_iter = enumerate(job_iter)
+        in_flight = {}
+        finished = {}
+        next_index = 0
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download") as pool:
+            def submit_more():
+                # Keep the pool busy without pulling the whole job list into memory
+                while len(in_flight) + len(finished) < max_workers * 2:
+                    try:
+                        index, job = next(index_iter)
+                    except StopIteration:
+                        return
+                    self.download_stats.job_queued()
+                    future = pool.submit(self._download_stage, job, token)
+                    in_flight[future] = index
+            
+            try:
+                submit_more()
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        index = in_flight.pop(future)
+                        result = future.result()
+                        if result.postprocessing is not None and result.postprocessing is not future:
+                            # Downloaded - the slot is free, wait for the conversion separately
+                            in_flight[result.postprocessing] = index
+                            continue
+                        result.index = index
+                        if ordered:
+                            finished[index] = result
+                        else:
+                            yield result
+                    
+                    while next_index in finished:
+                        yield finished.pop(next_index)
+                        next_index += 1
+                    
+                    submit_more()
+            finally:
+                # If the caller stops iterating early, drop jobs that haven't started
+                for future in in_flight:
+                    future.cancel()
+    
+    def pipeline_stats(self) -> dict:
+        """Queue depth and throughput of the download and post-processing stages."""
+        return {'download': self.download_stats.snapshot(),
+                'postprocess': self.postprocessing.stats.snapshot()}
+    
+    def _download_stage(self, job: dict, token: Optional[CancellationToken]) -> DownloadResult:
+        """Run one pool job's download, counting it in the download stage's stats."""
+        self.download_stats.job_started()
+        result = self._download(verbose=False, token=token, **job)
+        self.download_stats.job_done(result.bytes, result.status in ("completed", "processing"))
+        return result
+    
+    def _download(self, url: str, format_type: str, quality: str, verbose: bool = True,
+                  token: Optional[CancellationToken] = None,
+                  journal_id: Optional[str] = None,
+                  fragment_concurrency: Optional[int] = None,
+                  priority: float = NORMAL_PRIORITY,
+                  events: Optional[Callable[[dict], None]] = None) -> DownloadResult:
+        """
+        Run a single download job.
+        
+        Args:
+            url: YouTube video URL
+            format_type: Output format(s), comma separated
+            quality: Quality setting
+            verbose: Print progress and status messages
+            token: Batch or caller token; the job gets its own child token
+            journal_id: Journal entry being resumed (a new one is created if None)
+            fragment_concurrency: DASH/HLS fragments fetched at once (None uses the default)
+            priority: Weight of this job's share of the bandwidth limit
+            events: Called with a dict for every status change and progress update
+        
+        Returns:
+            DownloadResult describing the job (never raises)
+        """
+        result = DownloadResult(url=url, started_at=time.time())
+        info = None
+        # Each job gets its own token so cleanup only touches this job's files
+        token = CancellationToken(parent=token)
+        # The first format is what gets downloaded, audio formats are made from that copy
+        formats = split_formats(format_type)
+        audio_targets = [f for f in formats if f in AUDIO_FORMATS]
+        fmt = requested_format(",".join(formats), quality)
+        
+        # Most URLs give away their video id, so known videos are skipped without any extraction
+        if self._is_archived(canonical_key(url), fmt):
+            return self._skip(result, verbose, journal_id, events)
+        
+        if self.journal is not None:
+            if journal_id is None:
+                journal_id = self.journal.add(url, {'format_type': format_type, 'quality': quality,
+                                                    'fragment_concurrency': fragment_concurrency,
+                                                    'priority': priority})
+            elif verbose:
+                resumed = self.journal.get(journal_id)
+                if resumed is not None and resumed.partial_bytes:
+                    print(f"\n↩️ Resuming from {resumed.partial_bytes / (1024 * 1024):.1f}MB")
+            self.journal.mark_running(journal_id)
+        
         try:
-            ydl_opts = self._get_download_options(format_type, quality)
+            token.raise_if_cancelled()
+            ydl_opts = token.attach(self._get_download_options(formats[0], quality, verbose,
+                                                               fragment_concurrency))
+            if journal_id is not None:
+                ydl_opts['progress_hooks'].append(self._journal_hook(journal_id))
+            if events is not None:
+                ydl_opts['progress_hooks'].append(self._event_hook(events))
+            # Keep the job within its share of the global bandwidth limit
+            self.bandwidth.attach(ydl_opts, token, priority, token)
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                print(f"\n📥 Downloading from: {url}")
-                print(f"📁 Format: {format_type.upper()}")
-                print(f"⚙️ Quality: {quality}")
+                if verbose:
+                    print(f"\n📥 Downloading from: {url}")
+                    print(f"📁 Format: {format_type.upper()}")
+                    print(f"⚙️ Quality: {quality}")
+                
+                # Resolve the video once (no format selection yet), or
+                # reuse a still-valid copy from the metadata cache
+                _emit(events, {'type': 'status', 'status': 'extracting'})
+                info = extract_info_cached(ydl, url, self.metadata_cache)
+                result.title = info.get('title', 'Unknown')
+                _emit(events, {'type': 'info', 'title': result.title,
+                               'duration': info.get('duration')})
+                if self._is_archived(archive_key(info), fmt):
+                    return self._skip(result, verbose, journal_id, events)
+                
+                # Pick formats by resolution, size and merge/transcode cost; the
+                # selector string stays as the fallback if they can't be fetched
+                plan = plan_format(info, formats[0], quality,
+                                   can_merge=bool(ydl_opts.get('ffmpeg_location')))
+                if plan is not None:
+                    ydl.format_selector = ydl.build_format_selector(
+                        f"{plan.format_spec}/{ydl_opts['format']}")
+                if verbose:
+                    print(f"🎬 Title: {result.title}")
+                    if plan is not None:
+                        print(f"🧮 Formats: {plan.explain()}")
+                    print()
                 
-                # Get video info first
-                info = ydl.extract_info(url, download=False)
-                title = info.get('title', 'Unknown')
-                print(f"🎬 Title: {title}\n")
+                audio = bool(audio_targets)
+                if audio and info.get('_type', 'video') in ('playlist', 'multi_video'):
+                    # Whole playlists downloaded in one go convert each entry inline
+                    # (only to the first format - extra formats need a single video)
+                    if formats[0] in AUDIO_FORMATS:
+                        ydl.add_post_processor(yt_dlp.postprocessor.FFmpegExtractAudioPP(
+                            ydl, preferredcodec=AUDIO_FORMATS[formats[0]]['ytdlp_codec'],
+                            preferredquality='192'))
+                    audio = False
                 
-                # Download
-                ydl.download([url])
+                # Download from the info we already have instead of
+                # running the extractor a second time
+                token.raise_if_cancelled()
+                _emit(events, {'type': 'status', 'status': 'downloading'})
+                with token.activate():
+                    processed = ydl.process_ie_result(info, download=True)
                 
-                print(f"\n✅ Download complete! Saved to: {self.download_folder}")
-                return True
+                result.output_path = downloaded_file(processed)
+                if result.output_path is not None and result.output_path.exists():
+                    result.bytes = result.output_path.stat().st_size
+                
+                if audio and result.output_path is not None:
+                    # Hand the file to the post-processing pool and free this download slot
+                    result.status = "processing"
+                    _emit(events, {'type': 'status', 'status': 'processing'})
+                    result.postprocessing = self.postprocessing.submit(
+                        self._postprocess, result, formats, processed, fmt, verbose,
+                        token, journal_id, events, input_bytes=result.bytes)
+                    if verbose:
+                        print("\n🎵 Download complete, converting...")
+                    return result
+                
+                result.status = "completed"
+                result.output_paths = [result.output_path] if result.output_path else []
+                self._record_download(info, fmt)
+                if verbose:
+                    print(f"\n✅ Download complete! Saved to: {self.download_folder}")
                 
         except Exception as e:
-            print(f"\n❌ Error downloading video: {e}")
-            return False
+            if token.cancelled:
+                # yt-dlp may wrap our exception (or see a killed FFmpeg), so trust the token
+                result.status = "interrupted" if token.interrupted else "cancelled"
+                if not self.keep_partial_files and not token.interrupted:
+                    token.cleanup_partial_files()
+                if verbose:
+                    print("\n🛑 Download cancelled")
+            else:
+                # The cached stream URLs may be what failed, so re-extract next time
+                invalidate_info(self.metadata_cache, info)
+                result.status = "failed"
+                result.error = str(e)
+                if verbose:
+                    print(f"\n❌ Error downloading video: {e}")
+        finally:
+            self.bandwidth.release(token)
+        
+        return self._finish(result, journal_id, events)
+    
+    def _postprocess(self, result: DownloadResult, formats: List[str], info: dict, fmt: str,
+                     verbose: bool, token: CancellationToken, journal_id: Optional[str],
+                     events: Optional[Callable[[dict], None]] = None) -> DownloadResult:
+        """Convert a downloaded file on the post-processing pool and finish its job."""
+        try:
+            ffmpeg = locate_ffmpeg(self.state_folder / "ffmpeg.json")
+            # A downloaded video is one of the outputs itself, so it stays
+            keep_source = formats[0] not in AUDIO_FORMATS
+            outputs = convert_audio(result.output_path,
+                                    [f for f in formats if f in AUDIO_FORMATS],
+                                    ffmpeg.ffmpeg_path, token=token, keep_source=keep_source,
+                                    source_codec=audio_codec(info))
+            result.output_paths = ([result.output_path] if keep_source else []) + outputs
+            result.output_path = result.output_paths[0]
+            result.bytes = sum(path.stat().st_size for path in result.output_paths)
+            result.status = "completed"
+            self._record_download(info, fmt)
+            if verbose:
+                print(f"\n✅ Conversion complete! Saved to: {', '.join(map(str, result.output_paths))}")
+        except Exception as e:
+            if token.cancelled:
+                result.status = "interrupted" if token.interrupted else "cancelled"
+                if not self.keep_partial_files and not token.interrupted:
+                    token.cleanup_partial_files()
+            else:
+                result.status = "failed"
+                result.error = str(e)
+                if verbose:
+                    print(f"\n❌ Error converting file: {e}")
+        return self._finish(result, journal_id, events)
+    
+    def _record_download(self, info: dict, fmt: str):
+        """Add a finished video to the download archive."""
+        key = archive_key(info)
+        if self.archive is not None and key is not None:
+            self.archive.add(*key, fmt)
+    
+    def _is_archived(self, key, fmt: str) -> bool:
+        """Check the download archive for an (extractor, video id) key."""
+        return self.archive is not None and key is not None and self.archive.contains(*key, fmt)
+    
+    def _skip(self, result: DownloadResult, verbose: bool, journal_id: Optional[str],
+              events: Optional[Callable[[dict], None]] = None) -> DownloadResult:
+        """Finish a job whose video is already in the download archive."""
+        result.status = "skipped"
+        if verbose:
+            print("\n⏭️ Already downloaded in this format, skipping")
+        return self._finish(result, journal_id, events)
+    
+    def _finish(self, result: DownloadResult, journal_id: Optional[str],
+                events: Optional[Callable[[dict], None]] = None) -> DownloadResult:
+        """Stamp the end time, record the outcome in the journal and send the last event."""
+        result.finished_at = time.time()
+        # Interrupted jobs stay queued/running in the journal, so the next start resumes them
+        if journal_id is not None and result.status != "interrupted":
+            state = {"completed": COMPLETED, "skipped": COMPLETED,
+                     "cancelled": CANCELLED}.get(result.status, FAILED)
+            self.journal.finish(journal_id, state, result.output_path, result.error)
+        _emit(events, dict(result.to_dict(), type='finished'))
+        return result
+    
+    def _journal_hook(self, journal_id: str):
+        """Build a progress hook that records the job's .part file in the journal."""
+        seen = set()
+        
+        def hook(d):
+            # Only write to the journal when a new partial file shows up
+            partial_file = d.get('tmpfilename')
+            if partial_file and partial_file not in seen:
+                seen.add(partial_file)
+                self.journal.set_partial_file(journal_id, partial_file)
+        
+        return hook
+    
+    def _event_hook(self, events: Callable[[dict], None]):
+        """Build a progress hook that turns yt-dlp's progress into (rate limited) events."""
+        last_sent = [0.0]
+        
+        def hook(d):
+            now = time.monotonic()
+            if d['status'] == 'downloading' and now - last_sent[0] < PROGRESS_EVENT_INTERVAL:
+                return
+            last_sent[0] = now
+            _emit(events, {'type': 'progress',
+                           'status': d['status'],
+                           'downloaded_bytes': d.get('downloaded_bytes'),
+                           'total_bytes': d.get('total_bytes') or d.get('total_bytes_estimate'),
+                           'speed': d.get('speed'),
+                           'eta': d.get('eta'),
+                           'filename': d.get('filename')})
+        
+        return hook
     
-    def _get_download_options(self, format_type: str, quality: str) -> dict:
+    def _get_download_options(self, format_type: str, quality: str, verbose: bool = True,
+                              fragment_concurrency: Optional[int] = None) -> dict:
         """
         Get yt-dlp options based on format type and quality.
         
         Args:
             format_type: Output format
             quality: Quality setting
+            verbose: Show the progress line (off for concurrent batch jobs)
+            fragment_concurrency: DASH/HLS fragments fetched at once (None uses the default)
         
         Returns:
             Dictionary of yt-dlp options
         """
         base_opts = {
             'outtmpl': str(self.download_folder / '%(title)s.%(ext)s'),
-            'progress_hooks': [self._progress_hook],
+            # Pick up from an existing .part file instead of starting over
+            'continuedl': True,
+            # Handle playlist entries one at a time instead of resolving them all up front
+            'lazy_playlist': True,
         }
+        if verbose:
+            base_opts['progress_hooks'] = [self._progress_hook]
+        else:
+            # Several jobs printing \r progress lines at once is just noise
+            base_opts.update({'quiet': True, 'noprogress': True})
         
-        # Format-specific options
-        if format_type.lower() == 'mp3':
-            base_opts.update({
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-            })
-        
-        elif format_type.lower() == 'ogg':
-            base_opts.update({
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'vorbis',
-                    'preferredquality': '192',
-                }],
-            })
-        
-        elif format_type.lower() == 'm4a':
-            base_opts.update({
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'm4a',
-                    'preferredquality': '192',
-                }],
-            })
-        
-        elif format_type.lower() in ['mp4', 'webm', 'mkv']:
-            # Video formats
-            if quality == 'best':
-                base_opts['format'] = f'bestvideo[ext={format_type}]+bestaudio[ext=m4a]/best[ext={format_type}]/best'
-            elif quality == 'worst':
-                base_opts['format'] = f'worstvideo[ext={format_type}]+worstaudio/worst'
-            else:
-                # Specific resolution (e.g., 720p, 1080p)
-                base_opts['format'] = f'bestvideo[height<={quality.replace("p", "")}][ext={format_type}]+bestaudio/best'
-            
-            base_opts['merge_output_format'] = format_type
+        # Point yt-dlp at FFmpeg (found once and cached, not looked up per job)
+        ffmpeg = locate_ffmpeg(self.state_folder / "ffmpeg.json")
+        if ffmpeg.available:
+            base_opts['ffmpeg_location'] = ffmpeg.location
         
-        else:
-            # Default to best quality
-            base_opts['format'] = 'best'
+        # Fetch DASH/HLS fragments in parallel (tuned from measured throughput unless fixed)
+        self.fragment_tuner.attach(base_opts, fragment_concurrency or self.fragment_concurrency)
+        
+        # Format-specific options (shared with the GUI). Audio is only downloaded
+        # here - the conversion runs on the post-processing pool so this download
+        # slot is free for the next job straight away
+        base_opts.update(selector_options(format_type, quality, can_merge=ffmpeg.available))
         
         return base_opts
     
@@ -132,46 +627,182 @@ class YouTubeDownloader:
             print("\r✓ Download finished, now processing...", flush=True)
 
 
-def main():
-    """Main function to run the downloader."""
-    print("=" * 60)
-    print("🎥 YouTube Downloader".center(60))
-    print("=" * 60)
+def _emit(events: Optional[Callable[[dict], None]], event: dict):
+    """Send a job event (a failing listener must not fail the download)."""
+    if events is None:
+        return
+    try:
+        events(event)
+    except Exception:
+        pass
+
+
+# Exit codes of the command line
+EXIT_OK = 0
+EXIT_PARTIAL_FAILURE = 1
+EXIT_USAGE = 2
+EXIT_ALL_FAILED = 3
+EXIT_INTERRUPTED = 130
+
+
+def read_url_lines(lines: Iterable[str]) -> Iterator[str]:
+    """URLs from a URL list, one per line (blank lines and # comments are skipped)."""
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith('#'):
+            yield line
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Argument parser of the command line."""
+    parser = argparse.ArgumentParser(
+        description="Download YouTube videos without prompts. One JSON line per job is written "
+                    "to stdout; messages go to stderr.",
+        epilog=f"Exit codes: {EXIT_OK} all jobs succeeded (or were already downloaded), "
+               f"{EXIT_PARTIAL_FAILURE} some failed, {EXIT_ALL_FAILED} all failed, "
+               f"{EXIT_USAGE} bad arguments, {EXIT_INTERRUPTED} interrupted.")
+    parser.add_argument('urls', nargs='*', metavar='URL',
+                        help="video, playlist or channel URLs (playlists are expanded into their videos)")
+    parser.add_argument('-a', '--batch-file', action='append', default=[], metavar='FILE',
+                        help="read URLs from a file, one per line ('-' for stdin; can be repeated). "
+                             "Without URLs or a file, piped stdin is read")
+    parser.add_argument('-f', '--format', default='mp4', dest='format_type', metavar='FORMAT',
+                        help="output format: mp4, webm, mkv, mp3, ogg, m4a, or several separated "
+                             "by commas, e.g. mp4,mp3 (default: mp4)")
+    parser.add_argument('-q', '--quality', default='best',
+                        help="best, worst, or a height like 720p (default: best)")
+    parser.add_argument('-j', '--jobs', type=int, default=4, metavar='N',
+                        help="downloads running at once (default: 4)")
+    parser.add_argument('-o', '--output', default='downloads', metavar='FOLDER',
+                        help="download folder (default: downloads)")
+    parser.add_argument('--fragments', type=int, default=None, metavar='N',
+                        help="DASH/HLS fragments fetched at once per download (default: tuned automatically)")
+    parser.add_argument('--ordered', action='store_true',
+                        help="write results in input order instead of as jobs finish")
+    parser.add_argument('--resume', action='store_true',
+                        help="first finish the jobs left unfinished by an earlier run")
+    parser.add_argument('--no-archive', action='store_true',
+                        help="download videos again even if they're in the download archive")
+    parser.add_argument('--quiet', action='store_true', help="don't print messages to stderr")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Run the command line.
     
-    # Initialize downloader
-    downloader = YouTubeDownloader(download_folder="downloads")
+    Args:
+        argv: Arguments (default: sys.argv[1:])
     
-    # Get user input
-    print("\n📝 Enter YouTube video URL:")
-    url = input("URL: ").strip()
+    Returns:
+        Exit code (see build_parser())
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    try:
+        split_formats(args.format_type.lower())
+    except ValueError as e:
+        parser.error(str(e))
+    if args.jobs < 1:
+        parser.error("--jobs must be at least 1")
     
-    if not url:
-        print("❌ No URL provided!")
-        return
+    batch_files = list(args.batch_file)
+    if not args.urls and not batch_files:
+        if sys.stdin.isatty():
+            parser.error("no URLs given (pass them as arguments, with --batch-file, or on stdin)")
+        batch_files = ['-']
+    for name in batch_files:
+        if name != '-' and not os.path.isfile(name):
+            parser.error(f"batch file not found: {name}")
+    
+    def message(text: str):
+        if not args.quiet:
+            print(text, file=sys.stderr, flush=True)
+    
+    downloader = YouTubeDownloader(download_folder=args.output, use_archive=not args.no_archive,
+                                   fragment_concurrency=args.fragments)
+    token = CancellationToken()
+    counts = {'ok': 0, 'failed': 0}
+    playlists = []
+    
+    def sources() -> Iterator[str]:
+        yield from args.urls
+        for name in batch_files:
+            if name == '-':
+                yield from read_url_lines(sys.stdin)
+            else:
+                with open(name, 'r', encoding='utf-8') as f:
+                    yield from read_url_lines(f)
     
-    print("\n📋 Available formats:")
-    print("  Video: mp4, webm, mkv")
-    print("  Audio: mp3, ogg, m4a")
+    def job_urls() -> Iterator[str]:
+        # Playlists are read a page at a time and fed straight into the pool
+        for url in sources():
+            if token.cancelled:
+                return
+            if not may_be_playlist(url):
+                yield url
+                continue
+            message(f"📜 Reading playlist {url}")
+            playlists.append(url)
+            started = time.time()
+            try:
+                yield from iter_playlist_urls(url, cache=downloader.metadata_cache, token=token)
+            except Exception as e:
+                if token.cancelled:
+                    return
+                # Written like a job's line so consumers of stdout see the failure too
+                report(DownloadResult(url=url, status="failed", error=f"Couldn't read playlist: {e}",
+                                      started_at=started, finished_at=time.time()),
+                       f"playlist-{len(playlists)}")
     
-    format_type = input("\n🎯 Choose format (default: mp4): ").strip().lower() or "mp4"
+    def report(result: DownloadResult, job_id):
+        line = result.to_dict()
+        del line['index']
+        print(json.dumps(dict(id=job_id, **line)), flush=True)
+        counts['ok' if result.ok else 'failed'] += 1
+        message(f"{'✅' if result.ok else '❌'} {result.title or result.url} ({result.status})")
     
-    if format_type in ['mp4', 'webm', 'mkv']:
-        print("\n📊 Quality options: best, 1080p, 720p, 480p, 360p, worst")
-        quality = input("Choose quality (default: best): ").strip().lower() or "best"
-    else:
-        quality = "best"
+    interrupted = []
     
-    # Download
-    success = downloader.download_video(url, format_type, quality)
+    def interrupt(signum, frame):
+        if interrupted:
+            # Second Ctrl+C: stop waiting for the jobs to wind down
+            raise KeyboardInterrupt
+        interrupted.append(signum)
+        message("🛑 Interrupted, stopping the running downloads (--resume continues them)...")
+        token.cancel(interrupt=True)
     
-    if success:
-        print("\n🎉 All done!")
-    else:
-        print("\n😞 Download failed. Please check the URL and try again.")
+    # Interrupt through the token so running jobs stop (and write their result lines)
+    # instead of the pool waiting for them to finish; the journal keeps them unfinished
+    # so a later --resume picks them up
+    for name in ('SIGINT', 'SIGTERM'):
+        try:
+            signal.signal(getattr(signal, name), interrupt)
+        except (AttributeError, ValueError):
+            # No such signal here, or not called from the main thread
+            pass
+    
+    try:
+        if args.resume:
+            for result in downloader.resume_unfinished(args.jobs, token):
+                report(result, f"resume-{result.index}")
+        for result in downloader.download_many(job_urls(), args.format_type.lower(),
+                                               args.quality.lower(), args.jobs, args.ordered,
+                                               token):
+            report(result, result.index)
+    except KeyboardInterrupt:
+        token.cancel(interrupt=True)
+        return EXIT_INTERRUPTED
+    if interrupted:
+        return EXIT_INTERRUPTED
+    
+    for stage in downloader.pipeline_stats().values():
+        message(f"📊 {stage['stage']}: {stage['completed']} done, {stage['failed']} failed, "
+                f"{stage['bytes_per_second'] / (1024 * 1024):.1f}MB/s while busy")
+    if counts['failed'] == 0:
+        return EXIT_OK
+    return EXIT_PARTIAL_FAILURE if counts['ok'] else EXIT_ALL_FAILED
 
 
 if __name__ == "__main__":
-    main()
-
-
-
+    sys.exit(main())
@@ -3,11 +3,17 @@ InGen Systems - Isla Nublar YouTube Retrieval Console
 Jurassic Park themed YouTube downloader with retro terminal aesthetic
 """
 
+# Start timing before anything else is imported (run with --startup-timing to see it)
+from startup_timing import StartupTimer
+startup_timer = StartupTimer()
+
 # Import the GUI library (tkinter) for creating windows and buttons
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 # Import threading so downloads dont freeze the GUI
 import threading
+# Import queue so download threads can hand UI updates to the main thread
+import queue
 # Import Path to handle file paths easily
 from pathlib import Path
 # Import datetime to show the current time in the app
@@ -19,22 +25,146 @@ import sys
 import subprocess
 # Import importlib to check if modules are installed
 import importlib.util
-# Import base64 to encode/decode images for storage in config
-import base64
 # Import io to handle image data in memory
 import io
+# Import deque to hold the jobs waiting for a free download slot
+from collections import deque
+# Import logging to keep a rotating copy of the console on disk
+import logging
+import logging.handlers
+# Import argparse for the command-line flags (e.g. --startup-timing)
+import argparse
+# Cache of extracted video info so retries don't hit the extractor again
+from metadata_cache import MetadataCache, canonical_key, extract_info_cached, invalidate_info
+# List of videos already downloaded, so they aren't fetched a second time
+from download_archive import DownloadArchive, archive_key, requested_format
+# Reads playlists and channels a page at a time so their videos can start straight away
+from playlist_expander import iter_playlist_urls, may_be_playlist
+# Scores the offered formats by resolution, size and merge/transcode cost
+from format_planner import plan_format, selector_options
+# Picks how many DASH/HLS fragments to fetch at once from measured throughput
+from fragment_tuner import FragmentTuner
+# Audio conversion runs on its own pool so the next download can start right away
+from postprocess_pipeline import (AUDIO_FORMATS, PostProcessingPool, StageStats, audio_codec,
+                                  convert_audio, split_formats,
+                                  downloaded_file)
+# Shared bandwidth limit, split between running downloads by priority
+from bandwidth import HIGH_PRIORITY, LOW_PRIORITY, NORMAL_PRIORITY, shared_scheduler
+# Finds FFmpeg once (on Windows, macOS and Linux) and remembers what it can do
+from ffmpeg_locator import locate_ffmpeg
+# Lets the cancel button really stop a download (and any FFmpeg it started)
+from job_control import CancellationToken
+# Remembers every job on disk so unfinished ones come back after a crash or restart
+from job_journal import CANCELLED, COMPLETED, FAILED, JobJournal
+# Settings from config.ini, read once and saved atomically (custom image in its own file)
+from settings import SettingsStore
+# Decodes the panel image/GIF in the background and caches scaled frames on disk
+from animation_loader import AnimationLoader
+# Video thumbnails on disk, so previews of known videos show up without fetching them again
+from thumbnail_cache import ThumbnailCache, thumbnail_url
+
+startup_timer.mark("modules imported")
+
+# Names shown in the queue view for each priority weight
+PRIORITY_NAMES = {LOW_PRIORITY: "LOW", NORMAL_PRIORITY: "NORMAL", HIGH_PRIORITY: "HIGH"}
+PRIORITY_LEVELS = [LOW_PRIORITY, NORMAL_PRIORITY, HIGH_PRIORITY]
+
+
+class DownloadJob:
+    """One URL in the download queue, plus everything the queue view shows about it"""
+    
+    def __init__(self, job_id, url, format_type, quality, fragment_concurrency=0):
+        self.job_id = job_id
+        self.url = url
+        self.format_type = format_type
+        self.quality = quality
+        # DASH/HLS fragments fetched at once (0 = let the fragment tuner decide)
+        self.fragment_concurrency = fragment_concurrency
+        # Weight of this job's share of the bandwidth limit (+/- in the queue view)
+        self.priority = NORMAL_PRIORITY
+        
+        # What the job is doing right now
+        # (QUEUED, RUNNING, PROCESSING, CONVERTING, COMPLETE, SKIPPED, FAILED, CANCELLING, CANCELLED)
+        self.status = "QUEUED"
+        self.title = None
+        self.duration = 0
+        self.error = None
+        
+        # Latest progress numbers reported by yt-dlp
+        self.percent = 0.0
+        self.downloaded_mb = 0.0
+        self.total_mb = 0.0
+        self.speed_mb = 0.0
+        
+        # What the progress bar currently shows (slides towards percent every UI tick)
+        self.display_percent = 0.0
+        # When the progress hook last did any work (used to throttle it)
+        self.last_hook_time = 0.0
+        
+        # Only log every 10% to the console
+        self.last_logged_percent = -1
+        
+        # Cancelling this stops the download thread at its next progress update
+        self.token = CancellationToken()
+        # Whether to keep .part files if the job gets cancelled (set when cancelling)
+        self.keep_partial_files = True
+        
+        # This job's entry in the job journal, and the .part file last recorded there
+        self.journal_id = None
+        self.partial_file = None
+        # Download archive to check before downloading (and to add to afterwards)
+        self.archive = None
+        # Released when the job leaves the queue, so a playlist can add the next video
+        self.queue_slot = None
+        # True once the downloaded file has been handed to the post-processing pool
+        self.handed_to_postprocessing = False
+        # (extractor, video id) and thumbnail URL, known once the video has been extracted
+        self.video_key = None
+        self.thumbnail_url = None
+    
+    @property
+    def row_id(self):
+        """Name of this job's row in the queue view"""
+        return f"job{self.job_id}"
 
 
 class JurassicParkDownloader:
     """Main class that creates the Jurassic Park themed YouTube downloader"""
     
-    def __init__(self, root):
+    # How often the main thread applies updates posted by download threads (~30 times a second)
+    UI_TICK_MS = 33
+    # Most posted events handled in one tick, so a flood of them can't freeze the window
+    MAX_EVENTS_PER_TICK = 500
+    # Download threads record progress at most this often (in seconds) - yt-dlp calls far more
+    PROGRESS_HOOK_INTERVAL = 0.1
+    # Oldest console lines are removed once the console holds more than this
+    MAX_CONSOLE_LINES = 2000
+    # Videos a playlist may have waiting in the queue before reading more of it
+    PLAYLIST_QUEUE_AHEAD = 20
+    # Finished jobs kept in the queue view - the oldest are removed once there are more
+    MAX_FINISHED_JOBS = 200
+    # How often the panel checks again for an image frame that is still being decoded
+    FRAME_POLL_MS = 20
+    
+    def __init__(self, root, show_startup_timing=False):
+        # How long each part of the startup took (printed at the end if asked for)
+        self.startup_timer = startup_timer
+        self.show_startup_timing = show_startup_timing
+        
         # Set up the main window
         self.root = root
         self.root.title("InGen Systems - YouTube Retrieval Console")
         self.root.geometry("1024x768")
         self.root.configure(bg='#000000')
         
+        # Download threads never touch tkinter directly - they post events here
+        # and the main thread runs them in batches (see process_ui_events)
+        self.ui_events = queue.Queue()
+        
+        # How many lines the console keeps on screen
+        self.max_console_lines = self.MAX_CONSOLE_LINES
+        self.console_logger = None
+        
         # Keep track of missing dependencies so we can install them later
         self.missing_dependencies = []
         self.dependencies_checked = False
@@ -51,6 +181,11 @@ class JurassicParkDownloader:
             self.script_dir = Path(__file__).parent.absolute()
             self.exe_dir = self.script_dir
         
+        # Full console history goes to logs/console.log (rotated so it can't grow forever)
+        # Set console_log_path to None to turn the log file off
+        self.console_log_path = self.exe_dir / "logs" / "console.log"
+        self.setup_console_log()
+        
         # Define the Jurassic Park color scheme (blacks, oranges, and greens)
         self.colors = {
             'bg': '#000000',          # Black background
@@ -64,9 +199,40 @@ class JurassicParkDownloader:
         # Load or ask for download folder location
         # Config file should be in persistent location (not temp folder)
         self.config_file = self.exe_dir / "config.ini"
-        self.download_folder = self.load_download_location()
+        with self.startup_timer.step("load settings"):
+            self.settings_store = SettingsStore(self.config_file)
+            self.download_folder = self.load_download_location()
         self.is_downloading = False
         
+        # Download queue: jobs wait in pending_jobs until a worker slot frees up
+        self.jobs = {}
+        self.pending_jobs = deque()
+        self.running_jobs = set()
+        # Jobs that have ended, oldest first (only the newest MAX_FINISHED_JOBS are kept)
+        self.finished_jobs = deque()
+        self.next_job_id = 1
+        self.focused_job = None
+        # Tokens of playlists still being read into the queue
+        self.playlist_expansions = set()
+        
+        # Shared by every job, so what one download learns about the link helps the next
+        self.fragment_tuner = FragmentTuner()
+        # Process-wide bandwidth limit (changed at any time from the F2 dialog)
+        self.bandwidth = shared_scheduler()
+        
+        # Downloaded audio waits in converting_jobs while the post-processing pool converts it,
+        # so the download slot can go to the next job (each stage keeps its own numbers)
+        self.converting_jobs = set()
+        self.postprocessing = PostProcessingPool()
+        self.download_stats = StageStats("download")
+        self.ffmpeg_error_shown = False
+        
+        # Metadata cache, job journal and download archive live in the download folder
+        # (opened on first use)
+        self.metadata_cache = None
+        self.job_journal = None
+        self.download_archive = None
+        
         # Track blinking animations
         self.live_blink_state = True
         self.info_blink_state = True
@@ -74,17 +240,35 @@ class JurassicParkDownloader:
         
         # Track custom image and GIF animation
         self.custom_image_data = None
-        self.gif_frames = []
+        self.panel_loader = None
+        
+        # Video previews shown in the image panel for the focused job
+        self.thumbnail_cache = ThumbnailCache(self.exe_dir / "cache" / "thumbnails")
+        self.thumbnail_job = None
+        self.thumbnail_request = None
         self.gif_frame_index = 0
         self.gif_animation_id = None
         self.is_gif = False
         self.hover_button = None
         
         # Build the UI and start the clock
-        self.setup_ui()
+        with self.startup_timer.step("build window"):
+            self.setup_ui()
         self.start_clock()
         self.start_blinking()
         
+        # Start applying updates from download threads
+        self.process_ui_events()
+        self.update_pipeline_status()
+        
+        # Pick up jobs that were still queued or running when the app last closed
+        self.root.after(500, self.resume_unfinished_jobs)
+        
+        # The window shows up now; Pillow, yt-dlp and FFmpeg are loaded in the
+        # background so neither startup nor the first download waits for them
+        self.root.after_idle(self.startup_timer.mark, "window shown")
+        threading.Thread(target=self.warm_up, name="warm-up", daemon=True).start()
+        
     def setup_ui(self):
         """Build all the visual elements of the interface"""
         
@@ -247,8 +431,8 @@ class JurassicParkDownloader:
         self.thumbnail_label.bind('<Leave>', self.on_image_hover_leave)
         self.thumbnail_label.bind('<Button-1>', lambda e: self.load_custom_image())
         
-        # Try to load custom image first, then T-Rex image from img folder (or show dinosaur emoji if not found)
-        self.load_trex_image()
+        # The custom or T-Rex image is loaded once Pillow has been imported in the background
+        # (see warm_up), so building the window doesn't wait for it
         
         # Right panel shows video info and download progress
         right_panel = tk.Frame(info_frame, bg=self.colors['bg'])
@@ -290,6 +474,45 @@ class JurassicParkDownloader:
                                       fg=self.colors['green'])
         self.progress_label.pack(anchor='w')
         
+        # Queue depth and throughput of the download and conversion stages
+        self.pipeline_label = tk.Label(progress_info_frame,
+                                      text="",
+                                      font=('Courier New', 9),
+                                      bg=self.colors['bg'],
+                                      fg=self.colors['green'])
+        self.pipeline_label.pack(anchor='w')
+        
+        # Download queue (one row per URL with its status, progress and speed)
+        queue_frame = tk.Frame(self.root, bg=self.colors['bg'],
+                             highlightbackground=self.colors['border'],
+                             highlightthickness=3, bd=5)
+        queue_frame.pack(fill='x', padx=15, pady=(0, 10))
+        
+        self.setup_queue_style()
+        self.queue_view = ttk.Treeview(queue_frame,
+                                       columns=('job', 'status', 'priority', 'progress', 'speed', 'target'),
+                                       show='headings',
+                                       height=4,
+                                       style="Jurassic.Treeview")
+        for column, heading, width in [('job', '#', 40),
+                                       ('status', 'STATUS', 110),
+                                       ('priority', 'PRIORITY', 80),
+                                       ('progress', 'PROGRESS', 90),
+                                       ('speed', 'SPEED', 100),
+                                       ('target', 'TARGET', 480)]:
+            self.queue_view.heading(column, text=heading, anchor='w')
+            self.queue_view.column(column, width=width, anchor='w', stretch=(column == 'target'))
+        self.queue_view.pack(fill='x', padx=5, pady=5)
+        
+        # Clicking a row shows that job in the info panel, Delete cancels the selected jobs
+        # and +/- change their bandwidth priority
+        self.queue_view.bind('<<TreeviewSelect>>', self.on_job_selected)
+        self.queue_view.bind('<Delete>', lambda e: self.cancel_selected_jobs())
+        for key in ('<plus>', '<equal>', '<KP_Add>'):
+            self.queue_view.bind(key, lambda e: self.change_selected_priority(1))
+        for key in ('<minus>', '<KP_Subtract>'):
+            self.queue_view.bind(key, lambda e: self.change_selected_priority(-1))
+        
         # Console output area (like a terminal window)
         console_frame = tk.Frame(self.root, bg=self.colors['bg'],
                                highlightbackground=self.colors['border'],
@@ -315,6 +538,21 @@ class JurassicParkDownloader:
         self.selected_format = tk.StringVar(value="mp4")
         self.selected_quality = tk.StringVar(value="best")
         
+        # How many downloads are allowed to run at the same time
+        self.max_parallel_downloads = tk.IntVar(value=3)
+        
+        # Keep .part files of cancelled downloads so they can resume later
+        self.keep_partial_downloads = tk.BooleanVar(value=True)
+        
+        # DASH/HLS fragments each download fetches at once (0 = AUTO, tuned from measured speed)
+        self.fragment_concurrency = tk.IntVar(value=0)
+        
+        # Total download speed limit in MB/s for all jobs together (0 = unlimited)
+        self.bandwidth_limit_mb = tk.IntVar(value=0)
+        
+        # Audio files made from the same download as well as the main format
+        self.extra_formats = {fmt: tk.BooleanVar(value=False) for fmt in AUDIO_FORMATS}
+        
         # Set up keyboard shortcuts (F1, F2, F3)
         self.root.bind('<F1>', lambda e: self.initiate_download())
         self.root.bind('<F2>', lambda e: self.show_format_options())
@@ -333,6 +571,23 @@ class JurassicParkDownloader:
                        lightcolor=self.colors['amber'],
                        darkcolor=self.colors['amber'])
     
+    def setup_queue_style(self):
+        """Set up the black/green look for the download queue list"""
+        style = ttk.Style()
+        style.configure("Jurassic.Treeview",
+                       background=self.colors['bg'],
+                       fieldbackground=self.colors['bg'],
+                       foreground=self.colors['green'],
+                       font=('Courier New', 10),
+                       rowheight=20)
+        style.configure("Jurassic.Treeview.Heading",
+                       background=self.colors['bg'],
+                       foreground=self.colors['amber'],
+                       font=('Courier New', 10, 'bold'))
+        style.map("Jurassic.Treeview",
+                 background=[('selected', self.colors['dark_green'])],
+                 foreground=[('selected', self.colors['amber'])])
+    
     def scale_image_to_fit(self, img, max_size=(240, 240)):
         """Scale image to fit within the box while maintaining aspect ratio, adding black bars if needed"""
         from PIL import Image
@@ -373,7 +628,7 @@ class JurassicParkDownloader:
         """Try to load custom image from config, then T-Rex image from img folder, use emoji if image not found"""
         # Try to import Pillow library for loading images
         try:
-            from PIL import Image, ImageTk
+            from PIL import Image
         except ImportError:
             # If Pillow not installed, just show a dinosaur emoji
             self.thumbnail_label.config(
@@ -412,30 +667,15 @@ class JurassicParkDownloader:
         for image_path in image_paths:
             if image_path.exists():
                 try:
-                    # Open the image file
-                    img = Image.open(image_path)
+                    # Check it's an image (only the header is read here)
+                    Image.open(image_path).close()
                     
-                    # Check if it's a GIF
-                    if img.format == 'GIF' and getattr(img, 'is_animated', False):
-                        self.load_gif_animation(image_path)
-                        image_found = True
-                        break
-                    
-                    # Scale image to fill the box (240x240)
-                    img = self.scale_image_to_fit(img, (240, 240))
-                    
-                    # You can add a green tint if you want (commented out)
-                    # img = img.convert('L')  # Convert to grayscale first
-                    # from PIL import ImageOps
-                    # img = ImageOps.colorize(img, black='#001a00', white='#00ff00')
-                    
-                    # Convert to a format tkinter can use and show it
-                    self.trex_photo = ImageTk.PhotoImage(img)
-                    self.thumbnail_label.config(image=self.trex_photo, text="")
+                    # Decode, scale to fill the box (240x240) and animate in the background
+                    self.show_panel_image(image_path)
                     
                     image_found = True
                     break
-                except Exception as e:
+                except Exception:
                     # If this image fails, try the next one
                     continue
         
@@ -495,26 +735,17 @@ class JurassicParkDownloader:
             return  # User cancelled
         
         try:
-            from PIL import Image, ImageTk
+            from PIL import Image
             
-            # Open the image to check if it's valid
-            img = Image.open(file_path)
+            # Open the image to check if it's valid (only the header is read here)
+            Image.open(file_path).close()
             
-            # Check if it's an animated GIF
-            if img.format == 'GIF' and getattr(img, 'is_animated', False):
-                # Load and animate the GIF
-                self.load_gif_animation(Path(file_path))
-                # Save GIF to config
-                self.save_custom_image_to_config(Path(file_path))
-            else:
-                # Load static image - scale to fill box
-                img = self.scale_image_to_fit(img, (240, 240))
-                self.trex_photo = ImageTk.PhotoImage(img)
-                self.thumbnail_label.config(image=self.trex_photo, text="")
-                self.is_gif = False
-                
-                # Save image to config as base64
-                self.save_custom_image_to_config(Path(file_path))
+            # Decode, scale and (for GIFs) animate it in the background
+            self.thumbnail_job = None
+            self.show_panel_image(Path(file_path))
+            
+            # Save a copy so it's still there next time
+            self.save_custom_image_to_config(Path(file_path))
             
             self.log_console(f"> Custom image loaded: {Path(file_path).name}")
             
@@ -526,60 +757,33 @@ class JurassicParkDownloader:
             )
     
     def load_custom_image_from_config(self):
-        """Load custom image from config.ini if it exists"""
+        """Load the saved custom image if there is one"""
         try:
-            from PIL import Image, ImageTk
-            
-            if not self.config_file.exists():
-                return False
-            
-            # Read config file
-            custom_image_base64 = None
-            is_gif_flag = False
-            
-            with open(self.config_file, 'r') as f:
-                for line in f:
-                    if line.startswith('custom_image_data='):
-                        custom_image_base64 = line.split('=', 1)[1].strip()
-                    elif line.startswith('custom_image_is_gif='):
-                        is_gif_flag = line.split('=', 1)[1].strip().lower() == 'true'
+            from PIL import Image
             
-            if not custom_image_base64:
+            # The image lives in its own cache file next to config.ini
+            image_data = self.settings_store.load_custom_image()
+            if not image_data:
                 return False
             
-            # Decode base64 image data
-            image_data = base64.b64decode(custom_image_base64)
-            image_bytes = io.BytesIO(image_data)
-            
-            # Load image from bytes
-            img = Image.open(image_bytes)
+            # Check it's still a readable image (only the header is read here)
+            Image.open(io.BytesIO(image_data)).close()
             
-            if is_gif_flag and getattr(img, 'is_animated', False):
-                # For GIFs, we need to save temporarily and reload (or use BytesIO properly)
-                # Actually, let's reload from the bytes directly
-                image_bytes.seek(0)  # Reset to beginning
-                self.load_gif_from_bytes(image_bytes)
-                return True
-            else:
-                # Static image - scale to fill box
-                img = self.scale_image_to_fit(img, (240, 240))
-                self.trex_photo = ImageTk.PhotoImage(img)
-                self.thumbnail_label.config(image=self.trex_photo, text="")
-                self.is_gif = False
-                return True
+            # Frames are decoded and scaled in the background (animated if it's a GIF)
+            self.show_panel_image(image_data)
+            return True
                 
-        except Exception as e:
+        except Exception:
             # If loading fails, just use default image
             return False
     
     def save_custom_image_to_config(self, image_path):
-        """Save custom image to config.ini as base64 encoded data"""
+        """Save a copy of the custom image so it's still there next time"""
         try:
             from PIL import Image
             
-            # Read image file and encode as base64
             with open(image_path, 'rb') as f:
-                image_data = base64.b64encode(f.read()).decode('utf-8')
+                image_data = f.read()
             
             # Check if it's actually an animated GIF
             is_gif = False
@@ -590,183 +794,85 @@ class JurassicParkDownloader:
             except:
                 pass
             
-            # Read existing config
-            config_lines = []
-            if self.config_file.exists():
-                with open(self.config_file, 'r') as f:
-                    config_lines = f.readlines()
-            
-            # Remove old custom_image lines if they exist
-            config_lines = [line for line in config_lines 
-                          if not line.startswith('custom_image_data=') 
-                          and not line.startswith('custom_image_is_gif=')]
-            
-            # Add new custom image data
-            config_lines.append(f'custom_image_data={image_data}\n')
-            config_lines.append(f'custom_image_is_gif={str(is_gif).lower()}\n')
-            
-            # Write back to config file
-            with open(self.config_file, 'w') as f:
-                f.writelines(config_lines)
+            # Written to a temp file and renamed, so the old image survives a crash
+            self.settings_store.save_custom_image(image_data, is_gif)
                 
         except Exception as e:
             self.log_console(f"> Warning: Could not save custom image to config: {str(e)}")
     
-    def load_gif_animation(self, gif_path):
-        """Load a GIF file and set up animation"""
-        try:
-            from PIL import Image, ImageTk
-            
-            # Open GIF
-            img = Image.open(gif_path)
-            
-            if not getattr(img, 'is_animated', False):
-                # Not animated, treat as static image - scale to fill box
-                img = self.scale_image_to_fit(img, (240, 240))
-                self.trex_photo = ImageTk.PhotoImage(img)
-                self.thumbnail_label.config(image=self.trex_photo, text="")
-                self.is_gif = False
-                return
-            
-            # Extract all frames
-            self.gif_frames = []
-            self.gif_frame_index = 0
-            self.is_gif = True
-            
-            try:
-                frame_num = 0
-                while True:
-                    # Resize frame to fill panel
-                    frame = img.copy()
-                    frame = self.scale_image_to_fit(frame, (240, 240))
-                    frame_photo = ImageTk.PhotoImage(frame)
-                    
-                    # Get duration for this frame (default to 100ms if not specified)
-                    duration = img.info.get('duration', 100)
-                    if duration == 0:
-                        duration = 100  # Prevent division by zero
-                    
-                    self.gif_frames.append((frame_photo, duration))
-                    
-                    frame_num += 1
-                    try:
-                        img.seek(frame_num)
-                    except EOFError:
-                        break
-                        
-            except Exception as e:
-                # If frame extraction fails, just use first frame as static
-                img.seek(0)
-                img = self.scale_image_to_fit(img, (240, 240))
-                self.trex_photo = ImageTk.PhotoImage(img)
-                self.thumbnail_label.config(image=self.trex_photo, text="")
-                self.is_gif = False
-                return
-            
-            # Start animation
-            if self.gif_frames:
-                self.animate_gif()
-                
-        except Exception as e:
-            # If GIF loading fails, just show error
-            self.log_console(f"> Error loading GIF: {str(e)}")
-    
-    def load_gif_from_bytes(self, image_bytes):
-        """Load GIF animation from bytes (for config loading)"""
-        try:
-            from PIL import Image, ImageTk
-            
-            img = Image.open(image_bytes)
-            
-            if not getattr(img, 'is_animated', False):
-                # Not animated - scale to fill box
-                img = self.scale_image_to_fit(img, (240, 240))
-                self.trex_photo = ImageTk.PhotoImage(img)
-                self.thumbnail_label.config(image=self.trex_photo, text="")
-                self.is_gif = False
-                return
-            
-            # Extract frames
-            self.gif_frames = []
-            self.gif_frame_index = 0
-            self.is_gif = True
-            
-            try:
-                frame_num = 0
-                while True:
-                    frame = img.copy()
-                    frame = self.scale_image_to_fit(frame, (240, 240))
-                    frame_photo = ImageTk.PhotoImage(frame)
-                    
-                    # Get duration for this frame (default to 100ms if not specified)
-                    duration = img.info.get('duration', 100)
-                    if duration == 0:
-                        duration = 100  # Prevent division by zero
-                    
-                    self.gif_frames.append((frame_photo, duration))
-                    
-                    frame_num += 1
-                    try:
-                        img.seek(frame_num)
-                    except EOFError:
-                        break
-                        
-            except Exception as e:
-                # Fallback to first frame
-                img.seek(0)
-                img = self.scale_image_to_fit(img, (240, 240))
-                self.trex_photo = ImageTk.PhotoImage(img)
-                self.thumbnail_label.config(image=self.trex_photo, text="")
-                self.is_gif = False
-                return
-            
-            # Start animation
-            if self.gif_frames:
-                self.animate_gif()
-                
-        except Exception as e:
-            self.log_console(f"> Error loading GIF from config: {str(e)}")
+    def show_panel_image(self, source, cache_frames=True):
+        """Show an image or animated GIF (a path or the file's bytes) in the left panel
+        
+        Frames are decoded and scaled on a background thread that keeps only a few
+        of them in memory and caches them on disk (see animation_loader.py), so a
+        long GIF doesn't slow down startup or fill up memory.
+        """
+        self.stop_gif_animation()
+        cache_folder = self.exe_dir / "cache" / "frames" if cache_frames else None
+        self.panel_loader = AnimationLoader(source, (240, 240), self.scale_image_to_fit,
+                                            cache_folder=cache_folder,
+                                            cache_variant=self.colors['dark_green'])
+        self.panel_loader.start()
+        self.animate_gif()
     
     def animate_gif(self):
-        """Animate GIF frames by cycling through them"""
-        if not self.is_gif or not self.gif_frames:
+        """Show the panel image's next frame as soon as the loader has it ready"""
+        loader = self.panel_loader
+        if loader is None:
             return
         
-        # Get current frame
-        frame_photo, duration = self.gif_frames[self.gif_frame_index]
+        if loader.error is not None:
+            self.log_console(f"> Error loading image: {str(loader.error)}")
+            self.stop_gif_animation()
+            self.thumbnail_label.config(
+                image="",
+                text="🦖",
+                font=('Courier New', 80),
+                fg=self.colors['green']
+            )
+            return
         
-        # Update image
-        self.thumbnail_label.config(image=frame_photo)
-        self.trex_photo = frame_photo  # Keep reference to prevent garbage collection
+        frame = loader.frame(self.gif_frame_index)
+        if frame is None:
+            # Still being decoded - look again shortly
+            self.gif_animation_id = self.root.after(self.FRAME_POLL_MS, self.animate_gif)
+            return
+        
+        from PIL import ImageTk
+        image, duration = frame
+        # Only the frame on screen is a PhotoImage (keep a reference to prevent garbage collection)
+        self.trex_photo = ImageTk.PhotoImage(image)
+        self.thumbnail_label.config(image=self.trex_photo, text="")
+        
+        self.is_gif = loader.frame_count > 1
+        if not self.is_gif:
+            # Still image - nothing more to do
+            self.gif_animation_id = None
+            return
         
         # Move to next frame (loop back to start)
-        self.gif_frame_index = (self.gif_frame_index + 1) % len(self.gif_frames)
+        self.gif_frame_index = (self.gif_frame_index + 1) % loader.frame_count
         
         # Schedule next frame (duration is in milliseconds)
         self.gif_animation_id = self.root.after(duration, self.animate_gif)
     
     def stop_gif_animation(self):
-        """Stop any running GIF animation"""
+        """Stop any running GIF animation and its loader"""
         if self.gif_animation_id:
             self.root.after_cancel(self.gif_animation_id)
             self.gif_animation_id = None
+        if self.panel_loader is not None:
+            self.panel_loader.close()
+            self.panel_loader = None
         self.is_gif = False
-        self.gif_frames = []
         self.gif_frame_index = 0
     
     def load_download_location(self):
         """Load download location from config or ask user"""
-        # Try to load from config file
-        if self.config_file.exists():
-            try:
-                with open(self.config_file, 'r') as f:
-                    for line in f:
-                        if line.startswith('download_path='):
-                            path = Path(line.split('=', 1)[1].strip())
-                            if path.exists():
-                                return path
-            except:
-                pass
+        # Use the saved folder if it's still there
+        saved_path = self.settings_store.settings.download_path
+        if saved_path and Path(saved_path).exists():
+            return Path(saved_path)
         
         # Ask user for download location on first run using themed dialog
         # Store the result to check what they clicked
@@ -811,15 +917,60 @@ class JurassicParkDownloader:
         # Create folder if it doesnt exist
         download_path.mkdir(parents=True, exist_ok=True)
         
-        # Save to config
+        # Save to config (other settings and the custom image are left alone)
         try:
-            with open(self.config_file, 'w') as f:
-                f.write(f'download_path={download_path}\n')
-        except:
+            self.settings_store.update(download_path=str(download_path))
+        except OSError:
             pass
         
         return download_path
     
+    def get_state_folder(self):
+        """Folder inside the download folder where caches and other state files live"""
+        return self.download_folder / ".ingen"
+    
+    def get_metadata_cache(self):
+        """Open the metadata cache for the current download folder"""
+        cache_path = self.get_state_folder() / "metadata.sqlite3"
+        
+        # Reopen the cache if the user changed the download folder
+        if self.metadata_cache is None or self.metadata_cache.db_path != cache_path:
+            try:
+                self.metadata_cache = MetadataCache(cache_path)
+            except Exception as e:
+                # A broken cache should never stop a download
+                self.log_console(f"> Warning: Metadata cache unavailable: {str(e)}")
+                self.metadata_cache = None
+        return self.metadata_cache
+    
+    def get_job_journal(self):
+        """Open the job journal for the current download folder"""
+        journal_path = self.get_state_folder() / "jobs.sqlite3"
+        
+        # Reopen the journal if the user changed the download folder
+        if self.job_journal is None or self.job_journal.db_path != journal_path:
+            try:
+                self.job_journal = JobJournal(journal_path)
+            except Exception as e:
+                # Downloads still work without it, they just can't be resumed after a crash
+                self.log_console(f"> Warning: Job journal unavailable: {str(e)}")
+                self.job_journal = None
+        return self.job_journal
+    
+    def get_download_archive(self):
+        """Open the download archive for the current download folder"""
+        archive_path = self.get_state_folder() / "archive.txt"
+        
+        # Reopen the archive if the user changed the download folder
+        if self.download_archive is None or self.download_archive.archive_path != archive_path:
+            try:
+                self.download_archive = DownloadArchive(archive_path)
+            except Exception as e:
+                # Without it videos are just downloaded again
+                self.log_console(f"> Warning: Download archive unavailable: {str(e)}")
+                self.download_archive = None
+        return self.download_archive
+    
     def change_download_location(self):
         """Allow user to change download location"""
         from tkinter import filedialog
@@ -832,12 +983,11 @@ class JurassicParkDownloader:
             self.download_folder = Path(new_path)
             self.download_folder.mkdir(parents=True, exist_ok=True)
             
-            # Save to config
+            # Save to config (other settings and the custom image are left alone)
             try:
-                with open(self.config_file, 'w') as f:
-                    f.write(f'download_path={self.download_folder}\n')
-            except:
-                pass
+                self.settings_store.update(download_path=str(self.download_folder))
+            except OSError as e:
+                self.log_console(f"> Warning: Could not save download location: {str(e)}")
             
             self.log_console(f"> Download location changed to: {self.download_folder}")
             self.show_themed_dialog(
@@ -894,12 +1044,135 @@ class JurassicParkDownloader:
         self.root.after(500, self.blink_info_text)
     
     def log_console(self, message):
-        """Add a message to the console output area"""
+        """Add a message to the console output area (safe to call from any thread)"""
+        self.post_event(self.append_console_lines, [message])
+    
+    def append_console_lines(self, lines):
+        """Write lines to the console text box and log file (main thread only)"""
+        # Everything goes to the log file, even lines that get trimmed off screen
+        if self.console_logger is not None:
+            for line in lines:
+                self.console_logger.info(line)
+        
+        # No point inserting more lines than the console is allowed to keep
+        lines = lines[-self.max_console_lines:]
+        
         self.console_text.config(state='normal')
-        self.console_text.insert('end', message + '\n')
+        self.console_text.insert('end', ''.join(line + '\n' for line in lines))
+        
+        # Trim the oldest lines so the text box (and every insert) stays fast
+        line_count = int(self.console_text.index('end-1c').split('.')[0]) - 1
+        if line_count > self.max_console_lines:
+            self.console_text.delete('1.0', f'{line_count - self.max_console_lines + 1}.0')
+        
         self.console_text.see('end')
         self.console_text.config(state='disabled')
-        self.root.update()
+    
+    def setup_console_log(self):
+        """Open the rotating log file that mirrors the console"""
+        if self.console_log_path is None:
+            return
+        try:
+            self.console_log_path.parent.mkdir(parents=True, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                self.console_log_path,
+                maxBytes=1024 * 1024,  # 1MB per file
+                backupCount=5,         # keep console.log.1 ... console.log.5
+                encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            
+            self.console_logger = logging.getLogger('ingen.console')
+            self.console_logger.setLevel(logging.INFO)
+            self.console_logger.propagate = False
+            self.console_logger.handlers = [handler]
+        except Exception:
+            # A read-only folder shouldn't stop the app - just skip the log file
+            self.console_logger = None
+    
+    def warm_up(self):
+        """Background thread: import and prepare the heavy libraries before anything needs them"""
+        try:
+            # Imported only to have them loaded (and cached) before the image panel needs them
+            with self.startup_timer.step("import Pillow"):
+                importlib.import_module('PIL.Image')
+                importlib.import_module('PIL.ImageTk')
+        except ImportError:
+            pass  # load_trex_image shows the emoji instead, F3 offers to install it
+        self.post_event(self.show_startup_image)
+        
+        try:
+            with self.startup_timer.step("import yt-dlp"):
+                importlib.import_module('yt_dlp')
+            # The first URL otherwise pays for loading and matching the whole extractor list
+            # (an address no extractor knows goes through all of them)
+            with self.startup_timer.step("load extractors"):
+                may_be_playlist("https://ingen.invalid/warm-up")
+        except ImportError:
+            pass  # F3 offers to install it
+        
+        with self.startup_timer.step("find FFmpeg"):
+            self.get_ffmpeg_info()
+        
+        self.startup_timer.mark("warm-up done")
+        if self.show_startup_timing:
+            self.post_event(self.report_startup_timing)
+    
+    def show_startup_image(self):
+        """Load the custom or T-Rex image (main thread, once Pillow is imported)"""
+        with self.startup_timer.step("load image"):
+            self.load_trex_image()
+    
+    def report_startup_timing(self):
+        """Print the startup timing breakdown and show it in the console"""
+        for line in self.startup_timer.report():
+            print(line)
+            self.log_console(f"> {line}")
+    
+    def post_event(self, handler, *args, **kwargs):
+        """Ask the main thread to run handler(*args, **kwargs) on its next UI tick
+        
+        This is the only thing download threads should do to change the UI -
+        tkinter isn't thread safe, so all widget calls happen on the main thread.
+        """
+        self.ui_events.put((handler, args, kwargs))
+    
+    def process_ui_events(self):
+        """Run everything posted since the last tick, then schedule the next tick"""
+        try:
+            console_lines = []
+            dirty_jobs = {}
+            
+            for _ in range(self.MAX_EVENTS_PER_TICK):
+                try:
+                    handler, args, kwargs = self.ui_events.get_nowait()
+                except queue.Empty:
+                    break
+                
+                if handler == self.append_console_lines:
+                    # Collect console lines and insert them all at once below
+                    console_lines.extend(args[0])
+                elif handler == self.update_job_row:
+                    # Only redraw each job's row once per tick, however often it changed
+                    dirty_jobs[args[0].row_id] = args[0]
+                else:
+                    try:
+                        handler(*args, **kwargs)
+                    except Exception as e:
+                        console_lines.append(f"> Warning: UI update failed: {str(e)}")
+            
+            for job in dirty_jobs.values():
+                try:
+                    self.update_job_row(job)
+                except Exception as e:
+                    console_lines.append(f"> Warning: UI update failed: {str(e)}")
+            if console_lines:
+                self.append_console_lines(console_lines)
+            
+            self.animate_progress()
+        finally:
+            # Whatever failed above, the next tick must still run or the UI stops updating
+            self.root.after(self.UI_TICK_MS, self.process_ui_events)
     
     def show_format_options(self):
         """Show format selection dialog"""
@@ -933,6 +1206,27 @@ class JurassicParkDownloader:
                           activebackground=self.colors['bg'],
                           activeforeground=self.colors['amber']).pack(anchor='w', padx=20, pady=5)
         
+        tk.Label(format_window,
+                text="ALSO SAVE AS (Same Download)",
+                font=('Courier New', 14, 'bold'),
+                bg=self.colors['bg'],
+                fg=self.colors['amber']).pack(pady=10)
+        
+        extra_frame = tk.Frame(format_window, bg=self.colors['bg'])
+        extra_frame.pack(anchor='w', padx=20)
+        
+        # The video is only downloaded once - every extra file is converted from it
+        for fmt, variable in self.extra_formats.items():
+            tk.Checkbutton(extra_frame,
+                          text=fmt.upper(),
+                          variable=variable,
+                          font=('Courier New', 11),
+                          bg=self.colors['bg'],
+                          fg=self.colors['green'],
+                          selectcolor=self.colors['dark_green'],
+                          activebackground=self.colors['bg'],
+                          activeforeground=self.colors['amber']).pack(side='left', padx=5, pady=5)
+        
         tk.Label(format_window,
                 text="SELECT QUALITY (Video Only)",
                 font=('Courier New', 14, 'bold'),
@@ -958,6 +1252,83 @@ class JurassicParkDownloader:
                           activebackground=self.colors['bg'],
                           activeforeground=self.colors['amber']).pack(anchor='w', padx=20, pady=5)
         
+        tk.Label(format_window,
+                text="SIMULTANEOUS DOWNLOADS",
+                font=('Courier New', 14, 'bold'),
+                bg=self.colors['bg'],
+                fg=self.colors['amber']).pack(pady=10)
+        
+        parallel_frame = tk.Frame(format_window, bg=self.colors['bg'])
+        parallel_frame.pack(anchor='w', padx=20)
+        
+        for value in (1, 2, 3, 4, 6):
+            tk.Radiobutton(parallel_frame,
+                          text=str(value),
+                          variable=self.max_parallel_downloads,
+                          value=value,
+                          font=('Courier New', 11),
+                          bg=self.colors['bg'],
+                          fg=self.colors['green'],
+                          selectcolor=self.colors['dark_green'],
+                          activebackground=self.colors['bg'],
+                          activeforeground=self.colors['amber'],
+                          command=self.start_queued_jobs).pack(side='left', padx=5, pady=5)
+        
+        tk.Label(format_window,
+                text="FRAGMENTS PER DOWNLOAD",
+                font=('Courier New', 14, 'bold'),
+                bg=self.colors['bg'],
+                fg=self.colors['amber']).pack(pady=10)
+        
+        fragment_frame = tk.Frame(format_window, bg=self.colors['bg'])
+        fragment_frame.pack(anchor='w', padx=20)
+        
+        for text, value in [("AUTO", 0), ("1", 1), ("4", 4), ("8", 8), ("16", 16)]:
+            tk.Radiobutton(fragment_frame,
+                          text=text,
+                          variable=self.fragment_concurrency,
+                          value=value,
+                          font=('Courier New', 11),
+                          bg=self.colors['bg'],
+                          fg=self.colors['green'],
+                          selectcolor=self.colors['dark_green'],
+                          activebackground=self.colors['bg'],
+                          activeforeground=self.colors['amber']).pack(side='left', padx=5, pady=5)
+        
+        tk.Label(format_window,
+                text="BANDWIDTH LIMIT (ALL DOWNLOADS)",
+                font=('Courier New', 14, 'bold'),
+                bg=self.colors['bg'],
+                fg=self.colors['amber']).pack(pady=10)
+        
+        bandwidth_frame = tk.Frame(format_window, bg=self.colors['bg'])
+        bandwidth_frame.pack(anchor='w', padx=20)
+        
+        # Takes effect straight away, even for downloads that are already running
+        for text, value in [("UNLIMITED", 0), ("1MB/s", 1), ("2MB/s", 2), ("5MB/s", 5),
+                            ("10MB/s", 10), ("25MB/s", 25)]:
+            tk.Radiobutton(bandwidth_frame,
+                          text=text,
+                          variable=self.bandwidth_limit_mb,
+                          value=value,
+                          font=('Courier New', 11),
+                          bg=self.colors['bg'],
+                          fg=self.colors['green'],
+                          selectcolor=self.colors['dark_green'],
+                          activebackground=self.colors['bg'],
+                          activeforeground=self.colors['amber'],
+                          command=self.apply_bandwidth_limit).pack(side='left', padx=5, pady=5)
+        
+        tk.Checkbutton(format_window,
+                      text="Keep partial files when cancelling (resume later)",
+                      variable=self.keep_partial_downloads,
+                      font=('Courier New', 11),
+                      bg=self.colors['bg'],
+                      fg=self.colors['green'],
+                      selectcolor=self.colors['dark_green'],
+                      activebackground=self.colors['bg'],
+                      activeforeground=self.colors['amber']).pack(anchor='w', padx=20, pady=10)
+        
         tk.Button(format_window,
                  text="CONFIRM SELECTION",
                  font=('Courier New', 12, 'bold'),
@@ -993,125 +1364,585 @@ class JurassicParkDownloader:
             )
             return
         
-        # Get the URL from the text box
-        url = self.url_entry.get('1.0', 'end-1c').strip()
+        # Get the URLs from the text box (one URL per line, blank lines are ignored)
+        urls = [line.strip() for line in self.url_entry.get('1.0', 'end-1c').splitlines()
+                if line.strip()]
         
         # Check if user actually entered a URL
-        if not url:
+        if not urls:
             self.show_themed_dialog("Warning", "Please enter a YouTube URL!", dialog_type="warning")
             return
         
-        # Make sure we're not already downloading something
-        if self.is_downloading:
-            self.show_themed_dialog("Info", "Download already in progress!", dialog_type="info")
-            return
+        # Main format first, then any extra files ticked in F2 (e.g. "mp4,mp3")
+        format_type = ",".join(split_formats(
+            [self.selected_format.get()]
+            + [fmt for fmt, variable in self.extra_formats.items() if variable.get()]))
+        quality = self.selected_quality.get()
         
-        # Set flags and disable the initiate button
-        self.is_downloading = True
-        self.blinking_enabled = False  # Stop blinking during download
-        self.btn_initiate.config(state='disabled')
-        self.btn_cancel.config(state='normal')
+        # Log what we're about to do
+        self.log_console(f"> Download initiated ({len(urls)} target(s))...")
+        self.log_console(f"> Format: {format_type.upper()}")
+        self.log_console(f"> Quality: {quality}")
+        
+        # Turn every URL into a job and put it at the back of the queue
+        # (jobs added while others are running just wait for a free slot)
+        for url in urls:
+            if may_be_playlist(url):
+                self.start_playlist_expansion(url, format_type, quality)
+            else:
+                self.queue_job(url, format_type, quality)
         
-        # Update info text to show we're downloading
-        self.info_text.config(state='normal')
-        self.info_text.delete('1.0', 'end')
-        self.info_text.insert('1.0', "Initializing download...")
-        self.info_text.config(state='disabled')
+        # Clear the text box so the next batch can be pasted straight away
+        self.url_entry.delete('1.0', 'end')
         
-        # Log what we're about to do
-        self.log_console("> Download initiated...")
-        self.log_console(f"> Target URL: {url[:50]}...")
-        self.log_console(f"> Format: {self.selected_format.get().upper()}")
-        self.log_console(f"> Quality: {self.selected_quality.get()}")
-        self.log_console("> Connecting to target...")
-        
-        # Start download in a separate thread so the GUI doesnt freeze
-        thread = threading.Thread(target=self.download_video, args=(url,))
+        self.start_queued_jobs()
+    
+    def queue_job(self, url, format_type, quality, journal_id=None, queue_slot=None,
+                  fragment_concurrency=None):
+        """Add a job to the back of the queue (and to the job journal if it isn't there yet)"""
+        if fragment_concurrency is None:
+            fragment_concurrency = self.fragment_concurrency.get()
+        job = DownloadJob(self.next_job_id, url, format_type, quality, fragment_concurrency)
+        self.next_job_id += 1
+        job.queue_slot = queue_slot
+        
+        job.archive = self.get_download_archive()
+        job.journal_id = journal_id
+        journal = self.get_job_journal()
+        if journal is not None and journal_id is None:
+            job.journal_id = journal.add(url, {'format_type': format_type, 'quality': quality,
+                                               'fragment_concurrency': fragment_concurrency,
+                                               'priority': job.priority})
+        
+        self.jobs[job.row_id] = job
+        self.pending_jobs.append(job)
+        self.download_stats.job_queued()
+        self.queue_view.insert('', 'end', iid=job.row_id, values=self.job_row_values(job))
+        self.log_console(f"> Queued #{job.job_id}: {url[:50]}...")
+        return job
+    
+    def start_playlist_expansion(self, url, format_type, quality):
+        """Start reading a playlist or channel into the queue on a background thread"""
+        token = CancellationToken()
+        self.playlist_expansions.add(token)
+        self.log_console(f"> Reading playlist: {url[:50]}...")
+        
+        thread = threading.Thread(target=self.expand_playlist, args=(url, format_type, quality, token))
         thread.daemon = True
         thread.start()
+        self.update_activity_state()
     
-    def cancel_operation(self):
-        """Called when user clicks CANCEL OPERATION button"""
-        self.is_downloading = False
-        self.blinking_enabled = True  # Resume blinking
-        self.btn_initiate.config(state='normal')
-        self.btn_cancel.config(state='disabled')
+    def expand_playlist(self, url, format_type, quality, token):
+        """Worker thread: queue a playlist's videos as they're read, staying a few ahead of the downloads"""
+        # Each queued video holds a slot until it starts (or is cancelled)
+        queue_slots = threading.Semaphore(self.PLAYLIST_QUEUE_AHEAD)
+        count = 0
+        try:
+            for entry_url in iter_playlist_urls(url, cache=self.get_metadata_cache(), token=token):
+                while not queue_slots.acquire(timeout=0.2):
+                    if token.cancelled:
+                        return
+                if token.cancelled:
+                    return
+                self.post_event(self.queue_playlist_entry, token, entry_url, format_type, quality,
+                                queue_slots)
+                count += 1
+        except Exception as e:
+            self.log_console(f"> ERROR: Could not read playlist: {str(e)}")
+        finally:
+            self.log_console(f"> Playlist read: {count} video(s) queued")
+            self.post_event(self.playlist_expansion_finished, token)
+    
+    def queue_playlist_entry(self, token, url, format_type, quality, queue_slot):
+        """Queue one video read from a playlist (main thread) unless the playlist was cancelled"""
+        if token.cancelled:
+            return
+        self.queue_job(url, format_type, quality, queue_slot=queue_slot)
+        self.start_queued_jobs()
+    
+    def playlist_expansion_finished(self, token):
+        """Called on the main thread once a playlist has been read completely (or stopped)"""
+        self.playlist_expansions.discard(token)
+        self.update_activity_state()
+    
+    def resume_unfinished_jobs(self):
+        """Re-queue jobs the journal says never finished last time (runs once at startup)"""
+        if not self.check_module_installed('yt_dlp'):
+            return
+        journal = self.get_job_journal()
+        if journal is None:
+            return
+        
+        unfinished = journal.claim_unfinished()
+        if not unfinished:
+            return
+        
+        self.log_console(f"> Resuming {len(unfinished)} unfinished job(s) from last session...")
+        for entry in unfinished:
+            job = self.queue_job(entry.url, entry.options.get('format_type', 'mp4'),
+                                 entry.options.get('quality', 'best'), journal_id=entry.job_id,
+                                 fragment_concurrency=entry.options.get('fragment_concurrency'))
+            job.priority = entry.options.get('priority', NORMAL_PRIORITY)
+            # Partly downloaded files carry on from where they stopped
+            if entry.partial_bytes:
+                self.log_console(f"> Job #{job.job_id}: Continuing from "
+                                 f"{entry.partial_bytes / (1024 * 1024):.1f}MB")
+        
+        self.start_queued_jobs()
+    
+    def start_queued_jobs(self):
+        """Start waiting jobs until every download slot is busy (runs on the main thread)"""
+        while self.pending_jobs and len(self.running_jobs) < self.max_parallel_downloads.get():
+            job = self.pending_jobs.popleft()
+            job.status = "RUNNING"
+            self.download_stats.job_started()
+            if job.queue_slot is not None:
+                job.queue_slot.release()
+            self.running_jobs.add(job)
+            self.update_job_row(job)
+            
+            # Show this job in the info panel if nothing else running is shown there
+            if self.focused_job is None or self.focused_job not in self.running_jobs:
+                self.focus_job(job)
+            
+            self.log_console(f"> Job #{job.job_id}: Connecting to target...")
+            
+            # Start download in a separate thread so the GUI doesnt freeze
+            thread = threading.Thread(target=self.run_job, args=(job,))
+            thread.daemon = True
+            thread.start()
         
-        # Reset info text back to ready state
+        self.update_activity_state()
+    
+    def run_job(self, job):
+        """Worker thread: download one job, then give the slot back"""
+        if job.journal_id and self.job_journal is not None:
+            self.job_journal.mark_running(job.journal_id)
+        try:
+            self.download_video(job)
+        finally:
+            self.bandwidth.release(job)
+            self.download_stats.job_done(int(job.total_mb * 1024 * 1024),
+                                         job.status == "COMPLETE" or job.handed_to_postprocessing)
+            # Jobs handed over for conversion are recorded once that's done
+            if not job.handed_to_postprocessing:
+                self.record_job_result(job)
+            # Let the main thread start the next queued job
+            self.post_event(self.job_finished, job)
+    
+    def record_job_result(self, job):
+        """Record how a job ended in the journal so it isn't resumed again next time"""
+        if job.journal_id and self.job_journal is not None:
+            state = {"COMPLETE": COMPLETED, "SKIPPED": COMPLETED,
+                     "CANCELLED": CANCELLED}.get(job.status, FAILED)
+            self.job_journal.finish(job.journal_id, state, error=job.error)
+    
+    def job_finished(self, job):
+        """Called on the main thread after a job's worker thread is done"""
+        self.running_jobs.discard(job)
+        self.update_job_row(job)
+        # Jobs handed over for conversion aren't done until that is
+        if not job.handed_to_postprocessing:
+            self.retire_job(job)
+        self.start_queued_jobs()
+    
+    def conversion_finished(self, job):
+        """Called on the main thread once a job's conversion is done"""
+        self.converting_jobs.discard(job)
+        self.update_job_row(job)
+        self.retire_job(job)
+        self.update_activity_state()
+    
+    def retire_job(self, job):
+        """Keep an ended job's row, removing the oldest finished jobs once there are too many"""
+        self.finished_jobs.append(job)
+        while len(self.finished_jobs) > self.MAX_FINISHED_JOBS:
+            old_job = self.finished_jobs.popleft()
+            self.jobs.pop(old_job.row_id, None)
+            if self.queue_view.exists(old_job.row_id):
+                self.queue_view.delete(old_job.row_id)
+            if old_job is self.focused_job:
+                self.focused_job = None
+    
+    def update_pipeline_status(self):
+        """Show each stage's queue depth and throughput (refreshed once a second)"""
+        download = self.download_stats.snapshot()
+        convert = self.postprocessing.stats.snapshot()
+        if download['completed'] or download['active'] or convert['completed'] or convert['active']:
+            self.pipeline_label.config(
+                text=f"DL: {download['active']} active, {download['queued']} queued, "
+                     f"{download['bytes_per_second'] / (1024 * 1024):.1f}MB/s | "
+                     f"CONVERT: {convert['active']} active, {convert['queued']} queued, "
+                     f"{convert['items_per_minute']:.1f}/min")
+        self.root.after(1000, self.update_pipeline_status)
+    
+    def update_activity_state(self):
+        """Switch the UI between busy and ready depending on whether any jobs are left"""
+        busy = bool(self.running_jobs or self.pending_jobs or self.playlist_expansions
+                    or self.converting_jobs)
+        if busy == self.is_downloading:
+            return
+        
+        self.is_downloading = busy
+        self.blinking_enabled = not busy  # Stop blinking while downloading
+        self.btn_cancel.config(state='normal' if busy else 'disabled')
+        
+        if not busy:
+            self.focused_job = None
+            self.ffmpeg_error_shown = False
+            self.hide_thumbnail()
+            
+            # Reset info text back to ready state with blinking dot
+            self.info_text.config(state='normal')
+            self.info_text.delete('1.0', 'end')
+            self.info_text.insert('1.0', "Ready to initialize...")
+            self.info_text.config(state='disabled')
+    
+    def job_row_values(self, job):
+        """Build the values shown in a job's row of the queue view"""
+        speed = f"{job.speed_mb:.1f}MB/s" if job.status == "RUNNING" else ""
+        return (f"#{job.job_id}", job.status, PRIORITY_NAMES.get(job.priority, job.priority),
+                f"{job.percent:.1f}%", speed, job.title or job.url)
+    
+    def update_job_row(self, job):
+        """Refresh a job's row in the queue view (and the progress bar if it's the focused job)"""
+        if self.queue_view.exists(job.row_id):
+            self.queue_view.item(job.row_id, values=self.job_row_values(job))
+        if job is self.focused_job:
+            self.show_job_progress(job)
+    
+    def on_job_info(self, job):
+        """Called on the main thread once a job knows its title and duration"""
+        self.update_job_row(job)
+        if job is self.focused_job:
+            self.show_job_info(job)
+            self.show_job_thumbnail(job)
+    
+    def on_job_selected(self, event):
+        """Show the clicked job in the info panel"""
+        selection = self.queue_view.selection()
+        if selection and selection[0] in self.jobs:
+            self.focus_job(self.jobs[selection[0]])
+    
+    def focus_job(self, job):
+        """Make the info panel and progress bar follow this job"""
+        self.focused_job = job
+        self.show_job_info(job)
+        self.show_job_progress(job)
+        self.show_job_thumbnail(job)
+    
+    def show_job_thumbnail(self, job):
+        """Show a job's video thumbnail in the image panel (fetched and decoded in the background)"""
+        if self.thumbnail_job is job:
+            return  # Already on screen
+        request = (job, job.thumbnail_url)
+        if request == self.thumbnail_request:
+            return  # Already being fetched
+        self.thumbnail_request = request
+        thread = threading.Thread(target=self.load_job_thumbnail, args=(job, job.thumbnail_url))
+        thread.daemon = True
+        thread.start()
+    
+    def load_job_thumbnail(self, job, url):
+        """Background thread: get a job's thumbnail from the cache, or download it into the cache"""
+        try:
+            # Known videos are found by URL alone, before anything has been extracted
+            key = job.video_key or canonical_key(job.url)
+            if url:
+                data = self.thumbnail_cache.fetch(key, url)
+            elif key:
+                data = self.thumbnail_cache.get(key)
+            else:
+                data = None
+        except Exception as e:
+            self.log_console(f"> Job #{job.job_id}: No preview available ({str(e)})")
+            return
+        if data:
+            self.post_event(self.show_thumbnail, job, data)
+    
+    def show_thumbnail(self, job, data):
+        """Put a fetched thumbnail in the image panel if its job is still the one shown"""
+        if job is not self.focused_job or self.thumbnail_job is job:
+            return
+        self.thumbnail_job = job
+        # Decoded and scaled off the main thread like any other panel image
+        # (not added to the frame cache - the thumbnail cache already has it)
+        self.show_panel_image(data, cache_frames=False)
+    
+    def hide_thumbnail(self):
+        """Go back to the custom or T-Rex image"""
+        if self.thumbnail_job is None:
+            return
+        self.thumbnail_job = None
+        self.thumbnail_request = None
+        self.load_trex_image()
+    
+    def show_job_progress(self, job):
+        """Show a job's latest progress on the progress bar and label"""
+        if job.status == "PROCESSING":
+            self.info_progress_bar['value'] = 100
+            self.progress_label.config(text="100.0% - Complete - Processing file...")
+        elif job.status == "RUNNING" and job.total_mb:
+            # animate_progress draws running jobs on every tick
+            self.info_progress_bar['value'] = job.display_percent
+            self.draw_running_progress(job)
+        else:
+            self.info_progress_bar['value'] = job.percent
+            self.progress_label.config(text=f"{job.percent:.1f}% - {job.status}")
+    
+    def show_job_info(self, job):
+        """Write a job's title, duration and format into the info panel"""
         self.info_text.config(state='normal')
         self.info_text.delete('1.0', 'end')
-        self.info_text.insert('1.0', "Ready to initialize...")
+        if job.title is None:
+            self.info_text.insert('1.0', "Initializing download...")
+        else:
+            duration = int(job.duration or 0)
+            self.info_text.insert('1.0',
+                f"Retrieving Title... OK\n"
+                f"{job.title}.. OK\n"
+                f"Duration... {duration//60}:{duration%60:02d}.. OK\n"
+                f"Format... {job.format_type.upper()}")
         self.info_text.config(state='disabled')
-        
+    
+    def change_selected_priority(self, step):
+        """Raise (step=1) or lower (step=-1) the bandwidth priority of the selected jobs"""
+        for row_id in self.queue_view.selection():
+            job = self.jobs.get(row_id)
+            if job is None:
+                continue
+            level = PRIORITY_LEVELS.index(job.priority) if job.priority in PRIORITY_LEVELS else 1
+            job.priority = PRIORITY_LEVELS[max(0, min(len(PRIORITY_LEVELS) - 1, level + step))]
+            # Running jobs get their new share from the next chunk they download
+            if job in self.running_jobs:
+                self.bandwidth.set_weight(job, job.priority)
+            self.update_job_row(job)
+    
+    def apply_bandwidth_limit(self):
+        """Apply the bandwidth limit chosen in the F2 dialog to every download"""
+        limit_mb = self.bandwidth_limit_mb.get()
+        self.bandwidth.set_rate(limit_mb * 1024 * 1024 if limit_mb else None)
+        if limit_mb:
+            self.log_console(f"> Bandwidth limit: {limit_mb}MB/s shared by all downloads")
+        else:
+            self.log_console("> Bandwidth limit removed")
+    
+    def cancel_operation(self):
+        """Called when user clicks CANCEL OPERATION button"""
+        # Stop reading playlists first so no new jobs arrive
+        for token in self.playlist_expansions:
+            token.cancel()
+        self.cancel_jobs(list(self.pending_jobs) + list(self.running_jobs) + list(self.converting_jobs))
         self.log_console("> Operation cancelled by user")
     
-    def download_video(self, url):
-        """This does the actual downloading (runs in a separate thread)"""
+    def cancel_selected_jobs(self):
+        """Cancel the jobs selected in the queue view (Delete key)"""
+        jobs = [self.jobs[row_id] for row_id in self.queue_view.selection() if row_id in self.jobs]
+        self.cancel_jobs([job for job in jobs if job in self.running_jobs or job in self.pending_jobs
+                          or job in self.converting_jobs])
+    
+    def cancel_jobs(self, jobs):
+        """Stop the given jobs - queued ones are dropped, running ones are told to stop"""
+        keep_partial = self.keep_partial_downloads.get()
+        for job in jobs:
+            if job in self.pending_jobs:
+                # Jobs that haven't started yet can simply be taken off the queue
+                self.pending_jobs.remove(job)
+                job.status = "CANCELLED"
+                self.download_stats.job_dropped()
+                if job.queue_slot is not None:
+                    job.queue_slot.release()
+                if job.journal_id and self.job_journal is not None:
+                    self.job_journal.finish(job.journal_id, CANCELLED)
+                self.log_console(f"> Job #{job.job_id}: Removed from the queue")
+                self.retire_job(job)
+            elif (job in self.running_jobs or job in self.converting_jobs) and not job.token.cancelled:
+                # The download thread stops right away: its connections are shut
+                # and any FFmpeg it's running is terminated
+                job.keep_partial_files = keep_partial
+                job.status = "CANCELLING"
+                job.token.cancel()
+                self.log_console(f"> Job #{job.job_id}: Cancelling...")
+            self.update_job_row(job)
+        
+        self.update_activity_state()
+    
+    def download_video(self, job):
+        """This does the actual downloading for one job (runs in a separate thread)"""
+        info = None
+        cache = None
+        archive = job.archive
+        formats = split_formats(job.format_type)
+        fmt = requested_format(",".join(formats), job.quality)
         try:
             # Load yt-dlp library
             import yt_dlp
             
-            format_type = self.selected_format.get()
-            quality = self.selected_quality.get()
+            # Most URLs give away their video id, so known videos are skipped without any extraction
+            if self.is_archived(archive, canonical_key(job.url), fmt):
+                self.skip_archived_job(job)
+                return
             
-            ydl_opts = self.get_download_options(format_type, quality)
+            # The token's hooks go first so a cancelled job stops before anything else runs
+            ydl_opts = job.token.attach(self.get_download_options(job.format_type, job.quality, job))
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                self.log_console("> Retrieving video information...")
+                self.log_console(f"> Job #{job.job_id}: Retrieving video information...")
                 
-                info = ydl.extract_info(url, download=False)
-                title = info.get('title', 'Unknown')
-                duration = info.get('duration', 0)
+                # Only run the extractor once - the same info is reused for the download below
+                # (and skipped completely if the metadata cache still has this video)
+                cache = self.get_metadata_cache()
+                info = extract_info_cached(ydl, url=job.url, cache=cache)
+                job.title = info.get('title', 'Unknown')
+                job.duration = info.get('duration') or 0
+                job.video_key = archive_key(info)
+                job.thumbnail_url = thumbnail_url(info)
                 
                 # Update info display
-                self.info_text.config(state='normal')
-                self.info_text.delete('1.0', 'end')
-                self.info_text.insert('1.0', 
-                    f"Retrieving Title... OK\n"
-                    f"{title}.. OK\n"
-                    f"Duration... {duration//60}:{duration%60:02d}.. OK\n"
-                    f"Format... {format_type.upper()}")
-                self.info_text.config(state='disabled')
+                self.post_event(self.on_job_info, job)
                 
-                self.log_console(f"> Title: {title}")
-                self.log_console("> Initiating download sequence...")
-                self.log_console("> ")
+                if self.is_archived(archive, archive_key(info), fmt):
+                    self.skip_archived_job(job)
+                    return
                 
-                # Reset progress tracking
-                self._last_percent = -1
+                self.log_console(f"> Title: {job.title}")
                 
-                # Download
-                ydl.download([url])
+                # Pick formats by resolution, size and merge/transcode cost; the
+                # selector string stays as the fallback if they can't be fetched
+                plan = plan_format(info, formats[0], job.quality,
+                                   can_merge=self.get_ffmpeg_info().available)
+                if plan is not None:
+                    ydl.format_selector = ydl.build_format_selector(
+                        f"{plan.format_spec}/{ydl_opts.get('format', 'best')}")
+                    self.log_console(f"> Job #{job.job_id}: Formats {plan.explain()}")
                 
+                self.log_console(f"> Job #{job.job_id}: Initiating download sequence...")
                 self.log_console("> ")
-                self.log_console("> ====================================")
-                self.log_console("> DOWNLOAD COMPLETE")
-                self.log_console("> ====================================")
-                self.log_console(f"> File saved to: {self.download_folder}/")
-                self.log_console("> Operation successful")
-                self.log_console(">")
+                
+                audio = any(f in AUDIO_FORMATS for f in formats)
+                if audio and info.get('_type', 'video') in ('playlist', 'multi_video'):
+                    # Whole playlists downloaded in one go convert each entry inline
+                    # (only to the main format - extra files need a single video)
+                    if formats[0] in AUDIO_FORMATS:
+                        ydl.add_post_processor(yt_dlp.postprocessor.FFmpegExtractAudioPP(
+                            ydl, preferredcodec=AUDIO_FORMATS[formats[0]]['ytdlp_codec'],
+                            preferredquality='192'))
+                    audio = False
+                
+                # Download straight from the info we already have (no second page fetch)
+                job.token.raise_if_cancelled()
+                with job.token.activate():
+                    processed = ydl.process_ie_result(info, download=True)
+                
+                raw_file = downloaded_file(processed)
+                if audio and raw_file is not None:
+                    # Hand the file to the conversion pool and free this download slot
+                    job.status = "CONVERTING"
+                    job.percent = 100.0
+                    job.handed_to_postprocessing = True
+                    self.post_event(self.converting_jobs.add, job)
+                    self.log_console(f"> Job #{job.job_id}: Download complete, queued for conversion...")
+                    self.postprocessing.submit(self.convert_job, job, raw_file, processed, fmt,
+                                               input_bytes=raw_file.stat().st_size)
+                    return
+                
+                self.complete_job(job, info, fmt)
                 
         except Exception as e:
-            error_msg = str(e)
-            self.log_console("> ====================================")
-            self.log_console("> ERROR: DOWNLOAD FAILED")
-            self.log_console("> ====================================")
-            self.log_console(f"> {error_msg}")
+            # The cached stream links might be stale, so extract fresh next time
+            if not job.token.cancelled:
+                invalidate_info(cache, info)
+            self.handle_job_error(job, e)
+    
+    def convert_job(self, job, raw_file, info, fmt):
+        """Post-processing thread: convert a downloaded file, then finish its job"""
+        try:
+            formats = split_formats(job.format_type)
+            targets = [f for f in formats if f in AUDIO_FORMATS]
+            self.log_console(f"> Job #{job.job_id}: Converting to {'/'.join(targets).upper()}...")
+            # One FFmpeg run makes every audio file (copying the stream where the codec
+            # already fits); a downloaded video is kept as the main file
+            convert_audio(raw_file, targets, self.get_ffmpeg_info().ffmpeg_path, token=job.token,
+                          keep_source=formats[0] not in AUDIO_FORMATS, source_codec=audio_codec(info))
+            self.complete_job(job, info, fmt)
+        except Exception as e:
+            self.handle_job_error(job, e, stage="CONVERSION")
+        finally:
+            self.record_job_result(job)
+            self.post_event(self.conversion_finished, job)
+    
+    def complete_job(self, job, info, fmt):
+        """Mark a job as done and remember its video in the download archive"""
+        job.status = "COMPLETE"
+        job.percent = 100.0
+        
+        # Remember the video so it's skipped next time
+        key = archive_key(info)
+        if job.archive is not None and key is not None:
+            job.archive.add(*key, fmt)
+        
+        self.log_console("> ")
+        self.log_console("> ====================================")
+        self.log_console(f"> DOWNLOAD COMPLETE (#{job.job_id})")
+        self.log_console("> ====================================")
+        self.log_console(f"> File saved to: {self.download_folder}/")
+        self.log_console("> Operation successful")
+        self.log_console(">")
+    
+    def handle_job_error(self, job, e, stage="DOWNLOAD"):
+        """Mark a job as cancelled or failed after an exception (runs in a worker thread)"""
+        if job.token.cancelled:
+            # Cancelled by the user - not an error, just tidy up
+            job.status = "CANCELLED"
+            if not job.keep_partial_files:
+                job.token.cleanup_partial_files()
+                self.log_console(f"> Job #{job.job_id}: Cancelled, partial files deleted")
+            else:
+                self.log_console(f"> Job #{job.job_id}: Cancelled, partial files kept for resume")
+            return
+        
+        error_msg = str(e)
+        job.status = "FAILED"
+        job.error = error_msg
+        self.log_console("> ====================================")
+        self.log_console(f"> ERROR: {stage} FAILED (#{job.job_id})")
+        self.log_console("> ====================================")
+        self.log_console(f"> {error_msg}")
+        self.log_console("> ")
+        
+        # Check for FFmpeg error
+        if 'ffmpeg' in error_msg.lower() or 'ffprobe' in error_msg.lower():
+            self.log_console("> CRITICAL: FFmpeg not found")
+            self.log_console("> FFmpeg is required for audio conversion")
             self.log_console("> ")
-            
-            # Check for FFmpeg error
-            if 'ffmpeg' in error_msg.lower() or 'ffprobe' in error_msg.lower():
-                self.log_console("> CRITICAL: FFmpeg not found")
-                self.log_console("> FFmpeg is required for audio conversion")
-                self.log_console("> ")
-                self.log_console("> To install FFmpeg:")
-                self.log_console(">   1. Run: winget install ffmpeg")
-                self.log_console(">   OR")
-                self.log_console(">   2. Download from: https://ffmpeg.org")
-                self.log_console("> ")
-                self.log_console("> TIP: Use MP4 format (no FFmpeg needed)")
-                self.log_console("> ")
-                
+            self.log_console("> To install FFmpeg:")
+            self.log_console(">   1. Run: winget install ffmpeg")
+            self.log_console(">   OR")
+            self.log_console(">   2. Download from: https://ffmpeg.org")
+            self.log_console("> ")
+            self.log_console("> TIP: Use MP4 format (no FFmpeg needed)")
+            self.log_console("> ")
+        
+        # Popups have to be made on the main thread
+        self.post_event(self.report_job_error, job)
+    
+    def is_archived(self, archive, key, fmt):
+        """Check if the download archive already has this (extractor, video id) in this format"""
+        return archive is not None and key is not None and archive.contains(*key, fmt)
+    
+    def skip_archived_job(self, job):
+        """Finish a job whose video was already downloaded (runs in the download thread)"""
+        job.status = "SKIPPED"
+        job.percent = 100.0
+        self.log_console(f"> Job #{job.job_id}: Already downloaded in this format, skipping")
+    
+    def report_job_error(self, job):
+        """Show an error popup for a failed job (main thread only)"""
+        error_msg = job.error or ""
+        if 'ffmpeg' in error_msg.lower() or 'ffprobe' in error_msg.lower():
+            # Only pop up the FFmpeg help once per batch, not once per failed job
+            if not self.ffmpeg_error_shown:
+                self.ffmpeg_error_shown = True
                 self.show_themed_dialog(
                     "FFmpeg Required",
                     "✗ Audio conversion requires FFmpeg!\n\n"
@@ -1121,157 +1952,128 @@ class JurassicParkDownloader:
                     "Tip: MP4 downloads work without FFmpeg",
                     dialog_type="error"
                 )
-            else:
-                self.show_themed_dialog(
-                    "Download Error",
-                    f"✗ Download failed:\n\n{error_msg}",
-                    dialog_type="error"
-                )
-        
-        finally:
-            self.is_downloading = False
-            self.blinking_enabled = True  # Resume blinking after download
-            self.btn_initiate.config(state='normal')
-            self.btn_cancel.config(state='disabled')
-            self._last_percent = -1
-            
-            # Reset info text back to ready state with blinking dot
-            self.info_text.config(state='normal')
-            self.info_text.delete('1.0', 'end')
-            self.info_text.insert('1.0', "Ready to initialize...")
-            self.info_text.config(state='disabled')
+        elif not (self.running_jobs - {job}) and not self.pending_jobs:
+            # Single downloads get a popup, batch failures just show up in the queue
+            self.show_themed_dialog(
+                "Download Error",
+                f"✗ Download failed:\n\n{error_msg}",
+                dialog_type="error"
+            )
     
-    def get_download_options(self, format_type, quality):
+    def get_download_options(self, format_type, quality, job=None):
         """Get yt-dlp options based on format and quality"""
         base_opts = {
             'outtmpl': str(self.download_folder / '%(title)s.%(ext)s'),
-            'progress_hooks': [self.progress_hook],
+            # Pick up from an existing .part file instead of starting over
+            'continuedl': True,
+            # Each job gets its own hook so progress ends up in the right queue row
+            'progress_hooks': [lambda d: self.progress_hook(d, job)],
         }
         
-        # Try to find FFmpeg automatically
-        try:
-            result = subprocess.run(['where', 'ffmpeg'], capture_output=True, text=True)
-            if result.returncode == 0:
-                ffmpeg_path = result.stdout.strip().split('\n')[0]
-                ffmpeg_dir = str(Path(ffmpeg_path).parent)
-                base_opts['ffmpeg_location'] = ffmpeg_dir
-        except:
-            pass
-        
-        # Check FFmpeg availability
-        ffmpeg_available = False
-        try:
-            result = subprocess.run(['where', 'ffmpeg'], capture_output=True, text=True, timeout=2)
-            ffmpeg_available = (result.returncode == 0)
-        except:
-            pass
-        
-        # Format-specific options
-        if format_type == 'mp3':
-            # MP3 requires FFmpeg for audio extraction
-            if not ffmpeg_available:
-                raise Exception("FFmpeg is required for MP3 conversion. Install it with: winget install ffmpeg")
-            
-            base_opts.update({
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-            })
-        
-        elif format_type == 'mp4':
-            # MP4 - Works with or without FFmpeg
-            # Prioritize formats that don't need merging
-            if quality == 'best':
-                # Get best pre-merged MP4 format (no FFmpeg needed)
-                base_opts['format'] = 'best[ext=mp4]/bestvideo[ext=mp4]+bestaudio[ext=m4a]/best'
-            else:
-                height = quality.replace('p', '')
-                base_opts['format'] = f'best[height<={height}][ext=mp4]/bestvideo[height<={height}][ext=mp4]+bestaudio[ext=m4a]/best'
-            
-            # Only set merge format if we have FFmpeg
-            if ffmpeg_available:
-                base_opts['merge_output_format'] = 'mp4'
-        
-        elif format_type == 'webm':
-            # WEBM - Works with or without FFmpeg
-            if quality == 'best':
-                base_opts['format'] = 'best[ext=webm]/bestvideo[ext=webm]+bestaudio[ext=webm]/best'
-            else:
-                height = quality.replace('p', '')
-                base_opts['format'] = f'best[height<={height}][ext=webm]/bestvideo[height<={height}][ext=webm]+bestaudio[ext=webm]/best'
-            
-            if ffmpeg_available:
-                base_opts['merge_output_format'] = 'webm'
+        # Find FFmpeg (the result is cached, so this doesn't start any programs per download)
+        ffmpeg = self.get_ffmpeg_info()
+        ffmpeg_available = ffmpeg.available
+        if ffmpeg_available:
+            base_opts['ffmpeg_location'] = ffmpeg.location
+        
+        # Fetch DASH/HLS fragments in parallel (tuned from measured speed unless set in F2)
+        self.fragment_tuner.attach(base_opts, job.fragment_concurrency if job else None)
+        
+        # Keep the job within its share of the global bandwidth limit
+        if job is not None:
+            self.bandwidth.attach(base_opts, job, job.priority, job.token)
+        
+        # Extra audio files are converted from the main download, so they need FFmpeg too
+        formats = split_formats(format_type)
+        audio_targets = [f for f in formats if f in AUDIO_FORMATS]
+        if audio_targets and not ffmpeg_available:
+            names = "/".join(audio_targets).upper()
+            raise Exception(f"FFmpeg is required for {names} conversion. Install it with: winget install ffmpeg")
+        format_type = formats[0]
+        
+        # Format-specific options (shared with the command line, so jobs resumed from
+        # its journal - ogg, m4a or mkv too - get the same streams). Audio is only
+        # downloaded here - the conversion runs on the post-processing pool (see
+        # convert_job) so this download slot is free for the next job
+        base_opts.update(selector_options(format_type, quality, can_merge=ffmpeg_available))
         
         return base_opts
     
-    def smooth_progress_update(self, target_percent, downloaded_mb, total_mb, speed_mb):
-        """Smoothly update progress bar"""
-        current = self.info_progress_bar['value']
-        
-        # Smooth transition to target
-        if current < target_percent:
-            step = min(0.5, target_percent - current)
-            new_value = current + step
-            self.info_progress_bar['value'] = new_value
-            
-            # Update label with smooth percentage
-            self.progress_label.config(
-                text=f"{new_value:.1f}% - {downloaded_mb:.1f}MB / {total_mb:.1f}MB @ {speed_mb:.1f}MB/s"
-            )
-            
-            # Schedule next update for smooth animation
-            if new_value < target_percent:
-                self.root.after(10, lambda: self.smooth_progress_update(target_percent, downloaded_mb, total_mb, speed_mb))
-        else:
-            # Final update when we reach target
-            self.info_progress_bar['value'] = target_percent
-            self.progress_label.config(
-                text=f"{target_percent:.1f}% - {downloaded_mb:.1f}MB / {total_mb:.1f}MB @ {speed_mb:.1f}MB/s"
-            )
+    def animate_progress(self):
+        """Slide every running job's shown progress towards its real progress
+        
+        Called once per UI tick. The progress hook only stores the newest
+        percentage on the job, so however often yt-dlp reports progress this
+        is the only thing that moves the progress bar.
+        """
+        for job in self.running_jobs:
+            gap = job.percent - job.display_percent
+            if gap < 0.05:
+                # Close enough, or it went backwards (e.g. the audio part started) - just jump
+                job.display_percent = job.percent
+            else:
+                # Move part of the way each tick so big jumps still look smooth
+                job.display_percent = min(job.percent, job.display_percent + max(0.5, gap * 0.35))
+        
+        job = self.focused_job
+        if (job is not None and job.status == "RUNNING" and job.total_mb
+                and self.info_progress_bar['value'] != job.display_percent):
+            self.info_progress_bar['value'] = job.display_percent
+            self.draw_running_progress(job)
+    
+    def draw_running_progress(self, job):
+        """Write a running job's numbers into the progress label"""
+        self.progress_label.config(
+            text=f"{job.display_percent:.1f}% - {job.downloaded_mb:.1f}MB / {job.total_mb:.1f}MB "
+                 f"@ {job.speed_mb:.1f}MB/s"
+        )
     
-    def progress_hook(self, d):
-        """Update progress bar during download"""
+    def progress_hook(self, d, job):
+        """Record download progress on the job (runs in the download thread)"""
+        # Note the .part file in the journal so a restart can continue it
+        partial_file = d.get('tmpfilename')
+        if partial_file and partial_file != job.partial_file and job.journal_id:
+            job.partial_file = partial_file
+            if self.job_journal is not None:
+                self.job_journal.set_partial_file(job.journal_id, partial_file)
+        
         if d['status'] == 'downloading':
-            # Try different progress indicators
-            if 'downloaded_bytes' in d and 'total_bytes' in d:
-                percent = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                
-                # Update console with progress
-                downloaded_mb = d['downloaded_bytes'] / (1024 * 1024)
-                total_mb = d['total_bytes'] / (1024 * 1024)
-                speed = d.get('speed', 0)
-                speed_mb = speed / (1024 * 1024) if speed else 0
-                
-                # Smooth progress update
-                self.smooth_progress_update(percent, downloaded_mb, total_mb, speed_mb)
+            # Use the exact size if we have it, otherwise yt-dlp's estimate
+            total_bytes = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if 'downloaded_bytes' in d and total_bytes:
+                # yt-dlp calls this for every chunk - skip most calls unless the file is done
+                now = time.monotonic()
+                if (now - job.last_hook_time < self.PROGRESS_HOOK_INTERVAL
+                        and d['downloaded_bytes'] < total_bytes):
+                    return
+                job.last_hook_time = now
                 
-                # Only log every 10% to avoid spam
-                if int(percent) % 10 == 0 and int(percent) != getattr(self, '_last_percent', -1):
-                    self.log_console(f"> Progress: {percent:.0f}% ({downloaded_mb:.1f}MB / {total_mb:.1f}MB) @ {speed_mb:.1f}MB/s")
-                    self._last_percent = int(percent)
+                percent = (d['downloaded_bytes'] / total_bytes) * 100
                 
-                self.root.update_idletasks()
-            elif 'total_bytes_estimate' in d:
-                percent = (d['downloaded_bytes'] / d['total_bytes_estimate']) * 100
-                downloaded_mb = d['downloaded_bytes'] / (1024 * 1024)
-                total_mb = d['total_bytes_estimate'] / (1024 * 1024)
+                # Remember the numbers on the job - the main thread draws them on its next tick
+                job.status = "RUNNING"
+                job.percent = percent
+                job.downloaded_mb = d['downloaded_bytes'] / (1024 * 1024)
+                job.total_mb = total_bytes / (1024 * 1024)
                 speed = d.get('speed', 0)
-                speed_mb = speed / (1024 * 1024) if speed else 0
-                self.smooth_progress_update(percent, downloaded_mb, total_mb, speed_mb)
-                self.root.update_idletasks()
+                job.speed_mb = speed / (1024 * 1024) if speed else 0
+                self.post_event(self.update_job_row, job)
+                
+                # Only log every 10% to avoid spam (and only when the size is exact)
+                # Checking which 10% step we're in means throttled calls can't skip one
+                step = int(percent) // 10 * 10
+                if 'total_bytes' in d and step > job.last_logged_percent:
+                    self.log_console(f"> #{job.job_id} Progress: {percent:.0f}% "
+                                     f"({job.downloaded_mb:.1f}MB / {job.total_mb:.1f}MB) @ {job.speed_mb:.1f}MB/s")
+                    job.last_logged_percent = step
         elif d['status'] == 'finished':
-            self.info_progress_bar['value'] = 100
-            self.progress_label.config(text="100.0% - Complete - Processing file...")
-            self._last_percent = -1
-            self.log_console("> Download complete, processing file...")
+            job.status = "PROCESSING"
+            job.percent = 100.0
+            job.last_logged_percent = -1
+            self.post_event(self.update_job_row, job)
+            self.log_console(f"> Job #{job.job_id}: Download complete, processing file...")
         elif d['status'] == 'error':
-            self.log_console("> ERROR during download")
-            self.info_progress_bar['value'] = 0
-            self.progress_label.config(text="0% - Error")
+            self.log_console(f"> Job #{job.job_id}: ERROR during download")
     
     def check_module_installed(self, module_name, package_name=None):
         """Check if a Python package is installed on this computer"""
@@ -1282,14 +2084,13 @@ class JurassicParkDownloader:
         spec = importlib.util.find_spec(module_name)
         return spec is not None
     
+    def get_ffmpeg_info(self, refresh=False):
+        """Find FFmpeg and what it supports (cached on disk until the ffmpeg file changes)"""
+        return locate_ffmpeg(self.get_state_folder() / "ffmpeg.json", refresh=refresh)
+    
     def check_ffmpeg_installed(self):
         """Check if FFmpeg is installed on this computer"""
-        try:
-            # Run the 'where ffmpeg' command to see if FFmpeg is in the PATH
-            result = subprocess.run(['where', 'ffmpeg'], capture_output=True, text=True, timeout=2)
-            return result.returncode == 0
-        except:
-            return False
+        return self.get_ffmpeg_info().available
     
     def check_dependencies(self):
         """Check if all the programs we need are installed (called when F3 is pressed)"""
@@ -1321,9 +2122,17 @@ class JurassicParkDownloader:
         
         # Check if FFmpeg is installed (needed for MP3 conversion)
         self.log_console(f"> Checking FFmpeg (Audio Converter)...")
-        ffmpeg_installed = self.check_ffmpeg_installed()
+        # Diagnostics always probe again in case FFmpeg was just installed or updated
+        ffmpeg = self.get_ffmpeg_info(refresh=True)
+        ffmpeg_installed = ffmpeg.available
         if ffmpeg_installed:
-            self.log_console(f">   [ffmpeg] .............. OK")
+            self.log_console(f">   [ffmpeg] .............. OK ({ffmpeg.ffmpeg_version or 'unknown version'})")
+            if ffmpeg.ffprobe_path:
+                self.log_console(f">   [ffprobe] ............. OK ({ffmpeg.ffprobe_version or 'unknown version'})")
+            else:
+                self.log_console(f">   [ffprobe] ............. MISSING!")
+            self.log_console(f">   Location: {ffmpeg.location}")
+            self.log_console(f">   Encoders: {len(ffmpeg.encoders)} available")
         else:
             self.log_console(f">   [ffmpeg] .............. MISSING!")
             self.log_console(">   (Optional: Required for MP3 conversion)")
@@ -1546,7 +2355,8 @@ class JurassicParkDownloader:
                 self.log_console(">       for PATH changes to take effect")
                 self.log_console("> ")
                 
-                self.show_themed_dialog(
+                self.post_event(
+                    self.show_themed_dialog,
                     "Installation Complete",
                     "✓ FFmpeg installed successfully!\n\n"
                     "IMPORTANT: Please restart this application\n"
@@ -1569,7 +2379,8 @@ class JurassicParkDownloader:
                 self.log_console(">   3. Try: winget search ffmpeg (to see available packages)")
                 self.log_console("> ")
                 
-                self.show_themed_dialog(
+                self.post_event(
+                    self.show_themed_dialog,
                     "Installation Failed",
                     f"✗ Failed to install FFmpeg automatically.\n\n"
                     f"Manual installation options:\n"
@@ -1583,7 +2394,8 @@ class JurassicParkDownloader:
         except subprocess.TimeoutExpired:
             self.log_console("> ERROR: Installation timed out (took > 5 minutes)")
             self.log_console("> Try manual installation from: https://ffmpeg.org")
-            self.show_themed_dialog(
+            self.post_event(
+                self.show_themed_dialog,
                 "Installation Timeout",
                 f"✗ Installation took too long and was cancelled.\n\n"
                 f"Please install manually from:\nhttps://ffmpeg.org",
@@ -1593,7 +2405,8 @@ class JurassicParkDownloader:
             self.log_console("> ERROR: winget not found")
             self.log_console("> winget requires Windows 10 (1809+) or Windows 11")
             self.log_console("> Try manual installation from: https://ffmpeg.org")
-            self.show_themed_dialog(
+            self.post_event(
+                self.show_themed_dialog,
                 "winget Not Available",
                 f"✗ winget package manager not found.\n\n"
                 f"winget requires Windows 10 (1809+) or Windows 11.\n\n"
@@ -1603,7 +2416,8 @@ class JurassicParkDownloader:
         except Exception as e:
             self.log_console(f"> ERROR: Installation failed - {str(e)}")
             self.log_console("> Try manual installation from: https://ffmpeg.org")
-            self.show_themed_dialog(
+            self.post_event(
+                self.show_themed_dialog,
                 "Installation Error",
                 f"✗ Failed to install FFmpeg:\n\n{str(e)}\n\n"
                 f"Please install manually from:\nhttps://ffmpeg.org",
@@ -1611,9 +2425,9 @@ class JurassicParkDownloader:
             )
         
         finally:
-            # Re-enable buttons
-            self.btn_check_deps.config(state='normal')
-            self.btn_initiate.config(state='normal')
+            # Re-enable buttons (from the main thread)
+            self.post_event(self.btn_check_deps.config, state='normal')
+            self.post_event(self.btn_initiate.config, state='normal')
     
     def install_dependencies(self):
         """Install missing Python dependencies"""
@@ -1668,7 +2482,8 @@ class JurassicParkDownloader:
             self.log_console("> Please restart the application")
             self.log_console("> ")
             
-            self.show_themed_dialog(
+            self.post_event(
+                self.show_themed_dialog,
                 "Installation Complete",
                 "✓ Dependencies installed successfully!\n\n"
                 "Please restart the application to use the new modules.",
@@ -1677,22 +2492,30 @@ class JurassicParkDownloader:
             
         except Exception as e:
             self.log_console(f"> ERROR: Installation failed - {str(e)}")
-            self.show_themed_dialog(
+            self.post_event(
+                self.show_themed_dialog,
                 "Installation Error",
                 f"✗ Failed to install dependencies:\n\n{str(e)}",
                 dialog_type="error"
             )
         
         finally:
-            # Re-enable buttons
-            self.btn_check_deps.config(state='normal')
-            self.btn_initiate.config(state='normal')
+            # Re-enable buttons (from the main thread)
+            self.post_event(self.btn_check_deps.config, state='normal')
+            self.post_event(self.btn_initiate.config, state='normal')
 
 
 def main():
     """Launch the Jurassic Park themed downloader"""
-    root = tk.Tk()
-    app = JurassicParkDownloader(root)
+    parser = argparse.ArgumentParser(description="InGen Systems - YouTube Retrieval Console")
+    parser.add_argument('--startup-timing', action='store_true',
+                        help="print how long each part of the startup took")
+    # parse_known_args so extra arguments (e.g. from a launcher) don't stop the app
+    args, _ = parser.parse_known_args()
+    
+    with startup_timer.step("create window"):
+        root = tk.Tk()
+    app = JurassicParkDownloader(root, show_startup_timing=args.startup_timing)
     root.mainloop()
 
 